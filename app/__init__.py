@@ -6,8 +6,14 @@ from .blueprints.cars import cars_bp
 from .blueprints.mechanics import mechanics_bp
 from .blueprints.service_tickets import service_tickets_bp
 from .blueprints.inventory import inventory_bp
+from .blueprints.imports import imports_bp
+from .blueprints.internal import internal_bp
+from .blueprints.search import search_bp
 from werkzeug.exceptions import HTTPException
 from .utils.helpers import handle_http_exception
+from .utils.compression import compress_response
+from .utils.query_stats import init_query_stats
+from .commands import register_commands
 from flask_swagger_ui import get_swaggerui_blueprint
 from dotenv import load_dotenv
 import os
@@ -40,10 +46,22 @@ def create_app(config_name):
   app.register_blueprint(mechanics_bp, url_prefix='/mechanics')
   app.register_blueprint(service_tickets_bp, url_prefix='/service_tickets')
   app.register_blueprint(inventory_bp, url_prefix='/inventory')
+  app.register_blueprint(imports_bp, url_prefix='/imports')
+  app.register_blueprint(internal_bp, url_prefix='/internal')
+  app.register_blueprint(search_bp, url_prefix='/search')
   app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
   
   # Global error handler
   app.register_error_handler(HTTPException, handle_http_exception)
+  
+  # Gzip large JSON/CSV bodies
+  app.after_request(compress_response)
+
+  # X-DB-Queries / X-DB-Time headers and N+1 warnings where QUERY_STATS is on
+  init_query_stats(app)
+  
+  # CLI commands (flask repair-ticket-counts, ...)
+  register_commands(app)
 
   
   return app
\ No newline at end of file
@@ -0,0 +1,170 @@
+from flask import g
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+from app import create_app
+from app.models import db
+from app.utils.routing import REPLICA, reads_from_replica
+import io
+import sys
+
+
+# ASGI serving mode: uvicorn asgi_app:app
+# The read-heavy list endpoints below run their normal Flask view (auth, response cache, pagination,
+# serializers) inside AsyncSession.run_sync, with db.session pointing at the async session. Each
+# query then awaits the async driver instead of blocking a thread, so one process serves as many
+# concurrent reads as the async pool has connections. Every other request goes to the WSGI app
+# through a thread pool, exactly as under gunicorn.
+# Only the queries yield to the event loop. The rest of the view runs on the loop thread and holds
+# it while it works: JWT checks, marshmallow dumps, gzip, and response cache reads and writes
+# (SharedMemoryCache is a blocking SQLite file lookup per call).
+# Keep ASYNC_ENDPOINTS to cached, cheap-to-serialize lists, and run one uvicorn worker per core.
+# With a 'replica' bind, reads go to an async engine on the replica under the same rules as
+# RoutingSession (app/utils/routing.py): principals pinned after a write read the primary.
+ASYNC_ENDPOINTS = {
+  'service_tickets_bp.get_service_tickets',
+  'service_tickets_bp.get_customer_service_tickets',
+  'cars_bp.get_cars',
+  'inventory_bp.get_inventory_items',
+  'mechanics_bp.get_mechanics',
+}
+# Drivers shipped in requirements.txt; anything else needs SQLALCHEMY_ASYNC_DATABASE_URI
+ASYNC_DRIVERS = {
+  'sqlite': 'sqlite+aiosqlite',
+  'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(app, bind=None):
+  # bind=None is the primary; other binds can be given in SQLALCHEMY_ASYNC_BINDS
+  if bind is None and app.config.get('SQLALCHEMY_ASYNC_DATABASE_URI'):
+    return make_url(app.config['SQLALCHEMY_ASYNC_DATABASE_URI'])
+  if bind is not None and app.config.get('SQLALCHEMY_ASYNC_BINDS', {}).get(bind):
+    return make_url(app.config['SQLALCHEMY_ASYNC_BINDS'][bind])
+  # Flask-SQLAlchemy has already resolved relative SQLite paths against the instance folder
+  with app.app_context():
+    return async_url_for(db.engines[bind].url)
+
+
+def async_url_for(url):
+  backend = url.get_backend_name()
+  if backend not in ASYNC_DRIVERS:
+    raise RuntimeError(f'No async driver for {backend}; set SQLALCHEMY_ASYNC_DATABASE_URI')
+  return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def _environ(scope):
+  server = scope.get('server') or ('localhost', 80)
+  client = scope.get('client') or ('', 0)
+  environ = {
+    'REQUEST_METHOD': scope['method'],
+    'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+    'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+    'QUERY_STRING': scope['query_string'].decode('latin-1'),
+    'SERVER_NAME': server[0],
+    'SERVER_PORT': str(server[1]),
+    'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+    'REMOTE_ADDR': client[0],
+    'wsgi.version': (1, 0),
+    'wsgi.url_scheme': scope.get('scheme', 'http'),
+    'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr,
+    'wsgi.multithread': True,
+    'wsgi.multiprocess': True,
+    'wsgi.run_once': False,
+  }
+  for name, value in scope['headers']:
+    name = name.decode('latin-1').upper().replace('-', '_')
+    if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+      name = f'HTTP_{name}'
+    value = value.decode('latin-1')
+    environ[name] = f'{environ[name]},{value}' if name in environ else value
+  return environ
+
+
+class AsyncReadSession(Session):
+  # Sync side of the async session: session.info[REPLICA] is the replica's async engine, if any
+  def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+    replica = self.info.get(REPLICA)
+    if bind is None and clause is not None and replica is not None and reads_from_replica(self, clause):
+      g.replica_read = True
+      return replica
+    return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class AsyncReadApp:
+  def __init__(self, flask_app):
+    self.flask_app = flask_app
+    self.wsgi = WsgiToAsgi(flask_app)
+    options = flask_app.config.get('SQLALCHEMY_ASYNC_ENGINE_OPTIONS', {})
+    self.engine = create_async_engine(async_database_url(flask_app), **options)
+    self.replica = None
+    if REPLICA in flask_app.config.get('SQLALCHEMY_BINDS', {}):
+      self.replica = create_async_engine(async_database_url(flask_app, REPLICA), **options)
+    self.sessions = async_sessionmaker(
+      self.engine,
+      expire_on_commit=False,
+      sync_session_class=AsyncReadSession,
+      info={REPLICA: self.replica.sync_engine} if self.replica else {}
+    )
+
+  def _endpoint(self, environ):
+    try:
+      endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+    except (HTTPException, RequestRedirect):
+      return None
+    return endpoint
+
+  def _dispatch(self):
+    try:
+      return self.flask_app.full_dispatch_request()
+    except Exception as e:
+      return self.flask_app.handle_exception(e)
+
+  async def _serve(self, environ, send):
+    ctx = self.flask_app.request_context(environ)
+    async with self.sessions() as session:
+      ctx.push()
+      try:
+        db.session.registry.set(session.sync_session)
+        # run_sync runs the view in a greenlet; every query it makes awaits the async driver
+        response = await session.run_sync(lambda sync_session: self._dispatch())
+        await session.close()
+      finally:
+        db.session.registry.clear()
+        ctx.pop()
+    body = b'' if environ['REQUEST_METHOD'] == 'HEAD' else response.get_data()
+    await send({
+      'type': 'http.response.start',
+      'status': response.status_code,
+      'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+  async def _lifespan(self, receive, send):
+    while True:
+      message = await receive()
+      if message['type'] == 'lifespan.startup':
+        await send({'type': 'lifespan.startup.complete'})
+      elif message['type'] == 'lifespan.shutdown':
+        await self.engine.dispose()
+        if self.replica:
+          await self.replica.dispose()
+        await send({'type': 'lifespan.shutdown.complete'})
+        return
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] == 'lifespan':
+      return await self._lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+      environ = _environ(scope)
+      if self._endpoint(environ) in ASYNC_ENDPOINTS:
+        return await self._serve(environ, send)
+    return await self.wsgi(scope, receive, send)
+
+
+def create_asgi_app(config_name):
+  return AsyncReadApp(create_app(config_name))
@@ -2,12 +2,22 @@ from .schemas import car_schema, cars_schema, car_schema_dict
 from . import cars_bp
 from flask import abort, request, jsonify
 from sqlalchemy import select
-from app.models import Car, db, Customer
-from app.utils.helpers import get_or_404, load_request_data, update_field_values, paginate, check_role
+from app.models import Car, db, Customer, ServiceTicket
+from app.utils.helpers import get_or_404, load_request_data, update_field_values, paginate, pagination_headers, check_role
 from app.utils.jwt_utils import token_required
-from app.extensions import limiter, cache
+from app.utils.caching import cached_response, invalidate_tags
+from app.utils.filters import apply_filters, equals, parse_int
+from app.extensions import limiter
 from marshmallow import ValidationError
 
+# ?make=Honda&model=Civic&year=2020&customer_id=1
+CAR_FILTERS = {
+  'make': equals(Car.make),
+  'model': equals(Car.model),
+  'year': equals(Car.year, parse_int),
+  'customer_id': equals(Car.customer_id, parse_int),
+}
+
 # Create Car
 @cars_bp.route('/', methods=['POST'])
 @limiter.limit('5 per minute')
@@ -31,28 +41,29 @@ def create_car(user, role):
 
   db.session.add(car)
   db.session.commit()
+  invalidate_tags('cars')
   return car_schema.jsonify(car), 201
 
 
 # Get All Cars' Data
 @cars_bp.route('/', methods=['GET'])
-@cache.cached(timeout=60)
 @token_required
+@cached_response(tags=('cars', 'tickets'))
 def get_cars(user, role):
   check_role(role, 'mechanic')
   sort = request.args.get('sort', default='vin', type=str)
   if sort == 'customer_id':
-    query = select(Car).order_by(Car.customer_id)
+    order_by = (Car.customer_id, Car.vin)
   else:
-    query = select(Car).order_by(Car.vin)
-  cars = paginate(query, cars_schema)
-  return jsonify(cars['items']), 200
+    order_by = (Car.vin,)
+  cars = paginate(apply_filters(select(Car), CAR_FILTERS), cars_schema, order_by=order_by)
+  return jsonify(cars['items']), 200, pagination_headers(cars)
   
 
 # Get Single Car Data
 @cars_bp.route('/<car_vin>', methods=['GET'])
-@cache.cached(timeout=60)
 @token_required
+@cached_response(tags=('car:{car_vin}', 'tickets'))
 def get_car(user, role, car_vin):
   check_role(role, ('customer', 'mechanic'))
   car = db.session.execute(select(Car).where(Car.vin == car_vin)).scalars().first()
@@ -61,7 +72,7 @@ def get_car(user, role, car_vin):
   if role == 'mechanic':
     pass
   elif role == 'customer':
-    if not any(car.vin == car_vin for car in user.cars):
+    if not any(car.vin == car_vin for car in user.instance.cars):
       abort(404, description=f'Car with VIN {car_vin} not found')  
   else:
     return jsonify({'message': 'Invalid role'}), 401
@@ -82,7 +93,7 @@ def edit_car(user, role, car_vin):
   if role == 'mechanic':
     pass
   elif role == 'customer':
-    if not any(car.vin == car_vin for car in user.cars):
+    if not any(car.vin == car_vin for car in user.instance.cars):
       return jsonify({'message': f'Car with VIN {car_vin} not found <3'}), 404
   else:
     return jsonify({'message': 'Invalid role'}), 401
@@ -93,6 +104,7 @@ def edit_car(user, role, car_vin):
     partial=(request.method == 'PATCH'))
   update_field_values(car, car_data)
   db.session.commit()
+  invalidate_tags('cars', f'car:{car_vin}', f'car:{car.vin}')
   return car_schema.jsonify(car), 200
   
 
@@ -104,8 +116,11 @@ def edit_car(user, role, car_vin):
 def delete_car(user, role, car_vin):
   check_role(role, ('customer', 'mechanic'))
   car = get_or_404(Car, car_vin)
+  # The car's tickets go with it; their cached invoices and detail pages must too
+  ticket_ids = db.session.execute(select(ServiceTicket.id).where(ServiceTicket.car_vin == car_vin)).scalars().all()
   db.session.delete(car)
   db.session.commit()
+  invalidate_tags('cars', f'car:{car_vin}', 'tickets', 'mechanics', *(f'ticket:{ticket_id}' for ticket_id in ticket_ids))
   return jsonify({'message': 'Successfully deleted car'}), 200
       
   
\ No newline at end of file
@@ -1,11 +1,13 @@
 from .schemas import customer_schema, customers_schema, customer_schema_dict
 from flask import request, jsonify
 from sqlalchemy import select
-from app.models import Customer, db
+from app.models import Customer, Car, ServiceTicket, db
 from . import customers_bp
-from app.utils.helpers import load_request_data, get_or_404, update_field_values, paginate, handle_login, check_role
-from app.utils.jwt_utils import token_required
-from app.extensions import limiter, cache
+from app.utils.helpers import load_request_data, get_or_404, update_field_values, paginate, pagination_headers, handle_login, check_role
+from app.utils.jwt_utils import token_required, principal_cache
+from app.utils.passwords import hash_password
+from app.utils.caching import cached_response, invalidate_tags
+from app.extensions import limiter
 
 
 # Customer Login
@@ -24,30 +26,40 @@ def create_customer():
   customer_existing = db.session.execute(query).scalars().all()
   if customer_existing:
     return jsonify ({"message": "A customer with this email already exists."}), 409
+  new_customer.password = hash_password(new_customer.password)
   db.session.add(new_customer)
   db.session.commit()
+  invalidate_tags('customers')
   return customer_schema.jsonify(new_customer), 201
 
 
 # Get All Customers' Data
 @customers_bp.route('/', methods=['GET'])
-@cache.cached(timeout=1)
 @token_required
+@cached_response(tags=('customers', 'cars', 'tickets'))
 def get_customers(user, role):
   check_role(role, 'mechanic')
-  query = select(Customer).order_by(Customer.name)
-  customers = paginate(query, customers_schema)
-  return jsonify(customers['items']), 200
+  customers = paginate(
+    select(Customer),
+    customers_schema,
+    order_by=(Customer.name, Customer.id)
+  )
+  return jsonify(customers['items']), 200, pagination_headers(customers)
+
+
+def account_tags(user, role):
+  customer_id = user.id if role == 'customer' else request.args.get('customer_id', type=int)
+  return (f'customer:{customer_id}', 'cars', 'tickets')
 
 
 # Get Single Customer Data 
 @customers_bp.route("/account", methods=['GET'])
-@cache.cached(timeout=1)
 @token_required
+@cached_response(tags=account_tags)
 def get_customer(user, role):
   check_role(role, ('customer', 'mechanic'))
   if role == 'customer':
-    customer = user
+    customer = user.instance
   elif role == 'mechanic':
     customer_id = request.args.get('customer_id', type=int)
     if customer_id is None:
@@ -69,9 +81,14 @@ def edit_customer(user, role):
     model_class=Customer,
     partial=(request.method == 'PATCH')
   )
-  update_field_values(user, customer_data)
+  if 'password' in customer_data:
+    customer_data['password'] = hash_password(customer_data['password'])
+  customer = user.instance
+  update_field_values(customer, customer_data)
   db.session.commit()
-  return customer_schema.jsonify(user), 200
+  principal_cache.invalidate(role, user.id)
+  invalidate_tags('customers', f'customer:{user.id}')
+  return customer_schema.jsonify(customer), 200
 
 
 # Delete Customer
@@ -80,6 +97,16 @@ def edit_customer(user, role):
 @token_required
 def delete_customer(user, role):
   check_role(role, 'customer')
-  db.session.delete(user)
+  # Cars and their tickets go with the account
+  tags = ['customers', f'customer:{user.id}', 'cars', 'tickets', 'mechanics']
+  customer = user.instance
+  tags.extend(f'car:{car.vin}' for car in customer.cars)
+  ticket_ids = db.session.execute(
+    select(ServiceTicket.id).join(Car).where(Car.customer_id == user.id)
+  ).scalars().all()
+  tags.extend(f'ticket:{ticket_id}' for ticket_id in ticket_ids)
+  db.session.delete(customer)
   db.session.commit()
+  principal_cache.invalidate(role, user.id)
+  invalidate_tags(*tags)
   return jsonify({"message": "Successfully deleted your account."}), 200
@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+imports_bp = Blueprint("imports_bp", __name__)
+
+from . import routes
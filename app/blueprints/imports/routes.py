@@ -0,0 +1,25 @@
+from flask import request, jsonify
+from . import imports_bp
+from app.utils.helpers import check_role
+from app.utils.importer import IMPORTS, import_rows
+from app.utils.jwt_utils import token_required
+from app.utils.caching import invalidate_tags
+from app.extensions import limiter
+import io
+
+
+# Bulk import of NDJSON (one object per line) or CSV with a header row, read straight from the
+# request stream: POST /imports/customers with Content-Type application/x-ndjson or text/csv
+@imports_bp.route('/<kind>', methods=['POST'])
+@limiter.limit('2 per minute')
+@token_required
+def import_records(user, role, kind):
+  check_role(role, 'mechanic')
+  if kind not in IMPORTS:
+    return jsonify({'message': f"Unknown import type. Choose from: {', '.join(IMPORTS)}"}), 404
+  fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+  stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+  result = import_rows(kind, stream, fmt)
+  if result.inserted:
+    invalidate_tags(kind)
+  return jsonify(result.to_dict()), 200
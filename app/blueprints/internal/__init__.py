@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+internal_bp = Blueprint("internal_bp", __name__)
+
+from . import routes
@@ -0,0 +1,15 @@
+from flask import jsonify
+from . import internal_bp
+from app.models import db
+from app.utils.helpers import check_role
+from app.utils.jwt_utils import token_required
+from app.utils.pool_stats import pool_stats
+
+
+# Operational numbers for this worker process. High wait times with a full pool point at the
+# database; idle connections with slow responses point at the app.
+@internal_bp.route('/stats', methods=['GET'])
+@token_required
+def get_stats(user, role):
+  check_role(role, 'mechanic')
+  return jsonify({'db_pool': pool_stats(db.engine)}), 200
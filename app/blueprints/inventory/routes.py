@@ -1,11 +1,19 @@
 from .schemas import inventory_schema, inventories_schema, inventory_schema_dict
-from flask import jsonify
+from flask import request, jsonify
 from sqlalchemy import select
 from app.models import db, Inventory
 from . import inventory_bp
-from app.utils.helpers import load_request_data, get_or_404, paginate, check_role
+from app.utils.helpers import load_request_data, update_field_values, get_or_404, paginate, pagination_headers, check_role
 from app.utils.jwt_utils import token_required
-from app.extensions import limiter, cache
+from app.utils.caching import cached_response, invalidate_tags
+from app.utils.filters import apply_filters, at_least, at_most, parse_number
+from app.extensions import limiter
+
+# ?min_price=10&max_price=99.99; with sort=price the range is read straight from ix_inventory_price
+INVENTORY_FILTERS = {
+  'min_price': at_least(Inventory.price, parse_number),
+  'max_price': at_most(Inventory.price, parse_number),
+}
 
 @inventory_bp.route('/', methods=['POST'])
 @limiter.limit('10 per minute')
@@ -19,28 +27,58 @@ def create_inventory_item(user, role):
     return jsonify({'message': f'This item already in the inventory: {item.name}'}), 409
   db.session.add(item)
   db.session.commit()
+  invalidate_tags('inventory')
   return inventory_schema.jsonify(item), 201
 
 
 @inventory_bp.route('/', methods=['GET'])
-@cache.cached(timeout=1)
 @token_required
+@cached_response(tags=('inventory',))
 def get_inventory_items(user, role):
   check_role(role, 'mechanic')
-  query = select(Inventory).order_by(Inventory.name)
-  items = paginate(query, inventories_schema)
-  return jsonify(items['items']), 200
+  sort = request.args.get('sort', default='name', type=str)
+  if sort == 'price':
+    order_by = (Inventory.price, Inventory.id)
+  else:
+    order_by = (Inventory.name, Inventory.id)
+  items = paginate(
+    apply_filters(select(Inventory), INVENTORY_FILTERS),
+    inventories_schema,
+    order_by=order_by
+  )
+  return jsonify(items['items']), 200, pagination_headers(items)
 
 
 @inventory_bp.route('/<int:id>', methods=['GET'])
-@cache.cached(timeout=1)
 @token_required
+@cached_response(tags=('inventory:{id}',))
 def get_inventory_item(user, role, id):
   check_role(role, 'mechanic')
   item = get_or_404(Inventory, id)
   return inventory_schema.jsonify(item), 200
 
 
+@inventory_bp.route('/<int:id>', methods=['PUT', 'PATCH'])
+@limiter.limit('5 per minute')
+@token_required
+def edit_inventory_item(user, role, id):
+  check_role(role, 'mechanic')
+  item = get_or_404(Inventory, id)
+  old_line = (item.name, item.price)
+  item_data = load_request_data(
+    schema=inventory_schema_dict,
+    model_class=Inventory,
+    partial=(request.method == 'PATCH'))
+  update_field_values(item, item_data)
+  db.session.commit()
+  tags = ['inventory', f'inventory:{id}']
+  if (item.name, item.price) != old_line:
+    # Invoice lines take their name and price from the inventory table, so either change drops every cached invoice
+    tags.append('prices')
+  invalidate_tags(*tags)
+  return inventory_schema.jsonify(item), 200
+
+
 @inventory_bp.route('/<int:id>', methods=['DELETE'])
 @limiter.limit('5 per minute')
 @token_required
@@ -49,5 +87,7 @@ def delete_inventory_item(user, role, id):
   item = get_or_404(Inventory, id)
   db.session.delete(item)
   db.session.commit()
+  # Deleting the item also deletes its ticket lines
+  invalidate_tags('inventory', f'inventory:{id}', 'prices')
   return jsonify({"message": f"Successfully deleted item: {item.name}"}), 200
   
\ No newline at end of file
@@ -3,9 +3,20 @@ from flask import request, jsonify
 from sqlalchemy import select
 from app.models import Mechanic, db
 from . import mechanics_bp
-from app.utils.helpers import load_request_data, update_field_values, paginate, handle_login, check_role
-from app.utils.jwt_utils import token_required
-from app.extensions import limiter, cache
+from app.utils.helpers import load_request_data, update_field_values, paginate, pagination_headers, handle_login, check_role
+from app.utils.jwt_utils import token_required, principal_cache
+from app.utils.passwords import hash_password
+from app.utils.caching import cached_response, invalidate_tags
+from app.utils.filters import apply_filters, at_least, at_most, parse_int, parse_number
+from app.extensions import limiter
+
+# ?min_salary=50000&max_salary=90000&min_ticket_count=5
+MECHANIC_FILTERS = {
+  'min_salary': at_least(Mechanic.salary, parse_number),
+  'max_salary': at_most(Mechanic.salary, parse_number),
+  'min_ticket_count': at_least(Mechanic.ticket_count, parse_int),
+  'max_ticket_count': at_most(Mechanic.ticket_count, parse_int),
+}
 
 
 
@@ -27,38 +38,37 @@ def create_mechanic(user, role):
   mechanic_existing = db.session.execute(query).scalars().all()
   if mechanic_existing:
     return jsonify({'message': 'A mechanic with this email already exists.'}), 409
+  new_mechanic.password = hash_password(new_mechanic.password)
   db.session.add(new_mechanic)
   db.session.commit()
+  invalidate_tags('mechanics')
   return mechanic_schema.jsonify(new_mechanic), 201
 
 
 # Get All Mechanics' Data
 @mechanics_bp.route('/', methods=['GET'])
-@cache.cached(timeout=1)
 @token_required
+@cached_response(tags=('mechanics', 'tickets'))
 def get_mechanics(user, role):
   check_role(role, 'mechanic')
   sort = request.args.get('sort', default='name', type=str)
-  *rest, ticket_count_col, _, base_query = Mechanic.get_ticket_counts()
   if sort == 'ticket_count':
-    query = base_query.order_by(ticket_count_col.desc())
+    order_by = (Mechanic.ticket_count.desc(), Mechanic.id.desc())
   elif sort == 'salary':
-    query = base_query.order_by(Mechanic.salary.desc())
+    order_by = (Mechanic.salary.desc(), Mechanic.id.desc())
   else:
-    query = base_query.order_by(Mechanic.name)
-  mechanics = paginate(query, mechanics_schema)
-  return jsonify(mechanics['items']), 200
+    order_by = (Mechanic.name, Mechanic.id)
+  mechanics = paginate(apply_filters(select(Mechanic), MECHANIC_FILTERS), mechanics_schema, order_by=order_by)
+  return jsonify(mechanics['items']), 200, pagination_headers(mechanics)
 
 
 # Get Single Mechanic Data 
 @mechanics_bp.route("/my-account", methods=['GET'])
-@cache.cached(timeout=60)
 @token_required
+@cached_response(tags=('mechanic:{user.id}', 'tickets'))
 def get_mechanic(user, role):
   check_role(role, 'mechanic')
-  _, mechanics, *rest = Mechanic.get_ticket_counts()
-  mechanic = next((m for m in mechanics if m.id == user.id), None)
-  return mechanic_schema.jsonify(mechanic), 200  
+  return mechanic_schema.jsonify(user.instance), 200  
 
 
 # Edit Mechanic Data
@@ -72,9 +82,14 @@ def edit_mechanic(user, role):
     model_class=Mechanic,
     partial=(request.method == 'PATCH')
   )
-  update_field_values(user, mechanic_data)
+  if 'password' in mechanic_data:
+    mechanic_data['password'] = hash_password(mechanic_data['password'])
+  mechanic = user.instance
+  update_field_values(mechanic, mechanic_data)
   db.session.commit()
-  return mechanic_schema.jsonify(user), 200
+  principal_cache.invalidate(role, user.id)
+  invalidate_tags('mechanics', f'mechanic:{user.id}')
+  return mechanic_schema.jsonify(mechanic), 200
   
 
 # Delete Mechanic
@@ -83,6 +98,8 @@ def edit_mechanic(user, role):
 @token_required
 def delete_mechanic(user, role):
   check_role(role, 'mechanic')
-  db.session.delete(user)
+  db.session.delete(user.instance)
   db.session.commit()
+  principal_cache.invalidate(role, user.id)
+  invalidate_tags('mechanics', f'mechanic:{user.id}', 'tickets')
   return jsonify({'message': 'Successfully deleted mechanic'}), 200
\ No newline at end of file
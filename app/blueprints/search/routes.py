@@ -0,0 +1,34 @@
+from flask import abort, request, jsonify
+from . import search_bp
+from app.utils.helpers import check_role, pagination_headers
+from app.utils.jwt_utils import token_required
+from app.utils.caching import cached_response
+from app.utils.search import SEARCH_DOCUMENTS, search
+
+
+# Ranked full-text lookup: /search/?q=brake civic&type=service_ticket&type=car
+@search_bp.route('/', methods=['GET'])
+@token_required
+@cached_response(tags=('tickets', 'customers', 'cars'))
+def search_records(user, role):
+  check_role(role, 'mechanic')
+  MAX_QUERY_LENGTH = 200
+  MAX_PER_PAGE = 100
+  query = request.args.get('q', '').strip()
+  if not query or len(query) > MAX_QUERY_LENGTH:
+    return jsonify({'message': f'Provide a q search query of 1 to {MAX_QUERY_LENGTH} characters'}), 400
+  kinds = request.args.getlist('type') or list(SEARCH_DOCUMENTS)
+  unknown = [kind for kind in kinds if kind not in SEARCH_DOCUMENTS]
+  if unknown:
+    return jsonify({'message': f"Invalid type. Choose from: {', '.join(SEARCH_DOCUMENTS)}"}), 400
+  page = request.args.get('page', default=1, type=int)
+  per_page = min(request.args.get('per_page', default=10, type=int), MAX_PER_PAGE)
+  if page < 1 or per_page < 1:
+    return jsonify({'message': 'Invalid page or per_page value'}), 400
+
+  try:
+    items, has_next = search(query, dict.fromkeys(kinds), page, per_page)
+  except NotImplementedError as error:
+    abort(501, description=str(error))
+  results = {'items': items, 'total': None, 'page': page, 'pages': None, 'has_next': has_next}
+  return jsonify(items), 200, pagination_headers(results)
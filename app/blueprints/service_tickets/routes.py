@@ -1,11 +1,34 @@
-from .schemas import service_ticket_schema, service_tickets_schema, edit_ticket_mechs_schema, detailed_service_ticket_schema, detailed_service_tickets_schema
-from flask import request, jsonify
-from sqlalchemy import select
-from app.models import ServiceTicket, db, Mechanic, Customer, Car, Inventory, ServiceTicketInventory
+from .schemas import service_ticket_schema, service_tickets_schema, edit_ticket_mechs_schema, bulk_edit_ticket_mechs_schema, ticket_parts_schema, detailed_service_ticket_schema, detailed_service_tickets_schema
+from flask import request, jsonify, abort, Response, stream_with_context
+from sqlalchemy import select, insert, delete, update, union_all, literal, null, tuple_, bindparam, and_
+from app.models import ServiceTicket, db, Mechanic, Customer, Car, Inventory, ServiceTicketInventory, service_ticket_mechanic
+from collections import Counter
 from . import service_tickets_bp
-from app.utils.helpers import get_or_404, load_request_data, paginate, check_role
+from app.utils.helpers import get_or_404, load_request_data, paginate, pagination_headers, check_role
 from app.utils.jwt_utils import token_required
-from app.extensions import limiter, cache
+from app.utils.caching import cached_response, invalidate_tags
+from app.utils.parts import upsert_ticket_parts, add_ticket_part, remove_ticket_part
+from app.utils.invoices import get_invoices
+from app.utils.export import EXPORT_FORMATS, dump_batches, stream_ndjson, stream_csv
+from app.utils.filters import apply_filters, at_least, at_most, equals, parse_datetime, parse_int
+from app.extensions import limiter
+
+
+# Newest first; id breaks ties so cursors are unique
+TICKET_ORDER = (ServiceTicket.created_at.desc(), ServiceTicket.id.desc())
+
+# ?created_after=2025-01-01&created_before=2025-02-01T12:00:00&mechanic_id=3
+TICKET_FILTERS = {
+  'created_after': at_least(ServiceTicket.created_at, parse_datetime),
+  'created_before': at_most(ServiceTicket.created_at, parse_datetime),
+  # Only valid with the assignment join that get_service_tickets adds for it
+  'mechanic_id': equals(service_ticket_mechanic.c.mechanic_id, parse_int),
+}
+# Same order from one mechanic's assignments: ix_service_ticket_mechanic_mechanic_id has it
+MECHANIC_TICKET_ORDER = (
+  service_ticket_mechanic.c.ticket_created_at.desc(),
+  service_ticket_mechanic.c.service_ticket_id.desc(),
+)
 
 
 # Create service ticket
@@ -22,6 +45,7 @@ def create_service_ticket(user, role):
     return jsonify({'message': 'Car not found'}), 404
   db.session.add(new_service_ticket)
   db.session.commit()
+  invalidate_tags('tickets', f'car:{car.vin}')
   return service_ticket_schema.jsonify(new_service_ticket), 201
 
 
@@ -101,7 +125,102 @@ def edit_ticket_mechanics(user, role, ticket_id):
     return jsonify(remove_mech_error), 400
   
   db.session.commit()
+  invalidate_tags('tickets', f'ticket:{ticket_id}', 'mechanics')
   return detailed_service_ticket_schema.jsonify(service_ticket), 200
+
+
+# Add and/or remove mechanics on many service tickets in one transaction
+@service_tickets_bp.route('/bulk/edit', methods=['PUT'])
+@limiter.limit('10 per minute')
+@token_required
+def bulk_edit_ticket_mechanics(user, role):
+  check_role(role, 'mechanic')
+  data = load_request_data(bulk_edit_ticket_mechs_schema, model_class=None) # type: ignore
+  changes = data['tickets']
+  
+  adds = {
+    (ticket_id, mech_id)
+    for ticket_id, change in changes.items()
+    for mech_id in change.get('add_mech_ids') or []
+  }
+  removes = {
+    (ticket_id, mech_id)
+    for ticket_id, change in changes.items()
+    for mech_id in change.get('remove_mech_ids') or []
+  }
+  ticket_ids = set(changes)
+  mech_ids = {mech_id for _, mech_id in adds | removes}
+  
+  ## Validate tickets and mechanics and fetch current assignments in a single round trip
+  ## Tickets come with their created_at, which new assignment rows copy
+  stm = service_ticket_mechanic
+  rows = db.session.execute(union_all(
+    select(literal('ticket'), ServiceTicket.id, null(), ServiceTicket.created_at).where(ServiceTicket.id.in_(ticket_ids)),
+    select(literal('mechanic'), Mechanic.id, null(), null()).where(Mechanic.id.in_(mech_ids)),
+    select(literal('assignment'), stm.c.service_ticket_id, stm.c.mechanic_id, null()).where(
+      stm.c.service_ticket_id.in_(ticket_ids),
+      stm.c.mechanic_id.in_(mech_ids)
+    )
+  )).all()
+  found = {'ticket': set(), 'mechanic': set(), 'assignment': set()}
+  ticket_dates = {}
+  for kind, first_id, second_id, created_at in rows:
+    found[kind].add(first_id if second_id is None else (first_id, second_id))
+    if kind == 'ticket':
+      ticket_dates[first_id] = created_at
+  
+  missing_tickets = sorted(ticket_ids - found['ticket'])
+  if missing_tickets:
+    ids_string = ", ".join(map(str, missing_tickets))
+    return jsonify({'message': f'Service ticket(s) not found for ID(s): {ids_string}'}), 404
+  missing_mechs = sorted(mech_ids - found['mechanic'])
+  if missing_mechs:
+    ids_string = ", ".join(map(str, missing_mechs))
+    return jsonify({'message': f'Mechanic(s) not found for ID(s): {ids_string}'}), 404
+  
+  ## Same order as the single-ticket route: adds first, then removes
+  existing = found['assignment']
+  final = (existing | adds) - removes
+  to_insert = final - existing
+  to_delete = existing - final
+  
+  if to_delete:
+    db.session.execute(
+      delete(stm).where(tuple_(stm.c.service_ticket_id, stm.c.mechanic_id).in_(sorted(to_delete)))
+    )
+  if to_insert:
+    db.session.execute(
+      insert(stm),
+      [{'service_ticket_id': t, 'mechanic_id': m, 'ticket_created_at': ticket_dates[t]} for t, m in sorted(to_insert)]
+    )
+  
+  ## Set-based writes skip the ORM listener, so adjust ticket_count here
+  deltas = Counter(mech_id for _, mech_id in to_insert)
+  deltas.subtract(mech_id for _, mech_id in to_delete)
+  deltas = [{'mech_id': mech_id, 'delta': delta} for mech_id, delta in deltas.items() if delta]
+  if deltas:
+    mechanics = Mechanic.__table__
+    db.session.execute(
+      update(mechanics)
+      .where(mechanics.c.id == bindparam('mech_id'))
+      .values(ticket_count=mechanics.c.ticket_count + bindparam('delta')),
+      deltas
+    )
+  db.session.commit()
+  
+  changed_tickets = {ticket_id for ticket_id, _ in to_insert | to_delete}
+  invalidate_tags('tickets', 'mechanics', *(f'ticket:{ticket_id}' for ticket_id in changed_tickets))
+  
+  def pairs(pair_set):
+    return [{'ticket_id': t, 'mechanic_id': m} for t, m in sorted(pair_set)]
+  
+  return jsonify({
+    'added': pairs(to_insert),
+    'removed': pairs(to_delete),
+    'already_assigned': pairs(adds & existing - removes),
+    'not_assigned': pairs(removes - existing - adds)
+  }), 200
+
     
 # == Old Code
   
@@ -133,21 +252,61 @@ def edit_ticket_mechanics(user, role, ticket_id):
 
 # Get all service tickets for all customers  
 @service_tickets_bp.route('/', methods=['GET'])
-@cache.cached(timeout=60)
 @token_required
+@cached_response(tags=('tickets', 'cars', 'customers', 'mechanics'))
 def get_service_tickets(user, role):
   check_role(role, 'mechanic')
-  query = select(ServiceTicket).order_by(ServiceTicket.created_at.desc())
-  service_tickets = paginate(query, detailed_service_tickets_schema)
+  query = select(ServiceTicket)
+  order_by = TICKET_ORDER
+  if 'mechanic_id' in request.args:
+    # Joined on the date too, so created_after/created_before also narrow the index range
+    stm = service_ticket_mechanic
+    query = query.join(stm, and_(
+      stm.c.service_ticket_id == ServiceTicket.id,
+      stm.c.ticket_created_at == ServiceTicket.created_at
+    ))
+    order_by = MECHANIC_TICKET_ORDER
+  service_tickets = paginate(
+    apply_filters(query, TICKET_FILTERS),
+    detailed_service_tickets_schema,
+    order_by=order_by
+  )
   if not service_tickets:
     return jsonify({'message': 'No service tickets have been created yet'}), 200
-  return jsonify(service_tickets['items']), 200
+  return jsonify(service_tickets['items']), 200, pagination_headers(service_tickets)
+
+
+# Stream every service ticket as NDJSON or CSV: /service_tickets/export?format=csv&since=2025-01-01
+@service_tickets_bp.route('/export', methods=['GET'])
+@limiter.limit('5 per minute')
+@token_required
+def export_service_tickets(user, role):
+  check_role(role, 'mechanic')
+  fmt = request.args.get('format', 'ndjson')
+  if fmt not in EXPORT_FORMATS:
+    return jsonify({'message': f"Invalid format. Choose from: {', '.join(EXPORT_FORMATS)}"}), 400
+  
+  query = select(ServiceTicket).order_by(ServiceTicket.created_at, ServiceTicket.id)
+  since = request.args.get('since')
+  if since:
+    try:
+      query = query.where(ServiceTicket.created_at >= parse_datetime(since))
+    except ValueError:
+      return jsonify({'message': 'Invalid since timestamp, use ISO 8601 (e.g. 2025-01-31T09:00:00)'}), 400
+  
+  batches = dump_batches(query, detailed_service_tickets_schema)
+  body = stream_csv(batches, detailed_service_tickets_schema) if fmt == 'csv' else stream_ndjson(batches)
+  return Response(
+    stream_with_context(body),
+    mimetype=EXPORT_FORMATS[fmt],
+    headers={'Content-Disposition': f'attachment; filename=service_tickets.{fmt}'}
+  )
 
 
 # Get service ticket by ticket ID
 @service_tickets_bp.route('/<int:ticket_id>', methods=['GET'])
-@cache.cached(timeout=60)
 @token_required
+@cached_response(tags=('ticket:{ticket_id}', 'cars', 'customers', 'mechanics'))
 def get_service_ticket(user, role, ticket_id):
   check_role(role, 'mechanic')
   service_ticket = get_or_404(ServiceTicket, ticket_id)
@@ -157,36 +316,33 @@ def get_service_ticket(user, role, ticket_id):
 # Get all service tickets for a specific car of logged-in customer
 # Had to include car_num because I created an additional Car module that wasn't in the assignment
 @service_tickets_bp.route('/by-car/<int:car_num>', methods=['GET'])
-@cache.cached(timeout=60)
 @token_required
+@cached_response(tags=('tickets', 'cars', 'mechanics'))
 def get_car_service_tickets(user, role, car_num):
   check_role(role, 'customer')
   
-  if not user.cars:
+  cars = user.instance.cars
+  if not cars:
     return jsonify({'message': 'No cars associated with this account'}), 200
   
-  if car_num < 1 or car_num > len(user.cars):
+  if car_num < 1 or car_num > len(cars):
     return jsonify({'message': 'Car not found. Please enter a valid car number.'}), 404
-  car = user.cars[car_num - 1]
-  query = (
-    select(ServiceTicket)
-    .where(ServiceTicket.car_vin == car.vin)
-    .order_by(ServiceTicket.created_at.desc())
-  )
-  customer_car_tickets = paginate(query, service_tickets_schema)
+  car = cars[car_num - 1]
+  query = select(ServiceTicket).where(ServiceTicket.car_vin == car.vin)
+  customer_car_tickets = paginate(query, service_tickets_schema, order_by=TICKET_ORDER)
   if not customer_car_tickets['items']:
     return jsonify({'message': 'No service tickets associated with this car'}), 200
-  return jsonify(customer_car_tickets['items']), 200
+  return jsonify(customer_car_tickets['items']), 200, pagination_headers(customer_car_tickets)
 
 
 # Figured out how to get all service tickets for a customer
 @service_tickets_bp.route('/by-account', methods=['GET'])
-@cache.cached(timeout=1)
 @token_required
+@cached_response(tags=('tickets', 'cars', 'mechanics'))
 def get_customer_service_tickets(user, role):
   check_role(role, ('customer', 'mechanic'))
   if role == 'customer':
-    if not user.cars:
+    if not user.instance.cars:
       return jsonify({'message': 'No cars associated with this account'}), 200
     customer_id = user.id
   elif role == 'mechanic':
@@ -200,14 +356,54 @@ def get_customer_service_tickets(user, role):
     .join(ServiceTicket.car)
     .join(Car.customer)
     .where(Customer.id == customer_id)
-    .order_by(ServiceTicket.created_at.desc())
   )
-  customer_tickets = paginate(query, service_tickets_schema)
+  customer_tickets = paginate(query, service_tickets_schema, order_by=TICKET_ORDER)
   if not customer_tickets['items']:
     return jsonify({'message': 'No service tickets associated with this account'}), 200
-  return jsonify(customer_tickets['items']), 200
+  return jsonify(customer_tickets['items']), 200, pagination_headers(customer_tickets)
   
 
+# Priced parts list and grand total for one service ticket
+@service_tickets_bp.route('/<int:ticket_id>/invoice', methods=['GET'])
+@token_required
+def get_service_ticket_invoice(user, role, ticket_id):
+  check_role(role, 'mechanic')
+  invoice = get_invoices([ticket_id]).get(ticket_id)
+  if invoice is None:
+    return jsonify({'message': 'Service ticket not found'}), 404
+  return jsonify(invoice), 200
+
+
+# Invoices for several service tickets: /service_tickets/invoices?ids=1&ids=2
+@service_tickets_bp.route('/invoices', methods=['GET'])
+@token_required
+def get_service_ticket_invoices(user, role):
+  check_role(role, 'mechanic')
+  MAX_INVOICES = 100
+  ticket_ids = request.args.getlist('ids', type=int)
+  if not ticket_ids or len(ticket_ids) > MAX_INVOICES:
+    return jsonify({'message': f'Provide between 1 and {MAX_INVOICES} service ticket ids'}), 400
+  invoices = get_invoices(ticket_ids)
+  missing_tickets = sorted(set(ticket_ids) - set(invoices))
+  if missing_tickets:
+    ids_string = ", ".join(map(str, missing_tickets))
+    return jsonify({'message': f'Service ticket(s) not found for ID(s): {ids_string}'}), 404
+  return jsonify([invoices[ticket_id] for ticket_id in sorted(invoices)]), 200
+
+
+## Item name for the response message, checking the ticket in the same query
+def get_item_name(ticket_id, item_id):
+  row = db.session.execute(
+    select(
+      Inventory.name,
+      select(ServiceTicket.id).where(ServiceTicket.id == ticket_id).scalar_subquery()
+    ).where(Inventory.id == item_id)
+  ).first()
+  if row is None or row[1] is None:
+    abort(404, description='Requested object not found')
+  return row[0]
+
+
 @service_tickets_bp.route(
   '/<int:ticket_id>/add-item/<int:item_id>/count/<int:count>',
   methods=['PATCH']
@@ -216,24 +412,12 @@ def get_customer_service_tickets(user, role):
 @token_required
 def add_item_service_ticket(user, role, ticket_id, item_id, count):
   check_role(role, 'mechanic')
-  item = get_or_404(Inventory, item_id)
-  ticket = get_or_404(ServiceTicket, ticket_id)
-  sti = db.session.get(
-    ServiceTicketInventory,
-    {'service_ticket_id': ticket_id, 'inventory_id': item_id}
-  )
-  if sti:
-    sti.quantity += count
-  else:
-    sti = ServiceTicketInventory(
-      service_ticket_id=ticket_id,
-      inventory_id=item_id,
-      quantity=count
-    )
-    db.session.add(sti)
+  item_name = get_item_name(ticket_id, item_id)
+  quantity = add_ticket_part(ticket_id, item_id, count)
   db.session.commit()
+  invalidate_tags(f'ticket:{ticket_id}')
   return jsonify(
-    {'message': f"{item.name} added to service ticket {ticket.id}. {item.name}'s current quantity: {sti.quantity}"}
+    {'message': f"{item_name} added to service ticket {ticket_id}. {item_name}'s current quantity: {quantity}"}
   ), 200
 
 
@@ -245,23 +429,59 @@ def add_item_service_ticket(user, role, ticket_id, item_id, count):
 @token_required
 def remove_item_service_ticket(user, role, ticket_id, item_id):
   check_role(role, 'mechanic')
-  item = get_or_404(Inventory, item_id)
-  ticket = get_or_404(ServiceTicket, ticket_id)
-  sti = db.session.get(
-    ServiceTicketInventory,
-    {'service_ticket_id': ticket_id, 'inventory_id': item_id}
-  )
-  if not sti:
-    return jsonify({'message': f'{item.name} is not on service ticket {ticket.id}'}), 400
-  else:
-    sti.quantity -= 1
-    if sti.quantity <= 0:
-      db.session.delete(sti)
-      db.session.commit()
-      return jsonify(
-        {'message': f"{item.name} removed from service ticket {ticket.id}. {item.name}'s current quantity: {sti.quantity}"}
-      ), 200
+  item_name = get_item_name(ticket_id, item_id)
+  quantity = remove_ticket_part(ticket_id, item_id)
+  if quantity is None:
+    return jsonify({'message': f'{item_name} is not on service ticket {ticket_id}'}), 400
   db.session.commit()
+  invalidate_tags(f'ticket:{ticket_id}')
   return jsonify(
-    {'message': f"{item.name} removed from service ticket {ticket.id}. {item.name}'s current quantity: {sti.quantity}"}
-  ), 200
\ No newline at end of file
+    {'message': f"{item_name} removed from service ticket {ticket_id}. {item_name}'s current quantity: {quantity}"}
+  ), 200
+
+
+# Add several parts to a service ticket at once
+@service_tickets_bp.route('/<int:ticket_id>/items', methods=['PATCH'])
+@limiter.limit('5 per minute')
+@token_required
+def add_items_service_ticket(user, role, ticket_id):
+  check_role(role, 'mechanic')
+  data = load_request_data(ticket_parts_schema, model_class=None) # type: ignore
+  
+  ## The same item listed twice is added up rather than rejected
+  quantities = Counter()
+  for part in data['items']:
+    quantities[part['inventory_id']] += part['quantity']
+  
+  ## Check the ticket and every item in one query
+  rows = db.session.execute(union_all(
+    select(literal('ticket'), ServiceTicket.id).where(ServiceTicket.id == ticket_id),
+    select(literal('item'), Inventory.id).where(Inventory.id.in_(quantities))
+  )).all()
+  if ('ticket', ticket_id) not in rows:
+    return jsonify({'message': 'Service ticket not found'}), 404
+  missing_items = sorted(set(quantities) - {item_id for kind, item_id in rows if kind == 'item'})
+  if missing_items:
+    ids_string = ", ".join(map(str, missing_items))
+    return jsonify({'message': f'Inventory item(s) not found for ID(s): {ids_string}'}), 404
+  
+  upsert_ticket_parts(ticket_id, quantities)
+  db.session.commit()
+  invalidate_tags(f'ticket:{ticket_id}')
+  
+  parts = db.session.execute(
+    select(Inventory.id, Inventory.name, ServiceTicketInventory.quantity)
+    .join(ServiceTicketInventory, ServiceTicketInventory.inventory_id == Inventory.id)
+    .where(
+      ServiceTicketInventory.service_ticket_id == ticket_id,
+      Inventory.id.in_(quantities)
+    )
+    .order_by(Inventory.id)
+  ).all()
+  return jsonify({
+    'message': f'{len(parts)} item(s) added to service ticket {ticket_id}',
+    'items': [
+      {'inventory_id': item_id, 'name': name, 'quantity': quantity}
+      for item_id, name, quantity in parts
+    ]
+  }), 200
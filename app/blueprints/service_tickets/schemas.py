@@ -1,6 +1,6 @@
 from app.extensions import ma
 from app.models import ServiceTicket
-from marshmallow import fields
+from marshmallow import fields, validate
 from ..cars.schemas import CarSchema
     
 class ServiceTicketSchema(ma.SQLAlchemyAutoSchema):
@@ -24,4 +24,26 @@ class EditTicketMechsSchema(ma.Schema):
   add_mech_ids = fields.List(fields.Int())
   remove_mech_ids = fields.List(fields.Int())
   
-edit_ticket_mechs_schema = EditTicketMechsSchema()
\ No newline at end of file
+edit_ticket_mechs_schema = EditTicketMechsSchema()
+
+
+class BulkEditTicketMechsSchema(ma.Schema):
+  # {ticket_id: {add_mech_ids: [...], remove_mech_ids: [...]}}
+  tickets = fields.Dict(
+    keys=fields.Int(),
+    values=fields.Nested(EditTicketMechsSchema),
+    required=True
+  )
+
+bulk_edit_ticket_mechs_schema = BulkEditTicketMechsSchema()
+
+
+class TicketPartSchema(ma.Schema):
+  inventory_id = fields.Int(required=True)
+  quantity = fields.Int(required=True, validate=validate.Range(min=1))
+
+
+class TicketPartsSchema(ma.Schema):
+  items = fields.List(fields.Nested(TicketPartSchema), required=True, validate=validate.Length(min=1))
+
+ticket_parts_schema = TicketPartsSchema()
\ No newline at end of file
@@ -0,0 +1,94 @@
+import click
+from flask.cli import with_appcontext
+from app.models import db, Mechanic
+from app.utils.importer import IMPORTS, FORMATS, import_rows
+from app.utils.caching import invalidate_tags
+from app.utils.search import rebuild_search_index
+from app.utils.seeding import DISTRIBUTIONS, CHUNK_SIZE, SEED_UNTIL, SeedPlan, is_empty, seed_database
+from app.extensions import cache
+import time
+
+
+@click.command('repair-ticket-counts')
+@with_appcontext
+def repair_ticket_counts():
+  """Recompute every mechanic's ticket_count from service ticket assignments."""
+  updated = Mechanic.recount_tickets()
+  db.session.commit()
+  invalidate_tags('mechanics')
+  click.echo(f'Recounted tickets for {updated} mechanic(s).')
+
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(list(IMPORTS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to csv for .csv files, ndjson otherwise.')
+@click.option('--chunk-size', type=int, help='Rows validated and written per transaction.')
+@with_appcontext
+def import_data(kind, source, fmt, chunk_size):
+  """Stream customers, cars or inventory from an NDJSON or CSV file (- for stdin)."""
+  fmt = fmt or ('csv' if source.name.endswith('.csv') else 'ndjson')
+  result = import_rows(kind, source, fmt, chunk_size)
+  if result.inserted:
+    invalidate_tags(kind)
+  for error in result.errors:
+    click.echo(f"line {error['line']}: {error['errors']}", err=True)
+  click.echo(f'Imported {result.inserted} {kind} row(s), {result.error_count} rejected.')
+
+
+@click.command('seed')
+@click.option('--customers', type=int, default=10000, show_default=True, help='Everything else scales from this.')
+@click.option('--cars-per-customer', type=float, default=1.5, show_default=True)
+@click.option('--tickets-per-car', type=float, default=3.0, show_default=True)
+@click.option('--mechanics-per-ticket', type=int, default=2, show_default=True, help='Average, at least 1.')
+@click.option('--parts-per-ticket', type=int, default=2, show_default=True, help='Average, can be 0.')
+@click.option('--mechanics', type=int, help='Defaults to one per 50 customers.')
+@click.option('--items', type=int, default=500, show_default=True, help='Inventory parts.')
+@click.option('--days', type=int, default=730, show_default=True, help='Tickets are spread over this many days.')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=SEED_UNTIL.strftime('%Y-%m-%d'),
+  show_default=True, help='Date the newest ticket is created (UTC).')
+@click.option('--distribution', type=click.Choice(DISTRIBUTIONS), default='uniform', show_default=True,
+  help='skewed concentrates tickets on a few cars, mechanics and parts.')
+@click.option('--seed', type=int, default=1, show_default=True, help='Same seed, same rows.')
+@click.option('--password', default='password', show_default=True, help='Password of every seeded account.')
+@click.option('--chunk-size', type=int, default=CHUNK_SIZE, show_default=True, help='Rows per INSERT batch.')
+@click.option('--reset', is_flag=True, help='Drop and recreate all tables first.')
+@with_appcontext
+def seed(customers, cars_per_customer, tickets_per_car, mechanics_per_ticket, parts_per_ticket, mechanics, items,
+    days, until, distribution, seed, password, chunk_size, reset):
+  """Bulk-generate deterministic customers, cars, tickets, assignments and parts."""
+  if reset:
+    db.drop_all()
+    db.create_all()
+  elif not is_empty():
+    raise click.UsageError('The database already has data; pass --reset to replace it.')
+  plan = SeedPlan(customers, cars_per_customer, tickets_per_car, mechanics_per_ticket, parts_per_ticket,
+    mechanics, items, days, distribution, seed, password, until)
+  started = time.perf_counter()
+  def progress(table, written):
+    if written % (chunk_size * 10) == 0:
+      click.echo(f'  {table}: {written}')
+  counts = seed_database(plan, chunk_size, progress)
+  cache.clear()
+  for table, count in counts.items():
+    click.echo(f'{table:<26} {count:>10}')
+  click.echo(f'Seeded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s.')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+  """Create the full-text search index if missing and index every existing ticket, customer and car."""
+  try:
+    rebuild_search_index()
+  except NotImplementedError as error:
+    raise click.ClickException(str(error))
+  db.session.commit()
+  click.echo('Search index rebuilt.')
+
+
+def register_commands(app):
+  app.cli.add_command(repair_ticket_counts)
+  app.cli.add_command(import_data)
+  app.cli.add_command(seed)
+  app.cli.add_command(rebuild_search_index_command)
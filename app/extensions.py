@@ -5,6 +5,7 @@ from flask_limiter.util import get_remote_address
 
 ma = Marshmallow()
 
-cache = Cache(config={'CACHE_TYPE': 'SimpleCache'})
+# Backend comes from CACHE_TYPE in each config class
+cache = Cache()
 
 limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
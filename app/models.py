@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column
-from sqlalchemy import ForeignKey, String, Table, Column, DateTime, Integer, CheckConstraint, Float, func, select
+from app.utils.routing import RoutingSession
+from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column, Session, attributes
+from sqlalchemy import ForeignKey, String, Table, Column, DateTime, Integer, CheckConstraint, Float, Index, event, func, inspect, select, update
+from collections import defaultdict
 from typing import List
 from dataclasses import dataclass
 from datetime import datetime, timezone
@@ -9,7 +11,19 @@ from datetime import datetime, timezone
 class Base(DeclarativeBase):
   pass
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
+
+
+def _ticket_created_at(context):
+  # Only relationship writes (ticket.mechanics.append) leave it out, since the ORM can't pass it:
+  # one lookup per INSERT covers every row it writes. Core writes pass the ticket's created_at.
+  dates = getattr(context, 'ticket_dates', None)
+  if dates is None:
+    ticket_ids = {params['service_ticket_id'] for params in context.compiled_parameters}
+    dates = context.ticket_dates = dict(context.connection.execute(
+      select(ServiceTicket.id, ServiceTicket.created_at).where(ServiceTicket.id.in_(ticket_ids))
+    ).all())
+  return dates[context.get_current_parameters()['service_ticket_id']]
 
 
 # Association Tables
@@ -17,7 +31,11 @@ service_ticket_mechanic = Table(
   'service_ticket_mechanic',
   Base.metadata,
   Column('service_ticket_id', ForeignKey('service_tickets.id'), primary_key=True),
-  Column('mechanic_id', ForeignKey('mechanics.id'), primary_key=True)
+  Column('mechanic_id', ForeignKey('mechanics.id'), primary_key=True),
+  # Copy of the ticket's created_at, so one mechanic's tickets come newest first from the index below
+  Column('ticket_created_at', DateTime(timezone=True), nullable=False, default=_ticket_created_at),
+  # The primary key covers lookups by ticket; this one covers lookups by mechanic, in ticket order
+  Index('ix_service_ticket_mechanic_mechanic_id', 'mechanic_id', 'ticket_created_at', 'service_ticket_id')
 )
 
 
@@ -34,6 +52,10 @@ class Customer(Base):
     back_populates='customer',
     cascade='all, delete-orphan'
   )
+  
+  __table_args__ = (
+    Index('ix_customers_name', 'name', 'id'),
+  )
 
 
 @dataclass
@@ -51,6 +73,17 @@ class Car(Base):
     cascade='all, delete-orphan'
   )
   
+  __table_args__ = (
+    Index('ix_cars_customer_id', 'customer_id', 'vin'),
+    # One per make/model/year filter prefix, each ending in vin so the page comes out in order
+    Index('ix_cars_make', 'make', 'vin'),
+    Index('ix_cars_make_model', 'make', 'model', 'vin'),
+    Index('ix_cars_make_model_year', 'make', 'model', 'year', 'vin'),
+    Index('ix_cars_model', 'model', 'vin'),
+    Index('ix_cars_model_year', 'model', 'year', 'vin'),
+    Index('ix_cars_year', 'year', 'vin'),
+  )
+  
   
 @dataclass
 class ServiceTicket(Base):
@@ -71,6 +104,14 @@ class ServiceTicket(Base):
     back_populates='service_tickets',
     cascade='all, delete-orphan'
   )
+  __table_args__ = (
+    Index('ix_service_tickets_created_at', 'created_at', 'id'),
+    Index('ix_service_tickets_car_vin', 'car_vin', 'created_at', 'id'),
+  )
+  
+  # Relationship path behind the customer property, used by app.utils.loaders to eager-load it
+  __eager_paths__ = {'customer': ('car', 'customer')}
+
   @property
   def customer(self):
     return self.car.customer if self.car else None
@@ -91,34 +132,29 @@ class Mechanic(Base):
     back_populates='mechanics'
   )
   
+  # Kept in step with service_ticket_mechanic by the before_flush listener below
+  ticket_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+  
+  __table_args__ = (
+    Index('ix_mechanics_ticket_count', 'ticket_count', 'id'),
+    Index('ix_mechanics_name', 'name', 'id'),
+    Index('ix_mechanics_salary', 'salary', 'id'),
+    Index('ix_mechanics_email', 'email'),
+  )
+  
   @classmethod
-  def get_ticket_counts(cls):
-    # sub_query: temporary table with mechanic_id, and ticket_count columns
-    sub_query = (
-      select(
-        service_ticket_mechanic.c.mechanic_id,
-        func.count(ServiceTicket.id).label('ticket_count')
-      )
-      .join(ServiceTicket, ServiceTicket.id == service_ticket_mechanic.c.service_ticket_id)
-      .group_by(service_ticket_mechanic.c.mechanic_id)
-      .subquery()
+  def recount_tickets(cls):
+    # Rebuilds every ticket_count from the association table (backfill / drift repair)
+    counted = (
+      select(func.count())
+      .select_from(service_ticket_mechanic)
+      .where(service_ticket_mechanic.c.mechanic_id == cls.id)
+      .scalar_subquery()
     )
-    ticket_count_col = func.coalesce(sub_query.c.ticket_count, 0)
-    base_query = (
-      select(cls, ticket_count_col.label('ticket_count'))
-      .outerjoin(sub_query, sub_query.c.mechanic_id == cls.id)
+    result = db.session.execute(
+      update(cls).values(ticket_count=counted).execution_options(synchronize_session=False)
     )
-    
-    query = base_query.order_by(ticket_count_col.desc())
-    
-    results = db.session.execute(query).all()
-    
-    mechanics = []
-    for mech, count in results:
-      mech.ticket_count = count
-      mechanics.append(mech)
-    
-    return query, mechanics, ticket_count_col, sub_query, base_query
+    return result.rowcount
   
   
 @dataclass
@@ -131,6 +167,11 @@ class Inventory(Base):
     back_populates='inventory',
     cascade='all, delete-orphan'
   )
+  
+  __table_args__ = (
+    Index('ix_inventory_name', 'name', 'id'),
+    Index('ix_inventory_price', 'price', 'id'),
+  )
 
 
 class ServiceTicketInventory(Base):
@@ -148,4 +189,37 @@ class ServiceTicketInventory(Base):
   service_tickets: Mapped['ServiceTicket'] = relationship(
     back_populates='parts'
   )
-  inventory: Mapped['Inventory'] = relationship(back_populates='service_tickets')
\ No newline at end of file
+  inventory: Mapped['Inventory'] = relationship(back_populates='service_tickets')
+  
+  __table_args__ = (
+    Index('ix_service_ticket_inventory_inventory_id', 'inventory_id'),
+  )
+
+
+# Keep Mechanic.ticket_count in the same transaction as the assignment changes
+@event.listens_for(Session, 'before_flush')
+def update_mechanic_ticket_counts(session, flush_context, instances):
+  # Keyed by instance state: the dataclass models are unhashable
+  deltas = defaultdict(int)
+  for ticket in session.new | session.dirty:
+    if isinstance(ticket, ServiceTicket):
+      history = attributes.get_history(ticket, 'mechanics', passive=attributes.PASSIVE_NO_INITIALIZE)
+      for mechanic in history.added:
+        deltas[inspect(mechanic)] += 1
+      for mechanic in history.deleted:
+        deltas[inspect(mechanic)] -= 1
+  for ticket in session.deleted:
+    if isinstance(ticket, ServiceTicket):
+      # Every persisted assignment goes away with the ticket
+      history = attributes.get_history(ticket, 'mechanics')
+      for mechanic in [*history.unchanged, *history.deleted]:
+        deltas[inspect(mechanic)] -= 1
+  for state, delta in deltas.items():
+    mechanic = state.obj()
+    if not delta or mechanic is None or state.deleted or mechanic in session.deleted:
+      continue
+    if state.pending or state.transient:
+      mechanic.ticket_count = (mechanic.ticket_count or 0) + delta
+    else:
+      # Relative UPDATE so concurrent requests don't overwrite each other
+      mechanic.ticket_count = Mechanic.ticket_count + delta
@@ -0,0 +1,86 @@
+from functools import wraps
+from flask import request, make_response
+from urllib.parse import urlencode
+from app.extensions import cache
+from app.utils.routing import replica_read_may_be_stale
+import hashlib
+import uuid
+
+
+# Each tag maps to a random version token. Response keys embed the tokens of their tags,
+# so replacing a token orphans every entry that carried it. Tokens never expire on their own;
+# if one gets evicted anyway, a fresh token only causes misses, never stale hits.
+def _tag_key(tag):
+  return f'tag:{tag}'
+
+
+def tag_versions(tags):
+  keys = [_tag_key(tag) for tag in tags]
+  versions = cache.get_many(*keys) if keys else []
+  missing = {}
+  for i, (key, version) in enumerate(zip(keys, versions)):
+    if version is None:
+      versions[i] = missing[key] = uuid.uuid4().hex
+  if missing:
+    cache.set_many(missing, timeout=0)
+  return versions
+
+
+def invalidate_tags(*tags):
+  if tags:
+    cache.set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=0)
+
+
+def _resolve_tags(tags, user, role, kwargs):
+  if callable(tags):
+    return list(tags(user, role, **kwargs))
+  return [tag.format(user=user, role=role, **kwargs) for tag in tags]
+
+
+def response_cache_key(user, role, tags, kwargs):
+  query = urlencode(sorted(request.args.items(multi=True)))
+  versions = tag_versions(_resolve_tags(tags, user, role, kwargs))
+  raw = '|'.join([request.path, query, role, str(user.id), *versions])
+  return 'view:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _body_etag(body):
+  return hashlib.sha1(body).hexdigest()
+
+
+def _with_etag(response, etag):
+  response.set_etag(etag, weak=True)
+  # Per-user content that clients should revalidate before reuse
+  response.headers['Cache-Control'] = 'private, no-cache'
+  return response
+
+
+# Goes below @token_required: the key covers the principal, role, path and normalized query
+# string, and tags are format strings over the route kwargs (or a callable returning tags).
+# The weak ETag is a hash of the body, so it changes whenever the data does, even after a write
+# path that forgot invalidate_tags. A matching If-None-Match on a cached entry is answered with
+# 304 before the view, its queries or the serializer run; otherwise once the view has rendered.
+def cached_response(timeout=300, tags=()):
+  def decorator(f):
+    @wraps(f)
+    def decorated(user, role, *args, **kwargs):
+      key = response_cache_key(user, role, tags, kwargs)
+      cached = cache.get(key)
+      if cached is not None:
+        body, status, headers = cached
+        etag = _body_etag(body)
+        if request.if_none_match.contains_weak(etag):
+          return _with_etag(make_response('', 304), etag)
+        return _with_etag(make_response(body, status, headers), etag)
+      response = make_response(f(user, role, *args, **kwargs))
+      # A replica read right after a write may predate it; caching it would outlive the lag
+      if response.status_code == 200 and not replica_read_may_be_stale():
+        body = response.get_data()
+        cache.set(key, (body, response.status_code, list(response.headers.items())), timeout=timeout)
+        etag = _body_etag(body)
+        if request.if_none_match.contains_weak(etag):
+          return _with_etag(make_response('', 304), etag)
+        _with_etag(response, etag)
+      return response
+    return decorated
+  return decorator
@@ -0,0 +1,26 @@
+from flask import request, current_app
+import gzip
+
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain')
+
+
+# after_request hook: gzip buffered bodies of at least COMPRESS_MIN_SIZE bytes for clients that accept it.
+# Streamed responses (e.g. exports) are left alone so they keep flowing row by row.
+def compress_response(response):
+  response.vary.add('Accept-Encoding')
+  if (
+    response.status_code != 200
+    or response.is_streamed
+    or response.direct_passthrough
+    or 'Content-Encoding' in response.headers
+    or response.mimetype not in COMPRESSIBLE_TYPES
+    or 'gzip' not in request.accept_encodings
+  ):
+    return response
+  body = response.get_data()
+  if len(body) < current_app.config.get('COMPRESS_MIN_SIZE', 500):
+    return response
+  response.set_data(gzip.compress(body, compresslevel=current_app.config.get('COMPRESS_LEVEL', 6)))
+  response.headers['Content-Encoding'] = 'gzip'
+  return response
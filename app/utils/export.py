@@ -0,0 +1,65 @@
+from app.models import db
+from app.utils.loaders import with_loader_plan
+from app.utils.serializers import dump
+from marshmallow import fields
+import csv
+import io
+import json
+
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_BATCH = 500
+
+
+# Rows are fetched EXPORT_BATCH at a time through a server-side cursor (yield_per), each batch's
+# relationships are loaded by the schema's loader plan, and nothing is kept once it is written,
+# so memory stays flat however many rows the query returns
+def dump_batches(query, schema):
+  query = with_loader_plan(query, schema).execution_options(yield_per=EXPORT_BATCH)
+  for batch in db.session.scalars(query).partitions():
+    yield dump(schema, batch)
+
+
+def flatten(row, prefix=''):
+  # {'car': {'vin': 1}, 'mechanics': ['a', 'b']} -> {'car.vin': 1, 'mechanics': 'a; b'}
+  flat = {}
+  for key, value in row.items():
+    if isinstance(value, dict):
+      flat.update(flatten(value, f'{prefix}{key}.'))
+    elif isinstance(value, list):
+      flat[f'{prefix}{key}'] = '; '.join(json.dumps(item) if isinstance(item, dict) else str(item) for item in value)
+    else:
+      flat[f'{prefix}{key}'] = value
+  return flat
+
+
+def stream_ndjson(batches):
+  for batch in batches:
+    yield ''.join(json.dumps(row) + '\n' for row in batch)
+
+
+def csv_columns(schema, prefix=''):
+  # Header in the schema's field order, nested objects spelled out like flatten() does
+  columns = []
+  for name, field in schema.dump_fields.items():
+    key = field.data_key or name
+    if isinstance(field, fields.Nested) and not field.many:
+      columns.extend(csv_columns(field.schema, f'{prefix}{key}.'))
+    else:
+      columns.append(f'{prefix}{key}')
+  return columns
+
+
+def stream_csv(batches, schema):
+  # The header comes from the schema, so an empty export still has one and every export the same columns
+  buffer = io.StringIO()
+  writer = csv.DictWriter(buffer, fieldnames=csv_columns(schema), extrasaction='ignore')
+  writer.writeheader()
+  for batch in batches:
+    writer.writerows(flatten(row) for row in batch)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+  # Nothing was exported: send the header on its own
+  if buffer.tell():
+    yield buffer.getvalue()
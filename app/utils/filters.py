@@ -0,0 +1,53 @@
+from flask import abort, request
+from datetime import datetime, timezone
+import math
+
+
+# Declarative query-string filters for the list routes: {param: (parse, clause)}
+# parse turns the raw value into a Python value (ValueError -> 400) and clause builds the WHERE
+# condition, so filtering happens in the SELECT, its COUNT and its cursor pages, not in the client.
+# Routes declare theirs next to their sort order, e.g. {'min_price': at_least(Inventory.price, parse_number)}
+
+
+def parse_int(value):
+  return int(value)
+
+
+def parse_number(value):
+  number = float(value)
+  if not math.isfinite(number):
+    raise ValueError(value)
+  return number
+
+
+def parse_datetime(value):
+  # ISO 8601 date or timestamp; naive values are UTC, like the stored created_at
+  moment = datetime.fromisoformat(value)
+  if moment.tzinfo is None:
+    return moment.replace(tzinfo=timezone.utc)
+  return moment.astimezone(timezone.utc)
+
+
+def equals(column, parse=str):
+  return parse, lambda value: column == value
+
+
+def at_least(column, parse):
+  return parse, lambda value: column >= value
+
+
+def at_most(column, parse):
+  return parse, lambda value: column <= value
+
+
+def apply_filters(query, filters):
+  for param, (parse, clause) in filters.items():
+    raw = request.args.get(param)
+    if raw is None:
+      continue
+    try:
+      value = parse(raw.strip())
+    except ValueError:
+      abort(400, description=f'Invalid {param} value')
+    query = query.where(clause(value))
+  return query
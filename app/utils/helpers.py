@@ -1,11 +1,23 @@
 from .. import db
-from flask import abort, request, jsonify
+from flask import abort, request, jsonify, current_app
 from marshmallow import ValidationError
-from sqlalchemy import select
+from sqlalchemy import Column, select, and_, or_, func
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
 from werkzeug.exceptions import NotFound
 from app.utils.jwt_utils import encode_token
+from app.utils.passwords import verify_password, verify_unknown_user, needs_rehash, hash_password
+from app.utils.loaders import with_loader_plan
+from app.utils.serializers import dump
+from app.extensions import cache
 from app.blueprints.authentication.schemas import login_schema
 from typing import Dict, cast, Any, Type, TypeVar
+from datetime import datetime
+from urllib.parse import urlencode
+import base64
+import hashlib
+import json
+import math
 
 
 
@@ -37,23 +49,197 @@ def update_field_values(obj, data):
       setattr(obj, key, value)
   
     
-def paginate(query, schema):
+# exact: COUNT(*) on every page, cached: COUNT(*) reused per query shape for PAGINATION_COUNT_TTL, none: no count
+COUNT_MODES = ('exact', 'cached', 'none')
+
+
+def paginate(query, schema, order_by=None):
+  # order_by doubles as the keyset for cursor mode, so it should end with a unique column
   try:
     page = request.args.get('page', default=1, type=int)
     per_page = request.args.get('per_page', default=10, type=int)
     MAX_PER_PAGE = 100
     per_page = min(per_page, MAX_PER_PAGE)
-    results = db.paginate(query, page=page, per_page=per_page)
+    query = with_loader_plan(query, schema)
+    if order_by is not None:
+      if 'cursor' in request.args:
+        return paginate_keyset(query, schema, order_by, per_page)
+      query = query.order_by(*order_by)
+    count_mode = request.args.get(
+      'count',
+      default=current_app.config.get('PAGINATION_COUNT', 'exact'),
+      type=str
+    )
+    if count_mode not in COUNT_MODES:
+      raise ValueError(count_mode)
+    if page < 1 or per_page < 1:
+      raise NotFound()
+    # One extra row tells us whether there is a next page without counting
+    items = db.session.execute(
+      query.limit(per_page + 1).offset((page - 1) * per_page)
+    ).scalars().all()
+    if not items and page != 1:
+      raise NotFound()
   except ValueError:
-    abort(400, description='Invalid page or per_page value')
+    abort(400, description='Invalid page, per_page or count value')
   except NotFound:
     abort(404, description='Page not found')
+
+  has_next = len(items) > per_page
+  items = items[:per_page]
+  if not has_next:
+    # The last page already tells us the total
+    total = (page - 1) * per_page + len(items)
+  elif count_mode == 'exact':
+    total = count_rows(query)
+  elif count_mode == 'cached':
+    total = cached_count_rows(query)
+  else:
+    total = None
   return {
-    'items': schema.dump(results.items),
-    'total': results.total,
-    'page': results.page,
-    'pages': results.pages
+    'items': dump(schema, items),
+    'total': total,
+    'page': page,
+    'pages': math.ceil(total / per_page) if total is not None else None,
+    'has_next': has_next
   }
+
+
+def count_rows(query):
+  count_query = select(func.count()).select_from(query.order_by(None).subquery())
+  return db.session.execute(count_query).scalar()
+
+
+def cached_count_rows(query):
+  # Keyed by the compiled SQL and its bound values, so each filter gets its own entry
+  compiled = query.order_by(None).compile(dialect=db.session.get_bind().dialect)
+  shape = f'{compiled}|{sorted(compiled.params.items(), key=lambda item: item[0])!r}'
+  key = 'count:' + hashlib.sha1(shape.encode()).hexdigest()
+  total = cache.get(key)
+  if total is None:
+    total = count_rows(query)
+    cache.set(key, total, timeout=current_app.config.get('PAGINATION_COUNT_TTL', 60))
+  return total
+
+
+def _keyset_columns(order_by):
+  # Returns (column, descending) pairs from plain columns or column.asc()/.desc()
+  columns = []
+  for key in order_by:
+    if isinstance(key, UnaryExpression) and key.modifier in (operators.desc_op, operators.asc_op):
+      columns.append((key.element, key.modifier is operators.desc_op))
+    else:
+      columns.append((key, False))
+  return columns
+
+
+def _nullable(column):
+  expression = getattr(column, 'expression', column)
+  return isinstance(expression, Column) and expression.nullable
+
+
+def _keyset_order(columns):
+  # NULL keys sort after every value in both directions, whatever the dialect's default
+  order = []
+  for column, descending in columns:
+    if _nullable(column):
+      order.append(column.is_(None))
+    order.append(column.desc() if descending else column)
+  return order
+
+
+def encode_cursor(values):
+  values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+  return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+  except ValueError:
+    abort(400, description='Invalid cursor')
+  if not isinstance(values, list) or len(values) != len(columns):
+    abort(400, description='Invalid cursor')
+  decoded = []
+  for (column, _), value in zip(columns, values):
+    if isinstance(value, (list, dict)) or (value is None and not _nullable(column)):
+      abort(400, description='Invalid cursor')
+    try:
+      python_type = column.type.python_type
+    except NotImplementedError:
+      python_type = None
+    if python_type is datetime and isinstance(value, str):
+      try:
+        value = datetime.fromisoformat(value)
+      except ValueError:
+        abort(400, description='Invalid cursor')
+    decoded.append(value)
+  return decoded
+
+
+def paginate_keyset(query, schema, order_by, per_page):
+  if per_page < 1:
+    abort(404, description='Page not found')
+  columns = _keyset_columns(order_by)
+  query = query.order_by(*_keyset_order(columns))
+  cursor = request.args.get('cursor', default='', type=str)
+  if cursor:
+    values = decode_cursor(cursor, columns)
+    # Rows strictly after the cursor: (a > x) OR (a = x AND b > y) ..., flipped for descending keys
+    # A NULL key sorts last, so nothing is past it and every NULL is past a value
+    after = []
+    for i, (column, descending) in enumerate(columns):
+      equal = [col.is_(None) if value is None else col == value for (col, _), value in zip(columns[:i], values[:i])]
+      if values[i] is None:
+        continue
+      past = column < values[i] if descending else column > values[i]
+      if _nullable(column):
+        past = or_(past, column.is_(None))
+      after.append(and_(*equal, past))
+    query = query.where(or_(*after))
+
+  # Fetch the sort key alongside each row and one extra row to know if another page exists
+  query = query.add_columns(*[column for column, _ in columns]).limit(per_page + 1)
+  rows = db.session.execute(query).all()
+  next_cursor = None
+  if len(rows) > per_page:
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1][-len(columns):])
+  return {
+    'items': dump(schema, [row[0] for row in rows]),
+    'total': None,
+    'page': None,
+    'pages': None,
+    'next_cursor': next_cursor
+  }
+
+
+def _page_url(**changes):
+  args = request.args.to_dict()
+  args.update(changes)
+  return f'{request.base_url}?{urlencode(args)}'
+
+
+def pagination_headers(results):
+  headers = {}
+  links = []
+  if results.get('next_cursor'):
+    headers['X-Next-Cursor'] = results['next_cursor']
+    links.append((_page_url(cursor=results['next_cursor']), 'next'))
+  page = results.get('page')
+  if page is not None:
+    if results.get('has_next'):
+      links.append((_page_url(page=page + 1), 'next'))
+    if page > 1:
+      links.append((_page_url(page=page - 1), 'prev'))
+    links.append((_page_url(page=1), 'first'))
+    if results.get('pages'):
+      links.append((_page_url(page=results['pages']), 'last'))
+  if results.get('total') is not None:
+    headers['X-Total-Count'] = str(results['total'])
+  if links:
+    headers['Link'] = ', '.join(f'<{url}>; rel="{rel}"' for url, rel in links)
+  return headers
   
   
 def handle_login(model, role):
@@ -66,8 +252,15 @@ def handle_login(model, role):
     abort(400, description=e.messages)
   query = select(model).where(model.email == email)
   user = db.session.execute(query).scalar_one_or_none()
-  if not user or user.password != password:
+  if not user:
+    verify_unknown_user(password)
+    return jsonify({'message': 'Incorrect email or password'}), 401
+  if not verify_password(user.password, password):
     return jsonify({'message': 'Incorrect email or password'}), 401
+  # Upgrade plain or outdated hashes now that we have the password in hand
+  if needs_rehash(user.password):
+    user.password = hash_password(password)
+    db.session.commit()
   auth_token = encode_token(user.id, role=role)
   response = {
     'status': 'success',
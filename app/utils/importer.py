@@ -0,0 +1,190 @@
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from itertools import islice
+from app.models import db, Customer, Car, Inventory
+from app.blueprints.customers.schemas import CustomerSchema
+from app.blueprints.cars.schemas import CarSchema
+from app.blueprints.inventory.schemas import InventorySchema
+from app.utils.passwords import is_hashed, hash_passwords
+from app.utils.seeding import reset_sequences
+import csv
+import io
+import json
+
+
+# kind -> (model, schema used to validate each row, column that must be unique)
+IMPORTS = {
+  'customers': (Customer, CustomerSchema(load_instance=False, exclude=('cars',)), 'email'),
+  'cars': (Car, CarSchema(load_instance=False), 'vin'),
+  'inventory': (Inventory, InventorySchema(load_instance=False), 'name'),
+}
+FORMATS = ('ndjson', 'csv')
+MAX_REPORTED_ERRORS = 100
+
+
+def read_rows(stream, fmt):
+  # Yields (line number, row dict or None when the line can't be parsed)
+  if fmt == 'csv':
+    reader = csv.DictReader(stream)
+    for row in reader:
+      yield reader.line_num, row
+  else:
+    for line_num, line in enumerate(stream, start=1):
+      if not line.strip():
+        continue
+      try:
+        row = json.loads(line)
+      except ValueError:
+        row = None
+      yield line_num, row if isinstance(row, dict) else None
+
+
+def _chunks(rows, size):
+  rows = iter(rows)
+  while chunk := list(islice(rows, size)):
+    yield chunk
+
+
+class ImportResult:
+  def __init__(self):
+    self.inserted = 0
+    self.error_count = 0
+    self.errors = []
+
+  def error(self, line, messages):
+    self.error_count += 1
+    if len(self.errors) < MAX_REPORTED_ERRORS:
+      self.errors.append({'line': line, 'errors': messages})
+
+  def to_dict(self):
+    errors = sorted(self.errors, key=lambda error: error['line'])
+    return {'inserted': self.inserted, 'error_count': self.error_count, 'errors': errors}
+
+
+def _validate(kind, chunk, result):
+  model, schema, unique = IMPORTS[kind]
+  # Rows may bring their own id, which has to be free as well
+  key = model.__mapper__.primary_key[0].key
+  valid = {}
+  ids = {}
+  for line, row in chunk:
+    if row is None:
+      result.error(line, {'_schema': ['Invalid JSON object']})
+      continue
+    try:
+      data = schema.load(row)
+    except ValidationError as e:
+      result.error(line, e.messages)
+      continue
+    if data[unique] in valid:
+      result.error(line, {unique: [f'Duplicate {unique} in import']})
+      continue
+    if key != unique and data.get(key) is not None:
+      if data[key] in ids:
+        result.error(line, {key: [f'Duplicate {key} in import']})
+        continue
+      ids[data[key]] = data[unique]
+    valid[data[unique]] = (line, data)
+  if not valid:
+    return []
+
+  ## One query per chunk for rows that already exist, and for cars, owners that don't
+  column = getattr(model, unique)
+  existing = set(db.session.execute(select(column).where(column.in_(valid))).scalars())
+  taken_ids = set()
+  if ids:
+    key_column = getattr(model, key)
+    taken_ids = set(db.session.execute(select(key_column).where(key_column.in_(ids))).scalars())
+  owners = set()
+  if kind == 'cars':
+    owner_ids = {data.get('customer_id') for _, data in valid.values()} - {None}
+    owners = set(db.session.execute(select(Customer.id).where(Customer.id.in_(owner_ids))).scalars())
+
+  rows = []
+  for value, (line, data) in valid.items():
+    if value in existing:
+      result.error(line, {unique: [f'{value} already exists']})
+    elif data.get(key) in taken_ids:
+      result.error(line, {key: [f'{data[key]} already exists']})
+    elif kind == 'cars' and data.get('customer_id') not in owners:
+      result.error(line, {'customer_id': [f"Customer {data.get('customer_id')} not found"]})
+    else:
+      rows.append((line, data))
+  if kind == 'customers':
+    # Hashes exported from another install are kept as is (the fast path for large imports);
+    # plain passwords are hashed in parallel, a chunk at a time
+    plain = [data for _, data in rows if not is_hashed(data['password'])]
+    for data, hashed in zip(plain, hash_passwords([data['password'] for data in plain])):
+      data['password'] = hashed
+  return rows
+
+
+def _copy(table, rows):
+  # COPY streams the whole chunk in one command, much faster than INSERT on Postgres
+  columns = list(rows[0])
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for data in rows:
+    writer.writerow(['' if data[name] is None else data[name] for name in columns])
+  buffer.seek(0)
+  cursor = db.session.connection().connection.cursor()
+  try:
+    cursor.copy_expert(
+      f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+      buffer
+    )
+  finally:
+    cursor.close()
+
+
+def _write_chunk(table, rows):
+  dialect = db.session.get_bind().dialect
+  ## executemany needs the same columns in every row, e.g. only some rows may carry an id
+  groups = {}
+  for data in rows:
+    groups.setdefault(tuple(sorted(data)), []).append(data)
+  for group in groups.values():
+    if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+      _copy(table, group)
+    else:
+      db.session.execute(insert(table), group)
+
+
+# Writes (line, row) pairs and returns how many were written. A constraint the checks above can't
+# see, such as a row another request wrote in the meantime, fails only its own row: the chunk is
+# then written again one row per savepoint and the rejected rows are reported by line.
+def _write(kind, rows, result):
+  table = IMPORTS[kind][0].__table__
+  try:
+    with db.session.begin_nested():
+      _write_chunk(table, [data for _, data in rows])
+    return len(rows)
+  except IntegrityError:
+    pass
+  written = 0
+  for line, data in rows:
+    try:
+      with db.session.begin_nested():
+        db.session.execute(insert(table), [data])
+      written += 1
+    except IntegrityError as e:
+      result.error(line, {'_schema': [f'Conflicts with an existing record: {e.orig}']})
+  return written
+
+
+# Reads rows from a text stream and writes them chunk by chunk, committing each chunk so memory
+# stays bounded by IMPORT_CHUNK_SIZE. Bad rows are reported by line and never block the rest.
+def import_rows(kind, stream, fmt='ndjson', chunk_size=None):
+  chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 1000)
+  result = ImportResult()
+  for chunk in _chunks(read_rows(stream, fmt), chunk_size):
+    rows = _validate(kind, chunk, result)
+    if rows:
+      result.inserted += _write(kind, rows, result)
+      db.session.commit()
+  if result.inserted and db.session.get_bind().dialect.name == 'postgresql':
+    reset_sequences([IMPORTS[kind][0].__table__])
+    db.session.commit()
+  return result
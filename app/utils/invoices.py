@@ -0,0 +1,73 @@
+from sqlalchemy import select, func
+from app.extensions import cache
+from app.models import db, ServiceTicket, ServiceTicketInventory, Inventory
+from app.utils.caching import tag_versions
+
+
+# Invoices are cached per ticket. A key carries the version of its ticket's tag and of the 'prices'
+# tag, so add/remove-item on a ticket only drops that ticket's invoice and a part's new price or name drops them all.
+INVOICE_TIMEOUT = 300
+
+
+def _invoice_keys(ticket_ids):
+  tags = [f'ticket:{ticket_id}' for ticket_id in ticket_ids]
+  *ticket_versions, prices_version = tag_versions([*tags, 'prices'])
+  return {
+    ticket_id: f'invoice:{ticket_id}:{version}:{prices_version}'
+    for ticket_id, version in zip(ticket_ids, ticket_versions)
+  }
+
+
+# One row per part, with the ticket's grand total summed alongside by a window over the same rows.
+# Tickets without parts still return one row (all part columns NULL) so they get an empty invoice.
+def _build_invoices(ticket_ids):
+  line_total = Inventory.price * ServiceTicketInventory.quantity
+  rows = db.session.execute(
+    select(
+      ServiceTicket.id,
+      Inventory.id,
+      Inventory.name,
+      Inventory.price,
+      ServiceTicketInventory.quantity,
+      line_total,
+      func.coalesce(func.sum(line_total).over(partition_by=ServiceTicket.id), 0)
+    )
+    .select_from(ServiceTicket)
+    .outerjoin(ServiceTicketInventory, ServiceTicketInventory.service_ticket_id == ServiceTicket.id)
+    .outerjoin(Inventory, Inventory.id == ServiceTicketInventory.inventory_id)
+    .where(ServiceTicket.id.in_(ticket_ids))
+    .order_by(ServiceTicket.id, Inventory.id)
+  ).all()
+  invoices = {}
+  for ticket_id, item_id, name, price, quantity, line, total in rows:
+    invoice = invoices.setdefault(ticket_id, {'ticket_id': ticket_id, 'lines': [], 'total': round(total, 2)})
+    if item_id is not None:
+      invoice['lines'].append({
+        'inventory_id': item_id,
+        'name': name,
+        'price': price,
+        'quantity': quantity,
+        'line_total': round(line, 2)
+      })
+  return invoices
+
+
+# Returns {ticket_id: invoice} for the tickets that exist, reading cached invoices first
+def get_invoices(ticket_ids):
+  ticket_ids = sorted(set(ticket_ids))
+  if not ticket_ids:
+    return {}
+  keys = _invoice_keys(ticket_ids)
+  cached = cache.get_many(*keys.values())
+  invoices = {
+    ticket_id: invoice
+    for ticket_id, invoice in zip(keys, cached)
+    if invoice is not None
+  }
+  missing = [ticket_id for ticket_id in ticket_ids if ticket_id not in invoices]
+  if missing:
+    built = _build_invoices(missing)
+    if built:
+      cache.set_many({keys[ticket_id]: invoice for ticket_id, invoice in built.items()}, timeout=INVOICE_TIMEOUT)
+    invoices.update(built)
+  return invoices
@@ -2,9 +2,12 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt
 import jose
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from functools import wraps
-from flask import request, jsonify
+from collections import OrderedDict
+from flask import g, request, jsonify
 from app.models import Customer, Mechanic
 
 load_dotenv()
@@ -22,6 +25,70 @@ def encode_token(user_id, role):
   token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
   return token
 
+class Principal:
+  # Lightweight stand-in for the authenticated user; the ORM object is loaded only when a route asks
+  __slots__ = ('id', 'role')
+
+  def __init__(self, user_id, role):
+    self.id = user_id
+    self.role = role
+
+  @property
+  def model(self):
+    return Customer if self.role == 'customer' else Mechanic
+
+  @property
+  def instance(self):
+    # The session identity map makes repeat lookups within a request free
+    from app.utils.helpers import get_or_404
+    return get_or_404(self.model, self.id)
+
+
+class PrincipalCache:
+  # Bounded LRU of token -> Principal; entries expire at the token's exp (capped at max_age so
+  # changes made by other workers are picked up)
+  def __init__(self, maxsize=4096, max_age=60):
+    self.maxsize = maxsize
+    self.max_age = max_age
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, token):
+    with self._lock:
+      entry = self._entries.get(token)
+      if entry is None:
+        return None
+      principal, expires_at = entry
+      if expires_at <= time.time():
+        del self._entries[token]
+        return None
+      self._entries.move_to_end(token)
+      return principal
+
+  def put(self, token, principal, exp):
+    expires_at = min(exp, time.time() + self.max_age)
+    with self._lock:
+      self._entries[token] = (principal, expires_at)
+      self._entries.move_to_end(token)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def invalidate(self, role, user_id):
+    with self._lock:
+      for token in [
+        token for token, (principal, _) in self._entries.items()
+        if principal.role == role and principal.id == user_id
+      ]:
+        del self._entries[token]
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
 def token_required(f):
   @wraps(f)
   def decorated(*args, **kwargs):
@@ -30,6 +97,10 @@ def token_required(f):
       token = request.headers['Authorization'].split(' ')[1]
     if not token:
       return jsonify({'message': 'Token is missing'}), 401
+    principal = principal_cache.get(token)
+    if principal is not None:
+      g.principal = principal
+      return f(principal, principal.role, *args, **kwargs)
     # Decode the token
     try:
       data = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
@@ -46,9 +117,9 @@ def token_required(f):
       
       from app.utils.helpers import get_or_404
       if role == 'customer':
-        user = get_or_404(Customer, user_id)
+        get_or_404(Customer, user_id)
       elif role == 'mechanic':
-        user = get_or_404(Mechanic, user_id)
+        get_or_404(Mechanic, user_id)
       else:
         return jsonify({'message': 'Invalid role'}), 401
         
@@ -56,5 +127,8 @@ def token_required(f):
       return jsonify({'message': 'Token has expired'}), 401
     except jose.exceptions.JWTError:
       return jsonify({'message': 'Invalid token'}), 401
-    return f(user, role, *args, **kwargs)
-  return decorated
\ No newline at end of file
+    principal = Principal(user_id, role)
+    principal_cache.put(token, principal, data['exp'])
+    g.principal = principal
+    return f(principal, role, *args, **kwargs)
+  return decorated
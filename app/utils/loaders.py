@@ -0,0 +1,61 @@
+from marshmallow import fields
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+
+# Plans are built once per (model, schema) pair; loader options are immutable so they can be reused
+_plans = {}
+
+
+def _relationship_path(model, attr):
+  mapper = inspect(model)
+  if attr in mapper.relationships:
+    return (attr,)
+  # Plain python properties (e.g. ServiceTicket.customer) declare the relationships they walk through
+  return getattr(model, '__eager_paths__', {}).get(attr)
+
+
+def _strategy(rel):
+  # Many-to-one rides along on the main query, collections get one extra IN query each
+  return selectinload if rel.uselist else joinedload
+
+
+def loader_options(model, schema):
+  key = (model, schema)
+  if key not in _plans:
+    _plans[key] = _build_options(model, schema)
+  return _plans[key]
+
+
+def _build_options(model, schema):
+  options = []
+  for name, field in schema.dump_fields.items():
+    if not isinstance(field, fields.Nested):
+      continue
+    path = _relationship_path(model, field.attribute or name)
+    if not path:
+      continue
+
+    loader = None
+    target = model
+    for attr in path:
+      rel = inspect(target).relationships[attr]
+      strategy = _strategy(rel)
+      attribute = getattr(target, attr)
+      loader = strategy(attribute) if loader is None else getattr(loader, strategy.__name__)(attribute)
+      target = rel.mapper.class_
+
+    # Pluck and Nested both expose the nested schema with only/exclude already applied
+    nested_options = _build_options(target, field.schema)
+    if nested_options:
+      loader = loader.options(*nested_options)
+    options.append(loader)
+  return options
+
+
+def with_loader_plan(query, schema):
+  model = query.column_descriptions[0]['entity']
+  if model is None:
+    return query
+  options = loader_options(model, schema)
+  return query.options(*options) if options else query
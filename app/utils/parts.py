@@ -0,0 +1,84 @@
+from flask import abort
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.models import db, ServiceTicketInventory
+
+
+def _upsert(ticket_id, quantities):
+  rows = [
+    {'service_ticket_id': ticket_id, 'inventory_id': item_id, 'quantity': quantity}
+    for item_id, quantity in sorted(quantities.items())
+  ]
+  table = ServiceTicketInventory.__table__
+  dialect = db.session.get_bind().dialect.name
+  if dialect == 'mysql':
+    stmt = mysql.insert(table).values(rows)
+    return stmt.on_duplicate_key_update(quantity=table.c.quantity + stmt.inserted.quantity)
+  if dialect in ('postgresql', 'sqlite'):
+    stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+      index_elements=[table.c.service_ticket_id, table.c.inventory_id],
+      set_={'quantity': table.c.quantity + stmt.excluded.quantity}
+    )
+  raise NotImplementedError(f'No parts upsert for the {dialect} dialect')
+
+
+# Adds quantities to a ticket's parts in one statement: new rows are inserted, existing rows
+# get quantity + the added amount. quantities maps inventory_id -> amount to add.
+def upsert_ticket_parts(ticket_id, quantities):
+  if quantities:
+    db.session.execute(_upsert(ticket_id, quantities))
+
+
+def _part(ticket_id, item_id):
+  table = ServiceTicketInventory.__table__
+  return (table.c.service_ticket_id == ticket_id) & (table.c.inventory_id == item_id)
+
+
+def _quantity(ticket_id, item_id):
+  table = ServiceTicketInventory.__table__
+  return db.session.execute(select(table.c.quantity).where(_part(ticket_id, item_id))).scalar()
+
+
+# The helpers below change quantities with single statements evaluated by the database, so
+# concurrent requests on the same ticket never overwrite each other's changes.
+def add_ticket_part(ticket_id, item_id, count):
+  stmt = _upsert(ticket_id, {item_id: count})
+  dialect = db.session.get_bind().dialect
+  if dialect.name != 'mysql' and dialect.insert_returning:
+    return db.session.execute(stmt.returning(ServiceTicketInventory.__table__.c.quantity)).scalar()
+  # MySQL can't return from the upsert, so read the row back in the same transaction
+  db.session.execute(stmt)
+  return _quantity(ticket_id, item_id)
+
+
+# Tries before giving up on a part whose quantity keeps changing under us
+REMOVE_ATTEMPTS = 5
+
+
+# Returns the quantity left after removing count, 0 when the row was deleted,
+# or None when the item is not on the ticket
+def remove_ticket_part(ticket_id, item_id, count=1):
+  table = ServiceTicketInventory.__table__
+  returning = db.session.get_bind().dialect.update_returning
+  for _ in range(REMOVE_ATTEMPTS):
+    stmt = (
+      update(table)
+      .where(_part(ticket_id, item_id), table.c.quantity > count)
+      .values(quantity=table.c.quantity - count)
+    )
+    if returning:
+      quantity = db.session.execute(stmt.returning(table.c.quantity)).scalar()
+      if quantity is not None:
+        return quantity
+    elif db.session.execute(stmt).rowcount:
+      return _quantity(ticket_id, item_id)
+    deleted = db.session.execute(
+      delete(table).where(_part(ticket_id, item_id), table.c.quantity <= count)
+    ).rowcount
+    if deleted:
+      return 0
+    # Either the row is gone, or another request raised the quantity between the two statements
+    if _quantity(ticket_id, item_id) is None:
+      return None
+  abort(409, description=f'Item {item_id} on service ticket {ticket_id} is being changed by another request; try again')
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import abort, current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+import hmac
+import secrets
+import threading
+
+
+# PASSWORD_HASH_METHOD is any werkzeug method string, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'.
+# Hashing and verification run on a small shared pool so a burst of logins can only occupy
+# PASSWORD_HASH_WORKERS cores; requests beyond PASSWORD_HASH_QUEUE waiting per worker get a 503.
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+HASH_PREFIXES = ('pbkdf2', 'scrypt')
+
+_executor = None
+_slots = None
+_import_executor = None
+_executor_lock = threading.Lock()
+_canonical_methods = {}
+_dummy_hashes = {}
+
+
+def _pool():
+  global _executor, _slots
+  if _executor is None:
+    with _executor_lock:
+      if _executor is None:
+        workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+        queue = current_app.config.get('PASSWORD_HASH_QUEUE', 8)
+        _slots = threading.BoundedSemaphore(workers * queue)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+  return _executor, _slots
+
+
+# Imports hash on their own threads (PASSWORD_IMPORT_WORKERS), so a 1000-row chunk never queues
+# ahead of logins on the pool above
+def _import_pool():
+  global _import_executor
+  if _import_executor is None:
+    with _executor_lock:
+      if _import_executor is None:
+        workers = current_app.config.get('PASSWORD_IMPORT_WORKERS', 2)
+        _import_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-import')
+  return _import_executor
+
+
+def _run(fn, *args):
+  executor, slots = _pool()
+  if not slots.acquire(blocking=False):
+    abort(503, description='Too many login attempts in progress, please retry shortly')
+  try:
+    return executor.submit(fn, *args).result()
+  finally:
+    slots.release()
+
+
+def hash_method():
+  return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+def _canonical(method):
+  # 'scrypt' and 'scrypt:32768:8:1' produce the same prefix, so compare what werkzeug actually writes
+  if method not in _canonical_methods:
+    _canonical_methods[method] = generate_password_hash('', method=method).split('$')[0]
+  return _canonical_methods[method]
+
+
+def is_hashed(stored):
+  parts = stored.split('$')
+  return len(parts) == 3 and parts[0].split(':')[0] in HASH_PREFIXES
+
+
+def hash_password(password):
+  return _run(generate_password_hash, password, hash_method())
+
+
+# Bulk imports: the whole batch runs across the import pool's workers at once. Logins never wait
+# behind it, and the import takes no login slots, so it never gets a 503 from them either.
+def hash_passwords(passwords):
+  executor = _import_pool()
+  method = hash_method()
+  return list(executor.map(generate_password_hash, passwords, [method] * len(passwords)))
+
+
+def verify_password(stored, password):
+  if is_hashed(stored):
+    return _run(check_password_hash, stored, password)
+  # Rows written before hashing was introduced hold the plain password
+  return hmac.compare_digest(stored.encode(), password.encode())
+
+
+# Unknown emails run the same check against a throwaway hash, so a login's response time doesn't
+# reveal whether an account exists. Always False.
+def verify_unknown_user(password):
+  method = hash_method()
+  if method not in _dummy_hashes:
+    _dummy_hashes[method] = generate_password_hash(secrets.token_hex(16), method=method)
+  _run(check_password_hash, _dummy_hashes[method], password)
+  return False
+
+
+def needs_rehash(stored):
+  return not is_hashed(stored) or stored.split('$')[0] != _canonical(hash_method())
@@ -0,0 +1,132 @@
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+import os
+import threading
+import time
+
+
+# Select with SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': InstrumentedQueuePool, ...}.
+# Every pool keeps its own counters; with gunicorn that means one set per worker process.
+class PoolStats:
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.pool = None
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self.checkouts = 0
+      self.connects = 0
+      self.timeouts = 0
+      self.wait_total = 0.0
+      self.wait_max = 0.0
+      self.waited = 0
+      self.hold_total = 0.0
+      self.hold_max = 0.0
+      self.age_max = 0.0
+      self.overflow_peak = 0
+
+  def record_wait(self, seconds, timed_out=False):
+    with self._lock:
+      if timed_out:
+        self.timeouts += 1
+      # Anything over a millisecond had to wait for another thread to check a connection in
+      if seconds > 0.001:
+        self.waited += 1
+      self.wait_total += seconds
+      self.wait_max = max(self.wait_max, seconds)
+
+  def record_checkout(self, age, overflow):
+    with self._lock:
+      self.checkouts += 1
+      self.age_max = max(self.age_max, age)
+      self.overflow_peak = max(self.overflow_peak, overflow)
+
+  def record_checkin(self, held):
+    with self._lock:
+      self.hold_total += held
+      self.hold_max = max(self.hold_max, held)
+
+  def record_connect(self):
+    with self._lock:
+      self.connects += 1
+
+  def snapshot(self):
+    pool = self.pool
+    with self._lock:
+      checkouts = self.checkouts or 1
+      return {
+        'pid': os.getpid(),
+        'pool_size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'overflow_peak': self.overflow_peak,
+        'max_overflow': pool._max_overflow,
+        'checkouts': self.checkouts,
+        'connects': self.connects,
+        'timeouts': self.timeouts,
+        'checkouts_waited': self.waited,
+        'wait_ms_avg': round(self.wait_total / checkouts * 1000, 3),
+        'wait_ms_max': round(self.wait_max * 1000, 3),
+        'hold_ms_avg': round(self.hold_total / checkouts * 1000, 3),
+        'hold_ms_max': round(self.hold_max * 1000, 3),
+        'connection_age_s_max': round(self.age_max, 1),
+      }
+
+
+class InstrumentedQueuePool(QueuePool):
+  # Log under sqlalchemy.pool like QueuePool (quiet unless echo_pool), not under the DEBUG-level app logger
+  _sqla_logger_namespace = 'sqlalchemy.pool.impl.InstrumentedQueuePool'
+
+  def __init__(self, *args, **kwargs):
+    # recreate() (engine.dispose) passes the old pool's listeners along, so only a new pool listens
+    recreated = '_dispatch' in kwargs
+    super().__init__(*args, **kwargs)
+    if not recreated:
+      self.stats = PoolStats()
+      self.stats.pool = self
+      _listen(self, self.stats)
+
+  def recreate(self):
+    pool = super().recreate()
+    pool.stats = self.stats
+    self.stats.pool = pool
+    return pool
+
+  # The time spent here is the time a request waited for a free connection
+  def _do_get(self):
+    started = time.perf_counter()
+    try:
+      connection = super()._do_get()
+    except exc.TimeoutError:
+      self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+      raise
+    self.stats.record_wait(time.perf_counter() - started)
+    return connection
+
+
+def _listen(pool, stats):
+  @event.listens_for(pool, 'connect')
+  def on_connect(dbapi_connection, record):
+    record.info['connected_at'] = time.monotonic()
+    stats.record_connect()
+
+  @event.listens_for(pool, 'checkout')
+  def on_checkout(dbapi_connection, record, proxy):
+    now = time.monotonic()
+    record.info['checked_out_at'] = now
+    stats.record_checkout(now - record.info.get('connected_at', now), stats.pool.overflow())
+
+  @event.listens_for(pool, 'checkin')
+  def on_checkin(dbapi_connection, record):
+    checked_out_at = record.info.pop('checked_out_at', None)
+    if checked_out_at is not None:
+      stats.record_checkin(time.monotonic() - checked_out_at)
+
+
+def pool_stats(engine):
+  pool = engine.pool
+  if not isinstance(pool, InstrumentedQueuePool):
+    return {'pool': type(pool).__name__, 'instrumented': False}
+  return pool.stats.snapshot()
@@ -0,0 +1,69 @@
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter
+import time
+
+
+# Counts SQL statements and the time spent in them for every request, and flags statements run
+# over and over with only their parameters changing, which is what an N+1 loop looks like.
+# Enabled with QUERY_STATS = True (development and testing); the numbers go out as X-DB-* headers.
+class QueryStats:
+  def __init__(self):
+    self.count = 0
+    self.seconds = 0.0
+    self.shapes = Counter()
+
+  def record(self, statement, seconds):
+    self.count += 1
+    self.seconds += seconds
+    # Parameters are bound, so the text is the same for every run of one statement shape
+    self.shapes[statement] += 1
+
+  def repeated(self, threshold):
+    return {statement: count for statement, count in self.shapes.items() if count >= threshold}
+
+
+def _current():
+  return g.get('query_stats') if has_app_context() else None
+
+
+def _start(conn, cursor, statement, parameters, context, executemany):
+  if _current() is not None:
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _finish(conn, cursor, statement, parameters, context, executemany):
+  stats = _current()
+  started = conn.info.get('query_started')
+  if stats is not None and started:
+    stats.record(statement, time.perf_counter() - started.pop())
+
+
+def _begin_request():
+  g.query_stats = QueryStats()
+
+
+def _report(response):
+  stats = _current()
+  if stats is None:
+    return response
+  response.headers['X-DB-Queries'] = str(stats.count)
+  response.headers['X-DB-Time'] = f'{stats.seconds * 1000:.2f}ms'
+  repeated = stats.repeated(current_app.config.get('QUERY_STATS_REPEAT_THRESHOLD', 5))
+  if repeated:
+    response.headers['X-DB-N-Plus-One'] = str(len(repeated))
+    for statement, count in repeated.items():
+      current_app.logger.warning('Possible N+1: statement ran %d times\n%s', count, statement)
+  return response
+
+
+def init_query_stats(app):
+  if not app.config.get('QUERY_STATS'):
+    return
+  # On the Engine class so every bind is timed; apps without QUERY_STATS never add the listeners
+  if not event.contains(Engine, 'before_cursor_execute', _start):
+    event.listen(Engine, 'before_cursor_execute', _start)
+    event.listen(Engine, 'after_cursor_execute', _finish)
+  app.before_request(_begin_request)
+  app.after_request(_report)
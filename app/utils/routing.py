@@ -0,0 +1,89 @@
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from app.extensions import cache
+
+
+# With a 'replica' entry in SQLALCHEMY_BINDS, SELECTs issued while serving GET/HEAD requests run on
+# the replica. Everything else (writes, flushes, non-GET requests) stays on the primary. A principal
+# that commits a write is pinned to the primary for READ_YOUR_WRITES_SECONDS, shared across workers
+# through the cache, so the replica's lag never hides their own change from them.
+# Every other client may still read pre-write rows from the replica during that window, so
+# replica_read_may_be_stale() tells the response cache not to keep those bodies.
+REPLICA = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+LAG_KEY = 'replica-lag-window'
+
+
+def _window():
+  return current_app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+
+
+def _pin_key(principal):
+  return f'primary-pin:{principal.role}:{principal.id}'
+
+
+def _pinned():
+  if 'primary_pinned' not in g:
+    principal = g.get('principal')
+    # Not known yet before token_required has run, so nothing is remembered for this request
+    if principal is None:
+      return False
+    g.primary_pinned = cache.get(_pin_key(principal)) is not None
+  return g.primary_pinned
+
+
+def pin_to_primary():
+  g.primary_pinned = True
+  principal = g.get('principal')
+  if principal is not None and _window() > 0:
+    cache.set(_pin_key(principal), 1, timeout=_window())
+
+
+def mark_replica_lag():
+  if _window() > 0:
+    cache.set(LAG_KEY, 1, timeout=_window())
+
+
+def replica_read_may_be_stale():
+  return g.get('replica_read', False) and cache.get(LAG_KEY) is not None
+
+
+# Shared with the async read session in app/asgi.py, so both serving modes route the same way
+def reads_from_replica(session, clause):
+  return (
+    getattr(clause, 'is_select', False)
+    and not session._flushing
+    and has_request_context()
+    and request.method in READ_METHODS
+    and not _pinned()
+  )
+
+
+class RoutingSession(Session):
+  def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+    if bind is None and clause is not None:
+      if getattr(clause, 'is_dml', False):
+        self.info['wrote'] = True
+      elif REPLICA in self._db.engines and reads_from_replica(self, clause):
+        g.replica_read = True
+        return self._db.engines[REPLICA]
+    return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+  session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_writer(session):
+  if session.info.pop('wrote', False) and has_request_context():
+    if REPLICA in session._db.engines:
+      mark_replica_lag()
+    pin_to_primary()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+  session.info.pop('wrote', None)
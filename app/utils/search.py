@@ -0,0 +1,175 @@
+from sqlalchemy import Index, Integer, String, cast, column, event, func, literal, literal_column, select, table as table_clause, text, union_all
+from app.models import db, Customer, Car, ServiceTicket
+import re
+
+
+# Full-text search over tickets, customers and cars.
+# SQLite: one FTS5 table per source table (<table>_fts), kept in sync by INSERT/UPDATE/DELETE
+# triggers, so Core bulk inserts (seed, imports) are indexed too. Tables keyed by an INTEGER PRIMARY
+# KEY (tickets, customers) use it as the FTS rowid and read their text from the table itself.
+# Others (cars, keyed by vin) store a copy of their text with the key in an unindexed column:
+# their implicit rowid is renumbered by VACUUM, so it can't link a match back to its row.
+# Postgres: a GIN index on each table's to_tsvector expression, which Postgres maintains itself.
+# Every term matches as a prefix ("bra" finds "Brake pads") and all terms must match.
+
+# kind -> (table, id column, searchable columns)
+SEARCH_DOCUMENTS = {
+  'service_ticket': (ServiceTicket.__table__, 'id', ('service_desc',)),
+  'customer': (Customer.__table__, 'id', ('name', 'email', 'phone')),
+  'car': (Car.__table__, 'vin', ('make', 'model', 'vin')),
+}
+MAX_TERMS = 10
+
+
+def _document(table, columns):
+  # Same expression in the index and in the query, or Postgres won't use the index;
+  # the constants render inline (not as bound parameters) so the two match text for text
+  empty, space = literal('', literal_execute=True), literal(' ', literal_execute=True)
+  text_value = func.coalesce(table.c[columns[0]], empty)
+  for name in columns[1:]:
+    text_value = text_value + space + func.coalesce(table.c[name], empty)
+  return text_value
+
+
+def _tsvector(table, columns):
+  return func.to_tsvector(text("'simple'"), _document(table, columns))
+
+
+SEARCH_INDEXES = [
+  Index(f'ix_{table.name}_search', _tsvector(table, columns), postgresql_using='gin').ddl_if(dialect='postgresql')
+  for table, _, columns in SEARCH_DOCUMENTS.values()
+]
+
+
+def _fts(table):
+  return f'{table.name}_fts'
+
+
+def _rowid_key(table, key):
+  # INTEGER PRIMARY KEY is SQLite's rowid itself, which VACUUM never changes
+  column = table.c[key]
+  return list(table.primary_key) == [column] and isinstance(column.type, Integer)
+
+
+def _fill_fts(connection, table, key, columns):
+  fts = _fts(table)
+  if _rowid_key(table, key):
+    connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+  else:
+    names = ', '.join(columns)
+    connection.exec_driver_sql(f'DELETE FROM {fts}')
+    connection.exec_driver_sql(f'INSERT INTO {fts}(key, {names}) SELECT {key}, {names} FROM {table.name}')
+
+
+def _create_fts(connection, table, key, columns):
+  fts = _fts(table)
+  exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': fts}).first()
+  names = ', '.join(columns)
+  new = ', '.join(f'new.{name}' for name in columns)
+  old = ', '.join(f'old.{name}' for name in columns)
+  if _rowid_key(table, key):
+    connection.exec_driver_sql(
+      f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table.name}', prefix='2 3')"
+    )
+    insert_new = f'INSERT INTO {fts}(rowid, {names}) VALUES (new.{key}, {new});'
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old});"
+  else:
+    connection.exec_driver_sql(
+      f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(key UNINDEXED, {names}, prefix='2 3')"
+    )
+    insert_new = f'INSERT INTO {fts}(key, {names}) VALUES (new.{key}, {new});'
+    delete_old = f'DELETE FROM {fts} WHERE key = old.{key};'
+  connection.exec_driver_sql(
+    f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table.name} BEGIN {insert_new} END"
+  )
+  connection.exec_driver_sql(
+    f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table.name} BEGIN {delete_old} END"
+  )
+  connection.exec_driver_sql(
+    f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table.name} BEGIN "
+    f"{delete_old} {insert_new} END"
+  )
+  # A database that had rows before the index existed gets them indexed now
+  if not exists:
+    _fill_fts(connection, table, key, columns)
+  return not exists
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_search_index(target, connection, **kw):
+  if connection.dialect.name == 'sqlite':
+    for table, key, columns in SEARCH_DOCUMENTS.values():
+      _create_fts(connection, table, key, columns)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_search_index(target, connection, **kw):
+  if connection.dialect.name == 'sqlite':
+    for table, _, _ in SEARCH_DOCUMENTS.values():
+      connection.exec_driver_sql(f'DROP TABLE IF EXISTS {_fts(table)}')
+
+
+# Index rows that were written before the search index existed (flask rebuild-search-index)
+def rebuild_search_index():
+  connection = db.session.connection()
+  if connection.dialect.name == 'sqlite':
+    for table, key, columns in SEARCH_DOCUMENTS.values():
+      if not _create_fts(connection, table, key, columns):
+        _fill_fts(connection, table, key, columns)
+  elif connection.dialect.name == 'postgresql':
+    for index in SEARCH_INDEXES:
+      index.create(connection, checkfirst=True)
+  else:
+    raise NotImplementedError(f'Full-text search is not supported on {connection.dialect.name}')
+
+
+def search_terms(query):
+  return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _kind_query(dialect, kind, terms):
+  table, id_column, columns = SEARCH_DOCUMENTS[kind]
+  columns_out = (
+    literal(kind).label('type'),
+    cast(table.c[id_column], String).label('id'),
+    _document(table, columns).label('text'),
+  )
+  if dialect == 'sqlite':
+    # bm25 is lower for better matches
+    link = 'rowid' if _rowid_key(table, id_column) else 'key'
+    fts = table_clause(_fts(table), column(link))
+    fts_name = literal_column(_fts(table))
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return (
+      select(*columns_out, func.bm25(fts_name).label('rank'))
+      .select_from(fts.join(table, table.c[id_column] == fts.c[link]))
+      .where(fts_name.op('MATCH')(match))
+    )
+  if dialect == 'postgresql':
+    tsquery = func.to_tsquery(text("'simple'"), ' & '.join(f'{term}:*' for term in terms))
+    document = _tsvector(table, columns)
+    return (
+      select(*columns_out, (-func.ts_rank(document, tsquery)).label('rank'))
+      .where(document.op('@@')(tsquery))
+    )
+  raise NotImplementedError(f'Full-text search is not supported on {dialect}')
+
+
+# Best matches first across all requested kinds; one row past the page tells whether there is a next one
+def search(query, kinds, page, per_page):
+  terms = search_terms(query)
+  if not terms:
+    return [], False
+  dialect = db.session.get_bind().dialect.name
+  matches = union_all(*[_kind_query(dialect, kind, terms) for kind in kinds]).subquery()
+  rows = db.session.execute(
+    select(matches)
+    .order_by(matches.c.rank, matches.c.type, matches.c.id)
+    .limit(per_page + 1)
+    .offset((page - 1) * per_page)
+  ).all()
+  items = [
+    {'type': row.type, 'id': row.id if row.type == 'car' else int(row.id), 'text': row.text}
+    for row in rows[:per_page]
+  ]
+  return items, len(rows) > per_page
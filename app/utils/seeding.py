@@ -0,0 +1,171 @@
+from sqlalchemy import func, insert, select, text
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+from app.models import db, Customer, Car, ServiceTicket, Mechanic, Inventory, ServiceTicketInventory, service_ticket_mechanic
+from app.utils.passwords import hash_password
+import random
+
+
+# Synthetic shop data for benchmarks and load tests. Every table gets its own Random seeded from
+# (seed, table), so the same options always produce the same rows whatever the chunk size.
+# Rows are generated lazily and written CHUNK_SIZE at a time with Core insert(), in FK order.
+DISTRIBUTIONS = ('uniform', 'skewed')
+CHUNK_SIZE = 10000
+MAKES = {
+  'Honda': ('Civic', 'Accord', 'CR-V'),
+  'Toyota': ('Corolla', 'Camry', 'RAV4'),
+  'Ford': ('F-150', 'Focus', 'Escape'),
+  'Chevrolet': ('Silverado', 'Malibu', 'Equinox'),
+  'Nissan': ('Altima', 'Sentra', 'Rogue'),
+}
+MAKE_NAMES = tuple(MAKES)
+COLORS = ('Black', 'White', 'Silver', 'Gray', 'Red', 'Blue')
+SERVICES = ('Oil change', 'Brake pads', 'Tire rotation', 'Battery replacement', 'Engine diagnostics',
+  'Transmission service', 'Coolant flush', 'Wheel alignment', 'AC recharge', 'Inspection')
+
+
+# Fixed end of the ticket dates: today's date would give every run different rows
+SEED_UNTIL = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class SeedPlan:
+  def __init__(self, customers, cars_per_customer=1.5, tickets_per_car=3.0, mechanics_per_ticket=2,
+      parts_per_ticket=2, mechanics=None, items=500, days=730, distribution='uniform', seed=1, password='password',
+      until=SEED_UNTIL):
+    self.customers = customers
+    self.cars = round(customers * cars_per_customer)
+    self.tickets = round(self.cars * tickets_per_car)
+    self.mechanics = mechanics or max(5, customers // 50)
+    self.items = items
+    self.mechanics_per_ticket = mechanics_per_ticket
+    self.parts_per_ticket = parts_per_ticket
+    self.days = days
+    self.distribution = distribution
+    self.seed = seed
+    self.password = password
+    self.until = until if until.tzinfo else until.replace(tzinfo=timezone.utc)
+
+  # Tickets are spread evenly over the `days` before `until`, oldest first
+  def ticket_date(self, i):
+    return self.until - timedelta(days=self.days) + timedelta(days=self.days) / max(self.tickets, 1) * i
+
+  def rng(self, table):
+    return random.Random(f'{self.seed}:{table}')
+
+  # Index in range(n); 'skewed' favours low indexes so a few cars, mechanics and parts see most of the work
+  def pick(self, rng, n):
+    if self.distribution == 'skewed':
+      return int(n * rng.random() ** 3)
+    return rng.randrange(n)
+
+  def pick_distinct(self, rng, n, k):
+    if self.distribution == 'uniform':
+      return rng.sample(range(n), k)
+    picked = set()
+    while len(picked) < k:
+      picked.add(self.pick(rng, n))
+    return list(picked)
+
+  # Mechanics or parts on one ticket: averages `mean`, from `low` up to about twice the mean, at most n
+  def count(self, rng, mean, low, n):
+    return min(n, rng.randint(low, max(low, 2 * mean - low)))
+
+
+def vin(i):
+  return f'SEED{i:013}'
+
+
+def customer_rows(plan):
+  password = hash_password(plan.password)
+  for i in range(plan.customers):
+    yield {'id': i + 1, 'name': f'Customer {i}', 'phone': f'555-{i % 10000000:07}',
+      'email': f'customer{i}@example.com', 'password': password}
+
+
+def mechanic_rows(plan):
+  rng = plan.rng('mechanics')
+  password = hash_password(plan.password)
+  for i in range(plan.mechanics):
+    yield {'id': i + 1, 'name': f'Mechanic {i}', 'phone': f'555-{i % 10000000:07}', 'address': f'{i} Main St.',
+      'email': f'mechanic{i}@example.com', 'password': password, 'salary': float(rng.randrange(40000, 120000, 500))}
+
+
+def inventory_rows(plan):
+  rng = plan.rng('inventory')
+  for i in range(plan.items):
+    yield {'id': i + 1, 'name': f'Part {i}', 'price': round(rng.uniform(5, 800), 2)}
+
+
+def car_rows(plan):
+  rng = plan.rng('cars')
+  for i in range(plan.cars):
+    make = rng.choice(MAKE_NAMES)
+    # Round robin first so every customer owns at least one car when there are enough of them
+    customer = i if i < plan.customers else plan.pick(rng, plan.customers)
+    yield {'vin': vin(i), 'make': make, 'model': rng.choice(MAKES[make]), 'year': rng.randrange(1995, 2026),
+      'color': rng.choice(COLORS), 'customer_id': customer + 1}
+
+
+def ticket_rows(plan):
+  rng = plan.rng('tickets')
+  for i in range(plan.tickets):
+    yield {'id': i + 1, 'service_desc': rng.choice(SERVICES), 'car_vin': vin(plan.pick(rng, plan.cars)),
+      'created_at': plan.ticket_date(i)}
+
+
+def assignment_rows(plan):
+  rng = plan.rng('assignments')
+  for i in range(plan.tickets):
+    for mechanic in plan.pick_distinct(rng, plan.mechanics, plan.count(rng, plan.mechanics_per_ticket, 1, plan.mechanics)):
+      yield {'service_ticket_id': i + 1, 'mechanic_id': mechanic + 1, 'ticket_created_at': plan.ticket_date(i)}
+
+
+def part_rows(plan):
+  rng = plan.rng('parts')
+  for i in range(plan.tickets):
+    for item in plan.pick_distinct(rng, plan.items, plan.count(rng, plan.parts_per_ticket, 0, plan.items)):
+      yield {'service_ticket_id': i + 1, 'inventory_id': item + 1, 'quantity': rng.randint(1, 4)}
+
+
+# FK order: parents before the tables pointing at them
+TABLES = [
+  (Customer.__table__, customer_rows),
+  (Mechanic.__table__, mechanic_rows),
+  (Inventory.__table__, inventory_rows),
+  (Car.__table__, car_rows),
+  (ServiceTicket.__table__, ticket_rows),
+  (service_ticket_mechanic, assignment_rows),
+  (ServiceTicketInventory.__table__, part_rows),
+]
+
+
+def is_empty():
+  return all(db.session.execute(select(func.count()).select_from(table)).scalar() == 0 for table, _ in TABLES)
+
+
+def reset_sequences(tables):
+  # Explicit ids leave Postgres sequences behind; move them past the highest id
+  for table in tables:
+    if 'id' in table.c:
+      db.session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), coalesce(max(id), 1)) FROM {table.name}"
+      ))
+
+
+# Writes the plan's rows; progress(table name, rows written so far) is called after each chunk
+def seed_database(plan, chunk_size=CHUNK_SIZE, progress=None):
+  counts = {}
+  for table, rows in TABLES:
+    rows = rows(plan)
+    counts[table.name] = 0
+    while chunk := list(islice(rows, chunk_size)):
+      db.session.execute(insert(table), chunk)
+      counts[table.name] += len(chunk)
+      if progress:
+        progress(table.name, counts[table.name])
+    db.session.commit()
+  Mechanic.recount_tickets()
+  if db.session.get_bind().dialect.name == 'postgresql':
+    reset_sequences([table for table, _ in TABLES])
+  db.session.commit()
+  return counts
@@ -0,0 +1,224 @@
+from flask_caching.backends.base import BaseCache
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+# Select with CACHE_TYPE = 'app.utils.shared_cache.SharedMemoryCache'.
+# Entries live in a memory-mapped SQLite file (in /dev/shm when available), so every gunicorn
+# worker on the host reads and writes the same cache. Least recently used entries are evicted
+# once the stored values exceed CACHE_SHARED_MAX_BYTES or CACHE_THRESHOLD entries.
+# Values are pickled, so whoever can write the file can run code in the app: it is kept in a
+# directory only the app's user can enter, created 0600, and refused if another user owns it.
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+  key TEXT PRIMARY KEY,
+  value BLOB NOT NULL,
+  expires REAL NOT NULL,
+  accessed REAL NOT NULL,
+  size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS usage (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  bytes INTEGER NOT NULL,
+  entries INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, bytes, entries) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+  UPDATE usage SET bytes = bytes + NEW.size, entries = entries + 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+  UPDATE usage SET bytes = bytes - OLD.size, entries = entries - 1 WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+  UPDATE usage SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+END;
+'''
+
+
+def default_path(base=None):
+  if base is None:
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+  directory = os.path.join(base, f'mechanic_shop_cache-{os.getuid()}')
+  try:
+    os.mkdir(directory, 0o700)
+  except FileExistsError:
+    pass
+  # Someone else may have created it first to read or plant entries
+  info = os.lstat(directory)
+  if not os.path.isdir(directory) or os.path.islink(directory) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+    raise RuntimeError(f'{directory} must be a directory owned by and private to this user; set CACHE_SHARED_PATH')
+  return os.path.join(directory, 'cache.db')
+
+
+def _create_private(path):
+  fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+  try:
+    if os.fstat(fd).st_uid != os.getuid():
+      raise RuntimeError(f'{path} is owned by another user; refusing to load cache entries from it')
+  finally:
+    os.close(fd)
+
+
+class SharedMemoryCache(BaseCache):
+  # Reads only refresh the LRU timestamp when it is older than this, so hot keys don't write on every hit
+  TOUCH_INTERVAL = 1.0
+
+  def __init__(self, path=None, max_bytes=64 * 1024 * 1024, threshold=10000, default_timeout=300):
+    super().__init__(default_timeout=default_timeout)
+    self.path = path or default_path()
+    _create_private(self.path)
+    self.max_bytes = max_bytes
+    self.threshold = threshold
+    self._local = threading.local()
+    self._connect().executescript(_SCHEMA)
+
+  @classmethod
+  def factory(cls, app, config, args, kwargs):
+    kwargs.update(
+      path=config.get('CACHE_SHARED_PATH'),
+      max_bytes=config.get('CACHE_SHARED_MAX_BYTES', 64 * 1024 * 1024),
+      threshold=config['CACHE_THRESHOLD'],
+    )
+    return cls(*args, **kwargs)
+
+  # One connection per thread, reopened after gunicorn forks a worker
+  def _connect(self):
+    conn = getattr(self._local, 'conn', None)
+    if conn is None or self._local.pid != os.getpid():
+      conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+      conn.execute('PRAGMA journal_mode=WAL')
+      conn.execute('PRAGMA synchronous=OFF')
+      conn.execute(f'PRAGMA mmap_size={self.max_bytes * 2}')
+      self._local.conn = conn
+      self._local.pid = os.getpid()
+    return conn
+
+  def _expires(self, timeout):
+    timeout = self._normalize_timeout(timeout)
+    return 0 if timeout == 0 else time.time() + timeout
+
+  def _evict(self, conn):
+    used_bytes, entries = conn.execute('SELECT bytes, entries FROM usage WHERE id = 1').fetchone()
+    if used_bytes <= self.max_bytes and entries <= self.threshold:
+      return
+    now = time.time()
+    conn.execute('DELETE FROM entries WHERE expires != 0 AND expires <= ?', (now,))
+    while True:
+      used_bytes, entries = conn.execute('SELECT bytes, entries FROM usage WHERE id = 1').fetchone()
+      if used_bytes <= self.max_bytes and entries <= self.threshold:
+        return
+      # Drop the least recently used tenth (at least one row) per round
+      conn.execute(
+        'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed LIMIT ?)',
+        (max(1, entries // 10),)
+      )
+
+  def _write(self, conn, key, value, timeout, replace=True):
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    # An upsert (rather than INSERT OR REPLACE) so the usage triggers see the size change
+    conflict = (
+      'DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+      'accessed = excluded.accessed, size = excluded.size'
+      if replace else 'DO NOTHING'
+    )
+    cursor = conn.execute(
+      'INSERT INTO entries (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?) '
+      f'ON CONFLICT (key) {conflict}',
+      (key, data, self._expires(timeout), time.time(), len(data))
+    )
+    return cursor.rowcount == 1
+
+  def _transaction(self):
+    conn = self._connect()
+    conn.execute('BEGIN IMMEDIATE')
+    return conn
+
+  def get(self, key):
+    return self.get_many(key)[0]
+
+  def get_many(self, *keys):
+    if not keys:
+      return []
+    conn = self._connect()
+    now = time.time()
+    placeholders = ', '.join('?' * len(keys))
+    rows = conn.execute(
+      f'SELECT key, value, expires, accessed FROM entries WHERE key IN ({placeholders})',
+      keys
+    ).fetchall()
+    found = {}
+    stale = []
+    for key, value, expires, accessed in rows:
+      if expires and expires <= now:
+        continue
+      found[key] = pickle.loads(value)
+      if now - accessed > self.TOUCH_INTERVAL:
+        stale.append(key)
+    if stale:
+      conn.execute(
+        f"UPDATE entries SET accessed = ? WHERE key IN ({', '.join('?' * len(stale))})",
+        (now, *stale)
+      )
+    return [found.get(key) for key in keys]
+
+  def set(self, key, value, timeout=None):
+    return self.set_many({key: value}, timeout) == [key]
+
+  def set_many(self, mapping, timeout=None):
+    conn = self._transaction()
+    try:
+      for key, value in mapping.items():
+        self._write(conn, key, value, timeout)
+      self._evict(conn)
+      conn.execute('COMMIT')
+    except BaseException:
+      conn.execute('ROLLBACK')
+      raise
+    return list(mapping)
+
+  def add(self, key, value, timeout=None):
+    conn = self._transaction()
+    try:
+      conn.execute('DELETE FROM entries WHERE key = ? AND expires != 0 AND expires <= ?', (key, time.time()))
+      added = self._write(conn, key, value, timeout, replace=False)
+      self._evict(conn)
+      conn.execute('COMMIT')
+    except BaseException:
+      conn.execute('ROLLBACK')
+      raise
+    return added
+
+  def delete(self, key):
+    return self._connect().execute('DELETE FROM entries WHERE key = ?', (key,)).rowcount == 1
+
+  def has(self, key):
+    row = self._connect().execute('SELECT expires FROM entries WHERE key = ?', (key,)).fetchone()
+    return row is not None and (row[0] == 0 or row[0] > time.time())
+
+  def clear(self):
+    self._connect().execute('DELETE FROM entries')
+    return True
+
+  def inc(self, key, delta=1):
+    # Read and write under one write lock so concurrent workers never lose an increment
+    conn = self._transaction()
+    try:
+      row = conn.execute('SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+      current = 0
+      if row is not None and (row[1] == 0 or row[1] > time.time()):
+        current = pickle.loads(row[0])
+      value = current + delta
+      self._write(conn, key, value, None)
+      conn.execute('COMMIT')
+    except BaseException:
+      conn.execute('ROLLBACK')
+      raise
+    return value
+
+  def dec(self, key, delta=1):
+    return self.inc(key, -delta)
@@ -0,0 +1,150 @@
+# Side-by-side throughput of the read endpoints served by the WSGI app (one thread per concurrent
+# request, like gunicorn --threads) and by the ASGI app (one event loop, async engine).
+# Every request carries a unique query parameter so the response cache never answers it.
+# SQLite answers in microseconds, so the difference shows best against a networked database:
+#   DATABASE_URL=postgresql://... python -m benchmarks.bench_asgi --config DevelopmentConfig
+# The benchmark seeds its own rows and empties the tables afterwards, so like `flask seed` it refuses
+# a database that already has data unless --reset is given to drop and recreate every table first.
+# Usage: python -m benchmarks.bench_asgi [--customers 2000] [--requests 400] [--concurrency 1 8 32] [--reset]
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.asgi import create_asgi_app
+from app.models import db
+from app.utils.jwt_utils import encode_token
+from app.utils.seeding import SeedPlan, is_empty, seed_database
+
+PATHS = [
+  '/service_tickets/',
+  '/service_tickets/by-account?id=1',
+  '/cars/',
+  '/inventory/',
+  '/mechanics/',
+]
+
+
+# Unique across every run, so no request is answered from an earlier run's cache entries
+_request_ids = itertools.count()
+
+
+def _url(path):
+  return f"{path}{'&' if '?' in path else '?'}bench={next(_request_ids)}"
+
+
+def summary(timings, elapsed):
+  timings = sorted(timings)
+  return {
+    'requests_per_sec': round(len(timings) / elapsed, 1),
+    'p50_ms': round(statistics.median(timings) * 1000, 3),
+    'p95_ms': round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+  }
+
+
+def bench_wsgi(app, path, headers, requests, concurrency):
+  local = threading.local()
+  def one(_):
+    if not hasattr(local, 'client'):
+      local.client = app.test_client()
+    started = time.perf_counter()
+    response = local.client.get(_url(path), headers=headers)
+    assert response.status_code == 200, response.status_code
+    return time.perf_counter() - started
+  started = time.perf_counter()
+  with ThreadPoolExecutor(concurrency) as pool:
+    timings = list(pool.map(one, range(requests)))
+  return summary(timings, time.perf_counter() - started)
+
+
+async def _asgi_get(asgi, url, headers):
+  path, _, query = url.partition('?')
+  scope = {
+    'type': 'http',
+    'method': 'GET',
+    'path': path,
+    'query_string': query.encode(),
+    'root_path': '',
+    'scheme': 'http',
+    'http_version': '1.1',
+    'server': ('localhost', 80),
+    'client': ('127.0.0.1', 5000),
+    'headers': [(b'host', b'localhost')] + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+  }
+  status = []
+  async def receive():
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+  async def send(message):
+    if message['type'] == 'http.response.start':
+      status.append(message['status'])
+  await asgi(scope, receive, send)
+  assert status == [200], status
+
+
+async def bench_asgi(asgi, path, headers, requests, concurrency):
+  limit = asyncio.Semaphore(concurrency)
+  async def one(_):
+    async with limit:
+      started = time.perf_counter()
+      await _asgi_get(asgi, _url(path), headers)
+      return time.perf_counter() - started
+  started = time.perf_counter()
+  timings = await asyncio.gather(*[one(i) for i in range(requests)])
+  return summary(timings, time.perf_counter() - started)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--config', default='TestingConfig')
+  parser.add_argument('--customers', type=int, default=2000)
+  parser.add_argument('--requests', type=int, default=400)
+  parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+  parser.add_argument('--output', default='bench_asgi.json')
+  parser.add_argument('--reset', action='store_true', help='Drop and recreate all tables first.')
+  args = parser.parse_args()
+
+  asgi = create_asgi_app(args.config)
+  app = asgi.flask_app
+  with app.app_context():
+    if args.reset:
+      db.drop_all()
+    db.create_all()
+    if not is_empty():
+      parser.error('The database already has data; pass --reset to replace it.')
+    seed_database(SeedPlan(args.customers))
+  headers = {'Authorization': f"Bearer {encode_token(1, 'mechanic')}"}
+
+  async def run_asgi(path, concurrency):
+    return await bench_asgi(asgi, path, headers, args.requests, concurrency)
+
+  results = []
+  loop = asyncio.new_event_loop()
+  try:
+    for path in PATHS:
+      for concurrency in args.concurrency:
+        wsgi = bench_wsgi(app, path, headers, args.requests, concurrency)
+        asgi_result = loop.run_until_complete(run_asgi(path, concurrency))
+        results.append({'path': path, 'concurrency': concurrency, 'wsgi': wsgi, 'asgi': asgi_result})
+        print(
+          f'{path:<34} c={concurrency:<3} wsgi {wsgi["requests_per_sec"]:>8} req/s p95 {wsgi["p95_ms"]:>8} ms   '
+          f'asgi {asgi_result["requests_per_sec"]:>8} req/s p95 {asgi_result["p95_ms"]:>8} ms'
+        )
+    loop.run_until_complete(asgi.engine.dispose())
+  finally:
+    loop.close()
+
+  with app.app_context():
+    for table in reversed(db.metadata.sorted_tables):
+      db.session.execute(table.delete())
+    db.session.commit()
+    db.session.remove()
+  with open(args.output, 'w') as f:
+    json.dump({'config': args.config, 'requests': args.requests, 'results': results}, f, indent=2)
+  print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+  main()
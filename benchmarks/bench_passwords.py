@@ -0,0 +1,62 @@
+# Logins/sec one worker process can verify at each hash cost.
+# Usage: python -m benchmarks.bench_passwords [--workers 1 2 4] [--seconds 3]
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app
+from app.utils import passwords
+from app.utils.passwords import hash_password, verify_password
+
+METHODS = [
+  'pbkdf2:sha256:100000',
+  'pbkdf2:sha256:300000',
+  'pbkdf2:sha256:600000',
+  'pbkdf2:sha256:1000000',
+  'scrypt:16384:8:1',
+  'scrypt:32768:8:1',
+]
+
+
+def bench(app, method, workers, seconds):
+  app.config['PASSWORD_HASH_METHOD'] = method
+  with app.app_context():
+    stored = hash_password('correct horse battery staple')
+
+  def login():
+    with app.app_context():
+      return verify_password(stored, 'correct horse battery staple')
+
+  # More request threads than hash workers, like a threaded gunicorn worker under a login burst
+  done = 0
+  started = time.perf_counter()
+  with ThreadPoolExecutor(max_workers=workers * 4) as requests:
+    while time.perf_counter() - started < seconds:
+      done += sum(requests.map(lambda _: login(), range(workers * 4)))
+  elapsed = time.perf_counter() - started
+  return {'method': method, 'hash_workers': workers, 'logins_per_sec': round(done / elapsed, 1)}
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+  parser.add_argument('--seconds', type=float, default=3)
+  parser.add_argument('--methods', nargs='+', default=METHODS)
+  args = parser.parse_args()
+
+  results = []
+  for workers in args.workers:
+    # The hash pool is sized once per process, so each worker count needs a fresh pool
+    passwords._executor = None
+    app = create_app('TestingConfig')
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+    app.config['PASSWORD_HASH_QUEUE'] = 64
+    for method in args.methods:
+      result = bench(app, method, workers, args.seconds)
+      results.append(result)
+      print(f"{result['method']:<24} workers={workers:<3} {result['logins_per_sec']:>8} logins/sec")
+  print(json.dumps(results))
+
+
+if __name__ == '__main__':
+  main()
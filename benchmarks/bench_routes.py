@@ -0,0 +1,163 @@
+# Latency of every read route (and the logins) through the Flask test client against a seeded database.
+# Reports p50/p95/p99 in ms, queries per request (X-DB-Queries) and bytes allocated per request,
+# and writes them as JSON so two commits can be compared.
+# Usage: python -m benchmarks.bench_routes [--customers 2000] [--iterations 200] [--output bench_routes.json]
+#        python -m benchmarks.bench_routes --baseline old.json   (prints the change against an earlier run)
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from app import create_app
+from app.extensions import cache, limiter
+from app.models import db
+from app.utils.jwt_utils import encode_token
+from app.utils.seeding import SeedPlan, seed_database, vin
+
+# (blueprint, method, url, role, json body); {vin} and {ticket} are filled in from the seeded data (app/utils/seeding.py)
+ROUTES = [
+  ('customers', 'get', '/customers/', 'mechanic', None),
+  ('customers', 'get', '/customers/?per_page=100', 'mechanic', None),
+  ('customers', 'get', '/customers/account', 'customer', None),
+  ('customers', 'post', '/customers/login', None, {'email': 'customer0@example.com', 'password': 'password'}),
+  ('cars', 'get', '/cars/', 'mechanic', None),
+  ('cars', 'get', '/cars/?per_page=100', 'mechanic', None),
+  ('cars', 'get', '/cars/{vin}', 'mechanic', None),
+  ('mechanics', 'get', '/mechanics/', 'mechanic', None),
+  ('mechanics', 'get', '/mechanics/?sort=ticket_count', 'mechanic', None),
+  ('mechanics', 'get', '/mechanics/my-account', 'mechanic', None),
+  ('mechanics', 'post', '/mechanics/login', None, {'email': 'mechanic0@example.com', 'password': 'password'}),
+  ('service_tickets', 'get', '/service_tickets/', 'mechanic', None),
+  ('service_tickets', 'get', '/service_tickets/?per_page=100', 'mechanic', None),
+  ('service_tickets', 'get', '/service_tickets/?cursor=', 'mechanic', None),
+  ('service_tickets', 'get', '/service_tickets/{ticket}', 'mechanic', None),
+  ('service_tickets', 'get', '/service_tickets/by-car/1', 'customer', None),
+  ('service_tickets', 'get', '/service_tickets/by-account?id=1', 'mechanic', None),
+  ('service_tickets', 'get', '/service_tickets/{ticket}/invoice', 'mechanic', None),
+  ('service_tickets', 'get', '/service_tickets/invoices?ids=1&ids=2&ids=3&ids=4&ids=5', 'mechanic', None),
+  ('inventory', 'get', '/inventory/', 'mechanic', None),
+  ('inventory', 'get', '/inventory/?per_page=100', 'mechanic', None),
+  ('inventory', 'get', '/inventory/1', 'mechanic', None),
+]
+
+
+def percentile(samples, pct):
+  return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def run(client, method, url, headers, body, warm_cache):
+  if not warm_cache:
+    cache.clear()
+  started = time.perf_counter()
+  response = getattr(client, method)(url, json=body, headers=headers)
+  elapsed = time.perf_counter() - started
+  assert response.status_code == 200, f'{url}: {response.status_code}'
+  return elapsed, int(response.headers.get('X-DB-Queries', 0))
+
+
+def bench_route(client, method, url, headers, body, iterations, warm_cache):
+  for _ in range(3):
+    run(client, method, url, headers, body, warm_cache)
+  timings, queries = [], []
+  for _ in range(iterations):
+    elapsed, count = run(client, method, url, headers, body, warm_cache)
+    timings.append(elapsed * 1000)
+    queries.append(count)
+  # Allocations are measured separately; tracemalloc slows everything down
+  allocated = []
+  tracemalloc.start()
+  for _ in range(min(iterations, 20)):
+    if not warm_cache:
+      cache.clear()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    getattr(client, method)(url, json=body, headers=headers)
+    allocated.append(tracemalloc.get_traced_memory()[1] - before)
+  tracemalloc.stop()
+  return {
+    'p50_ms': round(percentile(timings, 50), 3),
+    'p95_ms': round(percentile(timings, 95), 3),
+    'p99_ms': round(percentile(timings, 99), 3),
+    'mean_ms': round(statistics.fmean(timings), 3),
+    'queries': max(queries),
+    'allocated_bytes': round(statistics.median(allocated)),
+  }
+
+
+def environment(args):
+  try:
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+  except OSError:
+    commit = None
+  return {
+    'commit': commit,
+    'python': platform.python_version(),
+    'sqlite': sqlite3.sqlite_version,
+    'created_at': datetime.now(timezone.utc).isoformat(),
+    'args': vars(args),
+  }
+
+
+def compare(results, baseline_path):
+  with open(baseline_path) as f:
+    baseline = {(r['method'], r['url']): r for r in json.load(f)['results']}
+  print(f"\n{'route':<62} {'p50 before':>11} {'p50 after':>10} {'change':>8}")
+  for result in results:
+    old = baseline.get((result['method'], result['url']))
+    if old:
+      change = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+      print(f"{result['method'].upper() + ' ' + result['url']:<62} {old['p50_ms']:>11} {result['p50_ms']:>10} {change:>+7.1f}%")
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--customers', type=int, default=2000)
+  parser.add_argument('--mechanics', type=int, default=50)
+  parser.add_argument('--items', type=int, default=500)
+  parser.add_argument('--iterations', type=int, default=200)
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--warm-cache', action='store_true', help='keep the response cache between requests')
+  parser.add_argument('--output', default='bench_routes.json')
+  parser.add_argument('--baseline', help='earlier --output file to compare against')
+  args = parser.parse_args()
+
+  # Uses the scratch test database, like the test suite
+  app = create_app('TestingConfig')
+  limiter.enabled = False
+  client = app.test_client()
+  results = []
+  with app.app_context():
+    db.drop_all()
+    db.create_all()
+    started = time.perf_counter()
+    plan = SeedPlan(args.customers, mechanics=args.mechanics, items=args.items, seed=args.seed)
+    counts = seed_database(plan)
+    print(f'Seeded {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s')
+    values = {'vin': vin(0), 'ticket': 1}
+    tokens = {'customer': encode_token(1, 'customer'), 'mechanic': encode_token(1, 'mechanic')}
+    for blueprint, method, url, role, body in ROUTES:
+      url = url.format(**values)
+      headers = {'Authorization': f'Bearer {tokens[role]}'} if role else {}
+      result = {'blueprint': blueprint, 'method': method, 'url': url}
+      result.update(bench_route(client, method, url, headers, body, args.iterations, args.warm_cache))
+      results.append(result)
+      print(
+        f"{method.upper() + ' ' + url:<62} p50 {result['p50_ms']:>8} p95 {result['p95_ms']:>8} "
+        f"p99 {result['p99_ms']:>8} ms  {result['queries']:>2} queries  {result['allocated_bytes']:>9} bytes"
+      )
+    db.session.remove()
+    db.drop_all()
+
+  with open(args.output, 'w') as f:
+    json.dump({'environment': environment(args), 'results': results}, f, indent=2)
+  print(f'Wrote {args.output}')
+  if args.baseline:
+    compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+  main()
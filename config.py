@@ -1,17 +1,72 @@
 import os
 from dotenv import load_dotenv
+from app.utils.pool_stats import InstrumentedQueuePool
 
 load_dotenv()
 
+
+def pool_options():
+  # Each gunicorn worker process gets its own pool, sized so every request thread can hold a
+  # connection. Overflow is whatever DB_MAX_CONNECTIONS leaves once every worker has its pool.
+  workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+  threads = int(os.environ.get('GUNICORN_THREADS', 1))
+  pool_size = int(os.environ.get('DB_POOL_SIZE', threads))
+  max_connections = int(os.environ.get('DB_MAX_CONNECTIONS', workers * (pool_size + 5)))
+  return {
+    'poolclass': InstrumentedQueuePool,
+    'pool_size': pool_size,
+    'max_overflow': max(max_connections // workers - pool_size, 0),
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+  }
+
+
 class DevelopmentConfig:
   SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
   DEBUG = True
+  # SimpleCache lives in each process: with several gunicorn workers, invalidate_tags only
+  # reaches the worker that made the write. Use the shared backend (see ProductionConfig) there.
+  CACHE_TYPE = 'SimpleCache'
+  SQLALCHEMY_ENGINE_OPTIONS = pool_options()
+  QUERY_STATS = True
   
 class TestingConfig:
   SQLALCHEMY_DATABASE_URI = 'sqlite:///testing.db'
+  SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': InstrumentedQueuePool, 'pool_size': 5, 'max_overflow': 10}
   DEBUG = True
   CACHE_TYPE = 'SimpleCache'
+  QUERY_STATS = True
+  # Cheap hashes keep the suite fast
+  PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+# Second SQLite file standing in for a read replica; tests copy data into it themselves
+class ReplicaTestingConfig(TestingConfig):
+  SQLALCHEMY_BINDS = {'replica': 'sqlite:///testing_replica.db'}
 
 class ProductionConfig:
   SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI')
-  CACHE_TYPE = 'SimpleCache'
\ No newline at end of file
+  SQLALCHEMY_ENGINE_OPTIONS = pool_options()
+  # GET requests read from the replica when one is configured, see app/utils/routing.py
+  SQLALCHEMY_BINDS = {'replica': os.environ['SQLALCHEMY_REPLICA_URI']} if os.environ.get('SQLALCHEMY_REPLICA_URI') else {}
+  READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+  # asgi_app.py: the async read endpoints use their own pool, sized by connections instead of threads
+  SQLALCHEMY_ASYNC_DATABASE_URI = os.environ.get('SQLALCHEMY_ASYNC_DATABASE_URI')
+  SQLALCHEMY_ASYNC_BINDS = {'replica': os.environ['SQLALCHEMY_ASYNC_REPLICA_URI']} if os.environ.get('SQLALCHEMY_ASYNC_REPLICA_URI') else {}
+  SQLALCHEMY_ASYNC_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('ASYNC_DB_POOL_SIZE', 20)),
+    'max_overflow': 0,
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': True,
+  }
+  # Shared by all gunicorn workers on the host
+  CACHE_TYPE = 'app.utils.shared_cache.SharedMemoryCache'
+  CACHE_SHARED_PATH = os.environ.get('CACHE_SHARED_PATH')
+  CACHE_SHARED_MAX_BYTES = int(os.environ.get('CACHE_SHARED_MAX_BYTES', 64 * 1024 * 1024))
+  CACHE_THRESHOLD = 10000
+  PAGINATION_COUNT = 'cached'
+  PAGINATION_COUNT_TTL = 60
+  PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+  PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+  PASSWORD_IMPORT_WORKERS = int(os.environ.get('PASSWORD_IMPORT_WORKERS', 2))
\ No newline at end of file
@@ -0,0 +1,16 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+# Every (statement, parameters) the engine runs inside the block:
+# with capture_statements(db.engine) as statements: ...
+@contextmanager
+def capture_statements(engine):
+  statements = []
+  def capture(conn, cursor, statement, parameters, *args):
+    statements.append((statement, parameters))
+  event.listen(engine, 'before_cursor_execute', capture)
+  try:
+    yield statements
+  finally:
+    event.remove(engine, 'before_cursor_execute', capture)
@@ -0,0 +1,189 @@
+import unittest
+import asyncio
+import json
+import os
+from app.asgi import create_asgi_app, async_url_for
+from app.models import db, Customer, Mechanic, Car, ServiceTicket, Inventory
+from app.extensions import cache
+from app.utils.jwt_utils import encode_token, principal_cache
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import make_url
+from helpers import capture_statements
+
+async def asgi_request(asgi, method, path, query, token):
+  scope = {
+    'type': 'http',
+    'method': method,
+    'path': path,
+    'query_string': query,
+    'root_path': '',
+    'scheme': 'http',
+    'http_version': '1.1',
+    'server': ('localhost', 80),
+    'client': ('127.0.0.1', 5000),
+    'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+  }
+  messages = []
+  async def receive():
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+  async def send(message):
+    messages.append(message)
+  await asgi(scope, receive, send)
+  body = b''.join(message.get('body', b'') for message in messages[1:])
+  return messages[0]['status'], dict(messages[0]['headers']), body
+
+
+class TestAsgi(unittest.TestCase):
+  def setUp(self):
+    self.asgi = create_asgi_app('TestingConfig')
+    self.app = self.asgi.flask_app
+    principal_cache.clear()
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      mechanic = Mechanic(
+        name='test_mech',
+        phone='555-555-6666',
+        address='100 Main St. City, NY 00000',
+        email='mech1@email.com',
+        password='7890',
+        salary=80000.0
+      )
+      customer = Customer(name='test_user', phone='555-111-2222', email='user@email.com', password='1234')
+      car = Car(vin='80224526647584952', make='Honda', model='Civic', year=2020, color='Black', customer=customer)
+      tickets = [ServiceTicket(service_desc=f'Service {i}', car=car) for i in range(30)]
+      for ticket in tickets:
+        ticket.mechanics.append(mechanic)
+      db.session.add_all([mechanic, customer, car, *tickets])
+      db.session.commit()
+      self.mechanic_token = encode_token(mechanic.id, 'mechanic')
+    ## Statements that went through the async engine
+    self.async_statements = self.enterContext(capture_statements(self.asgi.engine.sync_engine))
+
+
+  async def request(self, method, path, query=b''):
+    return await asgi_request(self.asgi, method, path, query, self.mechanic_token)
+
+
+  def test_read_endpoints_use_async_engine(self):
+    async def run():
+      results = await asyncio.gather(*[
+        self.request('GET', '/service_tickets/', f'page={page}'.encode()) for page in (1, 2, 3)
+      ])
+      await self.asgi.engine.dispose()
+      return results
+    for status, headers, body in asyncio.run(run()):
+      self.assertEqual(status, 200)
+      self.assertEqual(headers[b'content-type'], b'application/json')
+      self.assertIn(b'Service', body)
+    self.assertTrue(self.async_statements)
+
+
+  def test_other_routes_fall_back_to_wsgi(self):
+    async def run():
+      account = await self.request('GET', '/mechanics/my-account')
+      missing = await self.request('GET', '/nowhere')
+      await self.asgi.engine.dispose()
+      return account, missing
+    account, missing = asyncio.run(run())
+    self.assertEqual(account[0], 200)
+    self.assertIn(b'test_mech', account[2])
+    self.assertEqual(missing[0], 404)
+    self.assertEqual(self.async_statements, [])
+
+
+  def test_errors_keep_the_json_shape(self):
+    async def run():
+      response = await self.request('GET', '/cars/', b'page=0')
+      await self.asgi.engine.dispose()
+      return response
+    status, headers, body = asyncio.run(run())
+    self.assertEqual(status, 404)
+    self.assertIn(b'Page not found', body)
+
+
+  def test_unsupported_backend_needs_an_async_url(self):
+    with self.assertRaisesRegex(RuntimeError, 'SQLALCHEMY_ASYNC_DATABASE_URI'):
+      async_url_for(make_url('mysql+mysqlconnector://user@localhost/shop'))
+    self.assertEqual(
+      async_url_for(make_url('postgresql://user@localhost/shop')).drivername,
+      'postgresql+asyncpg'
+    )
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+class TestAsgiReplica(unittest.TestCase):
+  def setUp(self):
+    self.asgi = create_asgi_app('ReplicaTestingConfig')
+    self.app = self.asgi.flask_app
+    principal_cache.clear()
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      writer = Mechanic(name='writer_mech', phone='555', address='Main St.', email='mech1@email.com', password='7890', salary=1.0)
+      reader = Mechanic(name='reader_mech', phone='555', address='Main St.', email='mech2@email.com', password='7890', salary=1.0)
+      db.session.add_all([writer, reader, Inventory(name='Tire', price=200.0)])
+      db.session.commit()
+      ## The replica starts as a copy of the primary, with one row it hasn't caught up on
+      replica = db.engines['replica']
+      db.metadata.drop_all(replica)
+      db.metadata.create_all(replica)
+      with db.engine.connect() as primary, replica.begin() as conn:
+        for table in db.metadata.sorted_tables:
+          rows = [row._asdict() for row in primary.execute(select(table))]
+          if rows:
+            conn.execute(insert(table), rows)
+        conn.execute(update(Inventory).values(name='Replica Tire'))
+      self.writer_token = encode_token(writer.id, 'mechanic')
+      self.reader_token = encode_token(reader.id, 'mechanic')
+
+
+  def inventory_names(self, token):
+    async def run():
+      response = await asgi_request(self.asgi, 'GET', '/inventory/', b'', token)
+      await self.asgi.engine.dispose()
+      await self.asgi.replica.dispose()
+      return response
+    status, _, body = asyncio.run(run())
+    self.assertEqual(status, 200)
+    return [item['name'] for item in json.loads(body)]
+
+
+  def test_async_reads_follow_replica_routing(self):
+    self.assertEqual(self.inventory_names(self.reader_token), ['Replica Tire'])
+
+    # A write through the WSGI side pins the writer to the primary; others keep reading the replica
+    response = self.app.test_client().post(
+      '/inventory/',
+      json={'name': 'Battery', 'price': 140.0},
+      headers={'Authorization': f'Bearer {self.writer_token}'}
+    )
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual(self.inventory_names(self.writer_token), ['Battery', 'Tire'])
+    self.assertEqual(self.inventory_names(self.reader_token), ['Replica Tire'])
+
+
+  def tearDown(self):
+    cache.clear()
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      replica = db.engines['replica']
+      db.metadata.drop_all(replica)
+      replica.dispose()
+      db.get_engine().dispose()
+    # init_app registers an (empty) metadata per bind on the shared db; other apps have no replica
+    db.metadatas.pop('replica', None)
+    replica_path = os.path.join(self.app.instance_path, 'testing_replica.db')
+    if os.path.exists(replica_path):
+      os.remove(replica_path)
+
+
+if __name__ == '__main__':
+  unittest.main()
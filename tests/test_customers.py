@@ -2,6 +2,10 @@ import unittest
 from app import create_app
 from app.models import db, Customer, Mechanic
 from app.utils.jwt_utils import encode_token
+from helpers import capture_statements
+from sqlalchemy import select
+from unittest import mock
+from werkzeug.security import check_password_hash
 
 class TestCustomers(unittest.TestCase):
   def setUp(self):
@@ -55,6 +59,9 @@ class TestCustomers(unittest.TestCase):
     response = self.client.post('/customers/', json=customer_payload)
     self.assertEqual(response.status_code, 201)
     self.assertEqual(response.get_json()['name'], 'Helen Park')
+    with self.app.app_context():
+      stored = db.session.scalar(select(Customer.password).where(Customer.email == 'helen@mail.com'))
+    self.assertTrue(stored.startswith('pbkdf2:sha256:1000$'))
     
     
   def test_invalid_creation(self):
@@ -83,6 +90,19 @@ class TestCustomers(unittest.TestCase):
     self.assertEqual(response.get_json()['status'], 'success')
   
   
+  def test_login_rehashes_plain_password(self):
+    credentials = {
+      'email': 'user1@email.com',
+      'password': '1234'
+    }
+    self.client.post('/customers/login', json=credentials)
+    with self.app.app_context():
+      stored = db.session.scalar(select(Customer.password).where(Customer.email == 'user1@email.com'))
+    self.assertNotEqual(stored, '1234')
+    response = self.client.post('/customers/login', json=credentials)
+    self.assertEqual(response.status_code, 200)
+  
+  
   def test_invalid_login(self):
     credentials = {
       'email': 'user1@email.com',
@@ -92,6 +112,14 @@ class TestCustomers(unittest.TestCase):
     self.assertEqual(response.status_code, 401)
     self.assertEqual(response.get_json()['message'], 'Incorrect email or password')
 
+    # An unknown email still pays for a password check, so it answers no faster
+    credentials['email'] = 'nobody@email.com'
+    with mock.patch('app.utils.passwords.check_password_hash', wraps=check_password_hash) as check:
+      response = self.client.post('/customers/login', json=credentials)
+    self.assertEqual(response.status_code, 401)
+    self.assertEqual(response.get_json()['message'], 'Incorrect email or password')
+    self.assertEqual(check.call_count, 1)
+
   
   def test_get_all_customers(self):
     response = self.client.get(
@@ -110,6 +138,31 @@ class TestCustomers(unittest.TestCase):
     )
     self.assertEqual(response.status_code, 200)
     self.assertEqual(response.get_json()['name'], 'test_user1')
+
+
+  def test_get_customer_cache_per_user(self):
+    with self.app.app_context():
+      other_id = db.session.scalar(select(Customer.id).where(Customer.email == 'user2@email.com'))
+      other_token = encode_token(other_id, 'customer')
+    first = self.client.get('/customers/account', headers=self.auth_headers('customer'))
+    second = self.client.get(
+      '/customers/account',
+      headers={'Authorization': f'Bearer {other_token}'}
+    )
+    self.assertEqual(first.get_json()['name'], 'test_user1')
+    self.assertEqual(second.get_json()['name'], 'test_user2')
+
+
+  def test_get_customer_cache_invalidated_on_edit(self):
+    response = self.client.get('/customers/account', headers=self.auth_headers('customer'))
+    self.assertEqual(response.get_json()['phone'], '555-111-2222')
+    self.client.patch(
+      '/customers/',
+      json={'phone': '555-888-9999'},
+      headers=self.auth_headers('customer')
+    )
+    response = self.client.get('/customers/account', headers=self.auth_headers('customer'))
+    self.assertEqual(response.get_json()['phone'], '555-888-9999')
   
   
   def test_patch_customer(self):
@@ -135,6 +188,28 @@ class TestCustomers(unittest.TestCase):
     )
   
   
+  def test_deleted_customer_token_rejected(self):
+    response = self.client.get('/customers/account', headers=self.auth_headers('customer'))
+    self.assertEqual(response.status_code, 200)
+    self.client.delete('/customers/', headers=self.auth_headers('customer'))
+    response = self.client.get('/customers/account', headers=self.auth_headers('customer'))
+    self.assertEqual(response.status_code, 404)
+
+
+  def test_principal_cached_between_requests(self):
+    self.client.get('/customers/', headers=self.auth_headers('mechanic'))
+    with self.app.app_context():
+      engine = db.engine
+    with capture_statements(engine) as statements:
+      response = self.client.get(
+        '/customers/',
+        query_string={'page': 1},
+        headers=self.auth_headers('mechanic')
+      )
+    self.assertEqual(response.status_code, 200)
+    self.assertFalse([statement for statement, _ in statements if 'FROM mechanics' in statement])
+  
+  
   def tearDown(self):
     with self.app.app_context():
       db.session.remove()
@@ -0,0 +1,122 @@
+import unittest
+from app import create_app
+from app.models import db, Customer, Mechanic, Inventory, Car, ServiceTicket
+from app.utils.jwt_utils import encode_token
+from datetime import datetime, timezone
+
+class TestFilters(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    self.client = self.app.test_client()
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      mechanics = [
+        Mechanic(name=f'mech_{i}', phone='555', address='Main St.', email=f'mech{i}@email.com', password='7890', salary=salary)
+        for i, salary in enumerate((40000.0, 60000.0, 90000.0))
+      ]
+      customers = [
+        Customer(name=f'user_{i}', phone='555', email=f'user{i}@email.com', password='1234') for i in range(2)
+      ]
+      cars = [
+        Car(vin='1HGCM82633A000001', make='Honda', model='Civic', year=2020, color='Black', customer=customers[0]),
+        Car(vin='1HGCM82633A000002', make='Honda', model='Accord', year=2018, color='Red', customer=customers[0]),
+        Car(vin='1HGCM82633A000003', make='Toyota', model='Corolla', year=2020, color='White', customer=customers[1]),
+      ]
+      tickets = [
+        ServiceTicket(service_desc=f'Service {month}', car=cars[0], created_at=datetime(2025, month, 15, tzinfo=timezone.utc))
+        for month in (1, 2, 3, 4)
+      ]
+      tickets[0].mechanics.append(mechanics[0])
+      tickets[2].mechanics.extend([mechanics[0], mechanics[1]])
+      items = [Inventory(name=name, price=price) for name, price in (('Bolt', 0.5), ('Filter', 12.0), ('Tire', 200.0))]
+      db.session.add_all([*mechanics, *customers, *cars, *tickets, *items])
+      db.session.commit()
+      self.mechanic_ids = [mechanic.id for mechanic in mechanics]
+      self.ticket_ids = [ticket.id for ticket in tickets]
+      self.customer_id = customers[1].id
+      self.headers = {'Authorization': f"Bearer {encode_token(mechanics[0].id, 'mechanic')}"}
+
+
+  def get(self, url):
+    return self.client.get(url, headers=self.headers)
+
+
+  def test_filter_service_tickets(self):
+    response = self.get('/service_tickets/?created_after=2025-02-01&created_before=2025-03-31T23:59:59')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual([ticket['service_desc'] for ticket in response.get_json()], ['Service 3', 'Service 2'])
+    self.assertEqual(response.headers['X-Total-Count'], '2')
+
+    response = self.get(f'/service_tickets/?mechanic_id={self.mechanic_ids[0]}')
+    self.assertEqual([ticket['service_desc'] for ticket in response.get_json()], ['Service 3', 'Service 1'])
+    response = self.get(f'/service_tickets/?mechanic_id={self.mechanic_ids[0]}&created_after=2025-02-01')
+    self.assertEqual([ticket['service_desc'] for ticket in response.get_json()], ['Service 3'])
+
+    # Filters apply to every cursor page too
+    response = self.get(f'/service_tickets/?mechanic_id={self.mechanic_ids[0]}&per_page=1&cursor=')
+    self.assertEqual([ticket['service_desc'] for ticket in response.get_json()], ['Service 3'])
+    response = self.get(f"/service_tickets/?mechanic_id={self.mechanic_ids[0]}&per_page=1&cursor={response.headers['X-Next-Cursor']}")
+    self.assertEqual([ticket['service_desc'] for ticket in response.get_json()], ['Service 1'])
+
+    # Assignments written set-based by the bulk route are found in ticket order too
+    response = self.client.put(
+      '/service_tickets/bulk/edit',
+      json={'tickets': {str(self.ticket_ids[3]): {'add_mech_ids': [self.mechanic_ids[2]]}, str(self.ticket_ids[1]): {'add_mech_ids': [self.mechanic_ids[2]]}}},
+      headers=self.headers
+    )
+    self.assertEqual(response.status_code, 200)
+    response = self.get(f'/service_tickets/?mechanic_id={self.mechanic_ids[2]}')
+    self.assertEqual([ticket['service_desc'] for ticket in response.get_json()], ['Service 4', 'Service 2'])
+
+    self.assertEqual(self.get('/service_tickets/?created_after=yesterday').status_code, 400)
+    self.assertEqual(self.get('/service_tickets/?mechanic_id=one').status_code, 400)
+
+
+  def test_filter_cars(self):
+    response = self.get('/cars/?make=Honda')
+    self.assertEqual([car['model'] for car in response.get_json()], ['Civic', 'Accord'])
+    response = self.get('/cars/?make=Honda&year=2020')
+    self.assertEqual([car['model'] for car in response.get_json()], ['Civic'])
+    response = self.get('/cars/?model=Corolla')
+    self.assertEqual([car['make'] for car in response.get_json()], ['Toyota'])
+    response = self.get(f'/cars/?customer_id={self.customer_id}')
+    self.assertEqual([car['model'] for car in response.get_json()], ['Corolla'])
+    response = self.get('/cars/?make=Ford')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json(), [])
+    self.assertEqual(self.get('/cars/?year=new').status_code, 400)
+
+
+  def test_filter_inventory(self):
+    response = self.get('/inventory/?min_price=1&max_price=200')
+    self.assertEqual([item['name'] for item in response.get_json()], ['Filter', 'Tire'])
+    response = self.get('/inventory/?max_price=12')
+    self.assertEqual([item['name'] for item in response.get_json()], ['Bolt', 'Filter'])
+    response = self.get('/inventory/?sort=price&min_price=1')
+    self.assertEqual([item['name'] for item in response.get_json()], ['Filter', 'Tire'])
+    self.assertEqual(self.get('/inventory/?min_price=cheap').status_code, 400)
+    self.assertEqual(self.get('/inventory/?min_price=nan').status_code, 400)
+
+
+  def test_filter_mechanics(self):
+    response = self.get('/mechanics/?sort=salary&min_salary=50000')
+    self.assertEqual([mechanic['name'] for mechanic in response.get_json()], ['mech_2', 'mech_1'])
+    response = self.get('/mechanics/?min_salary=50000&max_salary=60000')
+    self.assertEqual([mechanic['name'] for mechanic in response.get_json()], ['mech_1'])
+    response = self.get('/mechanics/?sort=ticket_count&min_ticket_count=1')
+    self.assertEqual([mechanic['name'] for mechanic in response.get_json()], ['mech_0', 'mech_1'])
+    response = self.get('/mechanics/?max_ticket_count=0')
+    self.assertEqual([mechanic['name'] for mechanic in response.get_json()], ['mech_2'])
+    self.assertEqual(self.get('/mechanics/?min_ticket_count=1.5').status_code, 400)
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,216 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+from app import create_app
+from app.models import db, Customer, Mechanic, Car, Inventory
+from app.utils.jwt_utils import encode_token
+from app.utils import passwords
+from sqlalchemy import select, func
+from werkzeug.security import check_password_hash
+
+class TestImports(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    self.client = self.app.test_client()
+    self.mechanic= Mechanic(
+      name='test_mech',
+      phone='555-555-6666',
+      address='100 Main St. City, NY 00000',
+      email='mech1@email.com',
+      password='7890',
+      salary=80000.0
+    )
+    self.customer = Customer(
+      name='test_user',
+      phone='555-111-2222',
+      email='user@email.com',
+      password='1234'
+    )
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      db.session.add_all([self.mechanic, self.customer])
+      db.session.commit()
+      self.customer_token = encode_token(self.customer.id, 'customer')
+      self.mechanic_token = encode_token(self.mechanic.id, 'mechanic')
+      self.customer_id = self.customer.id
+
+
+  def auth_headers(self, role):
+    token = getattr(self, f'{role}_token')
+    return {'Authorization': f'Bearer {token}'}
+
+
+  def count(self, model):
+    with self.app.app_context():
+      return db.session.scalar(select(func.count()).select_from(model))
+
+
+  def test_import_customers_ndjson(self):
+    lines = [
+      json.dumps({'name': f'customer {i}', 'phone': '555-000-0000', 'email': f'c{i}@email.com', 'password': 'pw'})
+      for i in range(25)
+    ]
+    lines += [
+      json.dumps({'name': 'no email', 'phone': '555-000-0000', 'password': 'pw'}),
+      json.dumps({'name': 'taken', 'phone': '555-000-0000', 'email': 'user@email.com', 'password': 'pw'}),
+      '{not json',
+    ]
+    self.app.config['IMPORT_CHUNK_SIZE'] = 10
+    response = self.client.post(
+      '/imports/customers',
+      data='\n'.join(lines),
+      content_type='application/x-ndjson',
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.status_code, 200)
+    result = response.get_json()
+    self.assertEqual(result['inserted'], 25)
+    self.assertEqual([error['line'] for error in result['errors']], [26, 27, 28])
+    self.assertIn('email', result['errors'][0]['errors'])
+    self.assertEqual(self.count(Customer), 26)
+    with self.app.app_context():
+      password = db.session.scalar(select(Customer.password).where(Customer.email == 'c0@email.com'))
+    self.assertNotEqual(password, 'pw')
+
+
+  def test_import_customers_with_login_slots_taken(self):
+    # Every login hashing slot and worker is busy; the import hashes on its own threads regardless
+    with self.app.app_context():
+      executor, slots = passwords._pool()
+    taken = 0
+    while slots.acquire(blocking=False):
+      taken += 1
+    release = threading.Event()
+    busy = [executor.submit(release.wait) for _ in range(executor._max_workers)]
+    responses = []
+    def post_import():
+      lines = [
+        json.dumps({'name': f'customer {i}', 'phone': '555', 'email': f'c{i}@email.com', 'password': f'pw{i}'})
+        for i in range(5)
+      ]
+      responses.append(self.client.post(
+        '/imports/customers',
+        data='\n'.join(lines),
+        content_type='application/x-ndjson',
+        headers=self.auth_headers('mechanic')
+      ))
+    try:
+      worker = threading.Thread(target=post_import)
+      worker.start()
+      worker.join(timeout=10)
+      self.assertFalse(worker.is_alive(), 'import waited for the login pool')
+    finally:
+      release.set()
+      for future in busy:
+        future.result()
+      for _ in range(taken):
+        slots.release()
+    response = responses[0]
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['inserted'], 5)
+    with self.app.app_context():
+      stored = db.session.scalar(select(Customer.password).where(Customer.email == 'c3@email.com'))
+      self.assertTrue(passwords.is_hashed(stored))
+      self.assertTrue(check_password_hash(stored, 'pw3'))
+
+
+  def test_import_cars_csv(self):
+    rows = [
+      'vin,make,model,year,color,customer_id',
+      f'11111111111111111,Honda,Civic,2020,Black,{self.customer_id}',
+      f'22222222222222222,Toyota,Corolla,2015,Blue,{self.customer_id}',
+      '33333333333333333,Ford,Focus,2012,Red,999',
+      f'11111111111111111,Honda,Civic,2020,Black,{self.customer_id}',
+    ]
+    response = self.client.post(
+      '/imports/cars',
+      data='\n'.join(rows),
+      content_type='text/csv',
+      headers=self.auth_headers('mechanic')
+    )
+    result = response.get_json()
+    self.assertEqual(result['inserted'], 2)
+    self.assertEqual(result['error_count'], 2)
+    self.assertEqual(self.count(Car), 2)
+
+
+  def test_import_inventory_with_taken_ids(self):
+    with self.app.app_context():
+      db.session.add(Inventory(id=1, name='Bolt', price=0.5))
+      db.session.commit()
+    lines = [
+      json.dumps({'id': 1, 'name': 'Tire', 'price': 200}),
+      json.dumps({'id': 2, 'name': 'Filter', 'price': 12}),
+      json.dumps({'id': 2, 'name': 'Belt', 'price': 30}),
+      json.dumps({'name': 'Wiper', 'price': 9}),
+    ]
+    response = self.client.post(
+      '/imports/inventory',
+      data='\n'.join(lines),
+      content_type='application/x-ndjson',
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.status_code, 200)
+    result = response.get_json()
+    self.assertEqual(result['inserted'], 2)
+    self.assertEqual([error['line'] for error in result['errors']], [1, 3])
+    self.assertEqual(self.count(Inventory), 3)
+
+
+  def test_import_rows_rejected_by_the_database(self):
+    # The year CHECK constraint lives only in the database, so the schema lets this row through
+    rows = [
+      'vin,make,model,year,color,customer_id',
+      f'11111111111111111,Honda,Civic,2020,Black,{self.customer_id}',
+      f'22222222222222222,Toyota,Corolla,20,Blue,{self.customer_id}',
+      f'33333333333333333,Ford,Focus,2012,Red,{self.customer_id}',
+    ]
+    response = self.client.post(
+      '/imports/cars',
+      data='\n'.join(rows),
+      content_type='text/csv',
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.status_code, 200)
+    result = response.get_json()
+    self.assertEqual(result['inserted'], 2)
+    self.assertEqual([error['line'] for error in result['errors']], [3])
+    self.assertEqual(self.count(Car), 2)
+
+
+  def test_import_requires_mechanic(self):
+    response = self.client.post(
+      '/imports/inventory',
+      data='{"name": "Tire", "price": 200}',
+      content_type='application/x-ndjson',
+      headers=self.auth_headers('customer')
+    )
+    self.assertEqual(response.status_code, 403)
+
+
+  def test_import_command(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'inventory.csv')
+      with open(path, 'w') as f:
+        f.write('name,price\n')
+        for i in range(50):
+          f.write(f'part {i},{i}.5\n')
+        f.write('bad part,free\n')
+      result = self.app.test_cli_runner().invoke(args=['import-data', 'inventory', path, '--chunk-size', '20'])
+    self.assertEqual(result.exit_code, 0)
+    self.assertIn('Imported 50 inventory row(s), 1 rejected.', result.output)
+    self.assertEqual(self.count(Inventory), 50)
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import logging
+import os
+import tempfile
+from app import create_app
+from app.models import db, Mechanic
+from app.utils.jwt_utils import encode_token
+from app.utils.pool_stats import InstrumentedQueuePool, pool_stats
+from sqlalchemy import create_engine, exc, text
+
+class TestInternal(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    self.client = self.app.test_client()
+    self.mechanic= Mechanic(
+      name='test_mech',
+      phone='555-555-6666',
+      address='100 Main St. City, NY 00000',
+      email='mech1@email.com',
+      password='7890',
+      salary=80000.0
+    )
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      db.session.add(self.mechanic)
+      db.session.commit()
+      self.mechanic_token = encode_token(self.mechanic.id, 'mechanic')
+
+
+  def test_pool_stats(self):
+    headers = {'Authorization': f'Bearer {self.mechanic_token}'}
+    self.client.get('/mechanics/', headers=headers)
+    response = self.client.get('/internal/stats', headers=headers)
+    self.assertEqual(response.status_code, 200)
+    stats = response.get_json()['db_pool']
+    self.assertEqual(stats['pool_size'], 5)
+    self.assertGreaterEqual(stats['checkouts'], 1)
+    self.assertGreaterEqual(stats['connects'], 1)
+    self.assertEqual(stats['timeouts'], 0)
+
+
+  def test_pool_does_not_log_debug(self):
+    # Flask sets the app logger to DEBUG the first time it is used, as any earlier test may have done
+    self.app.logger
+    # A handler on the root logger sees whatever the configured levels let through
+    records = []
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = records.append
+    logging.getLogger().addHandler(handler)
+    try:
+      self.client.get('/mechanics/', headers={'Authorization': f'Bearer {self.mechanic_token}'})
+    finally:
+      logging.getLogger().removeHandler(handler)
+    self.assertEqual([record.getMessage() for record in records if 'Pool' in record.name], [])
+
+
+  def test_pool_wait_and_timeout(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      engine = create_engine(
+        'sqlite:///' + os.path.join(tmp_dir, 'pool.db'),
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05
+      )
+      with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        with self.assertRaises(exc.TimeoutError):
+          engine.connect()
+        self.assertEqual(pool_stats(engine)['checked_out'], 1)
+      stats = pool_stats(engine)
+      self.assertEqual(stats['timeouts'], 1)
+      self.assertGreaterEqual(stats['wait_ms_max'], 50)
+
+      # Counters survive engine.dispose(), which swaps in a fresh pool
+      engine.dispose()
+      with engine.connect():
+        pass
+      self.assertEqual(pool_stats(engine)['checkouts'], 2)
+      self.assertEqual(pool_stats(engine)['connects'], 2)
+      engine.dispose()
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -2,7 +2,14 @@ import unittest
 from app import create_app
 from app.models import db, Customer, Mechanic, Inventory, Car, ServiceTicket
 from app.utils.jwt_utils import encode_token
+from helpers import capture_statements
+from app.utils.helpers import encode_cursor
+from app.extensions import cache
 from datetime import datetime, timezone
+from sqlalchemy import insert, update
+import gzip
+import json
+import time
 
 class TestInventory(unittest.TestCase):
   def setUp(self):
@@ -103,7 +110,155 @@ class TestInventory(unittest.TestCase):
     self.assertIsInstance(response.get_json(), list)
     self.assertEqual(response.get_json()[0]['name'], 'Tire')
 
+
+  def test_get_inventory_cursor(self):
+    with self.app.app_context():
+      db.session.add_all([
+        Inventory(name=name, price=10.0)
+        for name in ['Battery', 'Brake pad', 'Filter', 'Wiper']
+      ])
+      db.session.commit()
+
+    names = []
+    cursor = ''
+    while True:
+      response = self.client.get(
+        '/inventory/',
+        query_string={'per_page': 2, 'cursor': cursor},
+        headers=self.auth_headers('mechanic')
+      )
+      self.assertEqual(response.status_code, 200)
+      names.extend(item['name'] for item in response.get_json())
+      cursor = response.headers.get('X-Next-Cursor')
+      if not cursor:
+        break
+    self.assertEqual(names, ['Battery', 'Brake pad', 'Filter', 'Tire', 'Wiper'])
+
+
+  def test_get_inventory_count_headers(self):
+    with self.app.app_context():
+      db.session.add_all([
+        Inventory(name=name, price=10.0)
+        for name in ['Battery', 'Brake pad', 'Filter', 'Wiper']
+      ])
+      db.session.commit()
+
+    response = self.client.get(
+      '/inventory/',
+      query_string={'per_page': 2},
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.headers['X-Total-Count'], '5')
+    self.assertIn('rel="next"', response.headers['Link'])
+    self.assertIn('rel="last"', response.headers['Link'])
+
+    response = self.client.get(
+      '/inventory/',
+      query_string={'per_page': 2, 'count': 'none'},
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.status_code, 200)
+    self.assertNotIn('X-Total-Count', response.headers)
+    self.assertIn('rel="next"', response.headers['Link'])
+
+
+  def test_get_inventory_cached_count(self):
+    self.app.config['PAGINATION_COUNT_TTL'] = 1
+    headers = self.auth_headers('mechanic')
+    def total(**args):
+      response = self.client.get('/inventory/', query_string={'per_page': 1, 'count': 'cached', **args}, headers=headers)
+      self.assertEqual(response.status_code, 200)
+      return response.headers['X-Total-Count']
+
+    with self.app.app_context():
+      db.session.execute(insert(Inventory), [{'name': 'Bolt', 'price': 0.5}, {'name': 'Filter', 'price': 12.0}])
+      db.session.commit()
+    self.assertEqual(total(), '3')
+    # Written behind the response cache's back: only a fresh COUNT(*) can see it
+    with self.app.app_context():
+      db.session.execute(insert(Inventory), [{'name': 'Battery', 'price': 120.0}, {'name': 'Wiper', 'price': 9.0}])
+      db.session.commit()
+    # Another page of the same query reuses the count; a new filter counts for itself
+    self.assertEqual(total(page=2), '3')
+    self.assertEqual(total(min_price=100), '2')
+    time.sleep(1.1)
+    self.assertEqual(total(page=3), '5')
+
+
+  def test_get_inventory_invalid_cursor(self):
+    response = self.client.get(
+      '/inventory/',
+      query_string={'cursor': 'not-a-cursor'},
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.get_json()['message'], 'Invalid cursor')
+
+    # Well-formed cursors whose values can't be sort keys
+    for values in ([['Tire'], 1], [{'name': 'Tire'}, 1], ['Tire', None]):
+      response = self.client.get(
+        '/inventory/',
+        query_string={'cursor': encode_cursor(values)},
+        headers=self.auth_headers('mechanic')
+      )
+      self.assertEqual(response.status_code, 400)
+
   
+  def test_get_inventory_not_modified(self):
+    headers = self.auth_headers('mechanic')
+    response = self.client.get('/inventory/', headers=headers)
+    etag = response.headers['ETag']
+    self.assertTrue(etag.startswith('W/'))
+
+    with self.app.app_context():
+      engine = db.engine
+    with capture_statements(engine) as statements:
+      response = self.client.get('/inventory/', headers={**headers, 'If-None-Match': etag})
+    self.assertEqual(response.status_code, 304)
+    self.assertEqual(response.get_data(), b'')
+    self.assertEqual(statements, [])
+
+    self.client.post('/inventory/', json={'name': 'Brake Pad', 'price': 40.0}, headers=headers)
+    response = self.client.get('/inventory/', headers={**headers, 'If-None-Match': etag})
+    self.assertEqual(response.status_code, 200)
+    self.assertNotEqual(response.headers['ETag'], etag)
+
+
+  def test_etag_follows_body_without_invalidation(self):
+    headers = self.auth_headers('mechanic')
+    etag = self.client.get('/inventory/', headers=headers).headers['ETag']
+    # A write that never calls invalidate_tags, once the cached entry has expired
+    with self.app.app_context():
+      db.session.execute(update(Inventory).where(Inventory.id == self.item_id).values(price=250.0))
+      db.session.commit()
+      cache.clear()
+    response = self.client.get('/inventory/', headers={**headers, 'If-None-Match': etag})
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()[0]['price'], 250.0)
+    self.assertNotEqual(response.headers['ETag'], etag)
+
+    # An unchanged body still revalidates after the entry has expired
+    etag = response.headers['ETag']
+    with self.app.app_context():
+      cache.clear()
+    response = self.client.get('/inventory/', headers={**headers, 'If-None-Match': etag})
+    self.assertEqual(response.status_code, 304)
+
+
+  def test_get_inventory_gzip(self):
+    with self.app.app_context():
+      db.session.add_all([Inventory(name=f'Part {i}', price=10.0) for i in range(50)])
+      db.session.commit()
+    response = self.client.get(
+      '/inventory/',
+      query_string={'per_page': 50},
+      headers={**self.auth_headers('mechanic'), 'Accept-Encoding': 'gzip'}
+    )
+    self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+    self.assertEqual(len(json.loads(gzip.decompress(response.get_data()))), 50)
+
+
   def test_get_inventory_by_id(self):
     id = self.item_id
     response = self.client.get(
@@ -114,6 +269,25 @@ class TestInventory(unittest.TestCase):
     self.assertEqual(response.get_json()['name'], self.item_name)
 
 
+  def test_edit_inventory_refreshes_invoice(self):
+    headers = self.auth_headers('mechanic')
+    self.client.patch(f'/service_tickets/{self.ticket_id}/add-item/{self.item_id}/count/2', headers=headers)
+    response = self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers)
+    self.assertEqual(response.get_json()['total'], 400.0)
+
+    response = self.client.patch(f'/inventory/{self.item_id}', json={'price': 150.0}, headers=headers)
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['price'], 150.0)
+    response = self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers)
+    self.assertEqual(response.get_json()['total'], 300.0)
+
+    # Lines carry the part's name too
+    response = self.client.patch(f'/inventory/{self.item_id}', json={'name': 'Snow Tire'}, headers=headers)
+    self.assertEqual(response.status_code, 200)
+    response = self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers)
+    self.assertEqual([line['name'] for line in response.get_json()['lines']], ['Snow Tire'])
+
+
   def test_delete_inventory_by_id(self):
     id = self.item_id
     response = self.client.delete(
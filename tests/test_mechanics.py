@@ -1,6 +1,7 @@
 import unittest
 from app import create_app
-from app.models import db, Customer, Mechanic
+from app.models import db, Customer, Mechanic, Car, ServiceTicket
+from sqlalchemy import select, update
 from app.utils.jwt_utils import encode_token
 
 class TestMechanics(unittest.TestCase):
@@ -114,6 +115,40 @@ class TestMechanics(unittest.TestCase):
     self.assertEqual(response.get_json()['phone'], '555-555-6666')
   
   
+  def test_ticket_count_maintained(self):
+    with self.app.app_context():
+      mechanic = db.session.get(Mechanic, 1)
+      car = Car(
+        vin='80224526647584952',
+        make='Honda',
+        model='Civic',
+        year=2020,
+        color='Black',
+        customer_id=1
+      )
+      ticket = ServiceTicket(service_desc='Service A', car=car)
+      ticket.mechanics.append(mechanic)
+      db.session.add(ticket)
+      db.session.commit()
+      self.assertEqual(db.session.scalar(select(Mechanic.ticket_count).where(Mechanic.id == 1)), 1)
+      db.session.delete(car)
+      db.session.commit()
+      self.assertEqual(db.session.scalar(select(Mechanic.ticket_count).where(Mechanic.id == 1)), 0)
+
+
+  def test_repair_ticket_counts(self):
+    with self.app.app_context():
+      db.session.execute(update(Mechanic).values(ticket_count=7))
+      db.session.commit()
+    result = self.app.test_cli_runner().invoke(args=['repair-ticket-counts'])
+    self.assertEqual(result.exit_code, 0)
+    response = self.client.get(
+      '/mechanics/my-account',
+      headers=self.auth_headers('mechanic')
+    )
+    self.assertEqual(response.get_json()['ticket_count'], 0)
+  
+  
   def test_put_mechanic(self):
     mechanic_payload = {
       'name': 'test_mech1',
@@ -0,0 +1,110 @@
+import unittest
+from app import create_app
+from app.models import db, Customer, Mechanic, ServiceTicket, Car, Inventory, ServiceTicketInventory
+from app.utils.jwt_utils import encode_token, principal_cache
+
+ROWS = 25
+PAGE_SIZES = (1, 10, 25)
+
+# (url, role, most queries allowed at any page size). The token lookup is cached, so these are the
+# route's own queries: the page, its relationships and the total count.
+BUDGETS = [
+  ('/customers/', 'mechanic', 3),
+  ('/cars/', 'mechanic', 3),
+  ('/mechanics/', 'mechanic', 3),
+  ('/service_tickets/', 'mechanic', 4),
+  ('/service_tickets/by-account?id=1', 'mechanic', 4),
+  ('/service_tickets/by-car/1', 'customer', 4),
+  ('/inventory/', 'mechanic', 2),
+]
+
+
+class TestQueryBudgets(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    self.client = self.app.test_client()
+    principal_cache.clear()
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      mechanics = [
+        Mechanic(
+          name=f'mech_{i}',
+          phone=f'555-555-{i:04}',
+          address='100 Main St. City, NY 00000',
+          email=f'mech{i}@email.com',
+          password='7890',
+          salary=80000.0 + i
+        )
+        for i in range(ROWS)
+      ]
+      items = [Inventory(name=f'Part {i}', price=10.0 + i) for i in range(ROWS)]
+      customer = Customer(name='test_user', phone='555-111-2222', email='user@email.com', password='1234')
+      db.session.add_all([*mechanics, *items, customer])
+      for i in range(ROWS):
+        car = Car(vin=f'{i:017}', make='Honda', model='Civic', year=2020, color='Black', customer=customer)
+        ticket = ServiceTicket(service_desc=f'Service {i}', car=car)
+        ticket.mechanics.extend([mechanics[i], mechanics[(i + 1) % ROWS]])
+        db.session.add(ticket)
+        db.session.flush()
+        db.session.add(ServiceTicketInventory(service_ticket_id=ticket.id, inventory_id=items[i].id, quantity=2))
+      db.session.commit()
+      self.tokens = {
+        'customer': encode_token(customer.id, 'customer'),
+        'mechanic': encode_token(mechanics[0].id, 'mechanic'),
+      }
+    ## Warm the principal cache so every budgeted request skips the token lookup
+    for role, token in self.tokens.items():
+      self.client.get('/customers/account' if role == 'customer' else '/mechanics/my-account',
+        headers={'Authorization': f'Bearer {token}'})
+
+
+  def test_query_headers(self):
+    response = self.client.get('/mechanics/', headers={'Authorization': f"Bearer {self.tokens['mechanic']}"})
+    self.assertEqual(response.status_code, 200)
+    self.assertGreaterEqual(int(response.headers['X-DB-Queries']), 1)
+    self.assertTrue(response.headers['X-DB-Time'].endswith('ms'))
+    self.assertNotIn('X-DB-N-Plus-One', response.headers)
+
+
+  def test_listeners_registered_once(self):
+    headers = {'Authorization': f"Bearer {self.tokens['mechanic']}"}
+    before = self.client.get('/mechanics/?per_page=3', headers=headers).headers['X-DB-Queries']
+    # Another app in the same process must not time each statement twice
+    create_app('TestingConfig')
+    after = self.client.get('/mechanics/?per_page=3&count=exact', headers=headers).headers['X-DB-Queries']
+    self.assertEqual(after, before)
+
+
+  def test_routes_within_budget(self):
+    for url, role, budget in BUDGETS:
+      for per_page in PAGE_SIZES:
+        with self.subTest(url=url, per_page=per_page):
+          separator = '&' if '?' in url else '?'
+          response = self.client.get(
+            f'{url}{separator}per_page={per_page}',
+            headers={'Authorization': f'Bearer {self.tokens[role]}'}
+          )
+          self.assertEqual(response.status_code, 200)
+          self.assertLessEqual(int(response.headers['X-DB-Queries']), budget)
+          self.assertNotIn('X-DB-N-Plus-One', response.headers)
+
+
+  def test_n_plus_one_is_flagged(self):
+    with self.app.test_request_context():
+      self.app.preprocess_request()
+      for ticket_id in range(1, 7):
+        db.session.get(ServiceTicket, ticket_id)
+      response = self.app.process_response(self.app.make_response(('', 204)))
+    self.assertEqual(response.headers['X-DB-N-Plus-One'], '1')
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from app import create_app
+from app.models import db, Customer, Mechanic, ServiceTicket, Car, Inventory, ServiceTicketInventory
+from app.utils.jwt_utils import encode_token, principal_cache
+from helpers import capture_statements
+
+VIN = '80224526647584952'
+
+# (method, url, role, json body) for every hot read path, plus the two logins
+ROUTES = [
+  ('get', '/customers/', 'mechanic', None),
+  ('get', '/customers/account', 'customer', None),
+  ('get', '/cars/', 'mechanic', None),
+  ('get', '/cars/?make=Honda', 'mechanic', None),
+  ('get', '/cars/?make=Honda&model=Civic', 'mechanic', None),
+  ('get', '/cars/?make=Honda&model=Civic&year=2020', 'mechanic', None),
+  ('get', '/cars/?model=Civic', 'mechanic', None),
+  ('get', '/cars/?model=Civic&year=2020', 'mechanic', None),
+  ('get', '/cars/?year=2020', 'mechanic', None),
+  ('get', '/cars/?customer_id=1', 'mechanic', None),
+  ('get', f'/cars/{VIN}', 'mechanic', None),
+  ('get', '/mechanics/', 'mechanic', None),
+  ('get', '/mechanics/?sort=salary', 'mechanic', None),
+  ('get', '/mechanics/?sort=ticket_count', 'mechanic', None),
+  ('get', '/mechanics/?sort=salary&min_salary=50000', 'mechanic', None),
+  ('get', '/mechanics/?sort=ticket_count&min_ticket_count=1', 'mechanic', None),
+  ('get', '/mechanics/my-account', 'mechanic', None),
+  ('get', '/service_tickets/', 'mechanic', None),
+  ('get', '/service_tickets/?created_after=2020-01-01&created_before=2099-01-01', 'mechanic', None),
+  ('get', '/service_tickets/?mechanic_id=1', 'mechanic', None),
+  ('get', '/service_tickets/?mechanic_id=1&created_after=2020-01-01', 'mechanic', None),
+  ('get', '/service_tickets/?cursor=', 'mechanic', None),
+  ('get', '/service_tickets/?mechanic_id=1&cursor=', 'mechanic', None),
+  ('get', '/service_tickets/1', 'mechanic', None),
+  ('get', '/service_tickets/by-car/1', 'customer', None),
+  ('get', '/service_tickets/by-account?id=1', 'mechanic', None),
+  ('get', '/service_tickets/1/invoice', 'mechanic', None),
+  ('get', '/inventory/', 'mechanic', None),
+  ('get', '/inventory/1', 'mechanic', None),
+  ('get', '/inventory/?sort=price&min_price=10&max_price=500', 'mechanic', None),
+  ('get', '/search/?q=brake', 'mechanic', None),
+  ('post', '/customers/login', None, {'email': 'user@email.com', 'password': '1234'}),
+  ('post', '/mechanics/login', None, {'email': 'mech1@email.com', 'password': '7890'}),
+]
+
+# Sorts that only ever see one customer's tickets or one ticket's parts
+ALLOWED_SORTS = {
+  '/service_tickets/by-account?id=1': 'tickets of one customer across their cars',
+  '/service_tickets/1/invoice': 'parts of the requested tickets',
+  '/search/?q=brake': 'full-text matches ordered by relevance',
+}
+
+
+class TestQueryPlans(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    self.client = self.app.test_client()
+    principal_cache.clear()
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      mechanic = Mechanic(
+        name='test_mech',
+        phone='555-555-6666',
+        address='100 Main St. City, NY 00000',
+        email='mech1@email.com',
+        password='7890',
+        salary=80000.0
+      )
+      customer = Customer(name='test_user', phone='555-111-2222', email='user@email.com', password='1234')
+      car = Car(vin=VIN, make='Honda', model='Civic', year=2020, color='Black', customer=customer)
+      ticket = ServiceTicket(service_desc='Service A', car=car)
+      ticket.mechanics.append(mechanic)
+      item = Inventory(name='Tire', price=200.0)
+      db.session.add_all([mechanic, customer, car, ticket, item])
+      db.session.flush()
+      db.session.add(ServiceTicketInventory(service_ticket_id=ticket.id, inventory_id=item.id, quantity=2))
+      db.session.commit()
+      self.tokens = {
+        'customer': encode_token(customer.id, 'customer'),
+        'mechanic': encode_token(mechanic.id, 'mechanic'),
+      }
+      self.engine = db.engine
+
+
+  def capture(self, method, url, role, body):
+    headers = {'Authorization': f'Bearer {self.tokens[role]}'} if role else {}
+    with capture_statements(self.engine) as statements:
+      response = getattr(self.client, method)(url, json=body, headers=headers)
+    self.assertEqual(response.status_code, 200, url)
+    return [(statement, parameters) for statement, parameters in statements if statement.lstrip().upper().startswith('SELECT')]
+
+
+  def explain(self, statement, parameters):
+    connection = self.engine.raw_connection()
+    try:
+      return [row[3] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    finally:
+      connection.close()
+
+
+  def test_routes_use_indexes(self):
+    for method, url, role, body in ROUTES:
+      with self.subTest(url=url):
+        statements = self.capture(method, url, role, body)
+        self.assertTrue(statements)
+        for statement, parameters in statements:
+          for step in self.explain(statement, parameters):
+            # 'SCAN t USING INDEX' walks an index in order; a bare 'SCAN t' reads the whole table.
+            # Derived tables like '(subquery-2)' are scanned by design.
+            full_scan = step.startswith('SCAN ') and 'INDEX' not in step and not step.startswith('SCAN (')
+            self.assertFalse(full_scan, f'{url}: {step}\n{statement}')
+            if 'TEMP B-TREE' in step:
+              self.assertIn(url, ALLOWED_SORTS, f'{url}: {step}\n{statement}')
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
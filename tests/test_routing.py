@@ -0,0 +1,131 @@
+import unittest
+import os
+from app import create_app
+from app.extensions import cache
+from app.models import db, Mechanic, Inventory
+from app.utils.jwt_utils import encode_token
+from sqlalchemy import insert, select, update
+
+class TestReplicaRouting(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('ReplicaTestingConfig')
+    self.client = self.app.test_client()
+    self.writer = Mechanic(
+      name='writer_mech',
+      phone='555-555-6666',
+      address='100 Main St. City, NY 00000',
+      email='mech1@email.com',
+      password='7890',
+      salary=80000.0
+    )
+    self.reader = Mechanic(
+      name='reader_mech',
+      phone='555-555-7777',
+      address='200 Main St. City, NY 00000',
+      email='mech2@email.com',
+      password='7890',
+      salary=80000.0
+    )
+    self.inventory_item = Inventory(
+      name='Tire',
+      price=200.0
+    )
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      db.session.add_all([self.writer, self.reader, self.inventory_item])
+      db.session.commit()
+      ## The replica starts as a copy of the primary
+      replica = db.engines['replica']
+      db.metadata.drop_all(replica)
+      db.metadata.create_all(replica)
+      with db.engine.connect() as primary, replica.begin() as conn:
+        for table in db.metadata.sorted_tables:
+          rows = [row._asdict() for row in primary.execute(select(table))]
+          if rows:
+            conn.execute(insert(table), rows)
+      self.writer_token = encode_token(self.writer.id, 'mechanic')
+      self.reader_token = encode_token(self.reader.id, 'mechanic')
+      self.item_id = self.inventory_item.id
+
+
+  def headers(self, token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+  def test_get_reads_replica(self):
+    with self.app.app_context():
+      with db.engines['replica'].begin() as conn:
+        conn.execute(update(Inventory).where(Inventory.id == self.item_id).values(name='Replica Tire'))
+    response = self.client.get(f'/inventory/{self.item_id}', headers=self.headers(self.reader_token))
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['name'], 'Replica Tire')
+
+
+  def test_writer_reads_own_writes(self):
+    response = self.client.post(
+      '/inventory/',
+      json={'name': 'Battery', 'price': 140.0},
+      headers=self.headers(self.writer_token)
+    )
+    self.assertEqual(response.status_code, 201)
+    item_id = response.get_json()['id']
+
+    # The write only reached the primary; other readers see the lagging replica
+    response = self.client.get(f'/inventory/{item_id}', headers=self.headers(self.reader_token))
+    self.assertEqual(response.status_code, 404)
+
+    # The writer is pinned to the primary for READ_YOUR_WRITES_SECONDS
+    response = self.client.get(f'/inventory/{item_id}', headers=self.headers(self.writer_token))
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['name'], 'Battery')
+
+    # Once the pin is gone the writer reads the replica again
+    with self.app.app_context():
+      cache.clear()
+    response = self.client.get(f'/inventory/{item_id}', headers=self.headers(self.writer_token))
+    self.assertEqual(response.status_code, 404)
+
+
+  def test_replica_reads_are_not_cached_while_it_lags(self):
+    # The reader's list is cached before the write
+    response = self.client.get('/inventory/', headers=self.headers(self.reader_token))
+    self.assertEqual([item['name'] for item in response.get_json()], ['Tire'])
+
+    response = self.client.post(
+      '/inventory/',
+      json={'name': 'Battery', 'price': 140.0},
+      headers=self.headers(self.writer_token)
+    )
+    self.assertEqual(response.status_code, 201)
+
+    # Another client reads the lagging replica right after the write
+    response = self.client.get('/inventory/', headers=self.headers(self.reader_token))
+    self.assertEqual([item['name'] for item in response.get_json()], ['Tire'])
+    self.assertIsNone(response.headers.get('ETag'))
+
+    # Once the replica catches up the reader sees the write, not a cached pre-write body
+    with self.app.app_context():
+      with db.engines['replica'].begin() as conn:
+        conn.execute(insert(Inventory), [{'name': 'Battery', 'price': 140.0}])
+    response = self.client.get('/inventory/', headers=self.headers(self.reader_token))
+    self.assertEqual([item['name'] for item in response.get_json()], ['Battery', 'Tire'])
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      replica = db.engines['replica']
+      db.metadata.drop_all(replica)
+      replica.dispose()
+      db.get_engine().dispose()
+    # init_app registers an (empty) metadata per bind on the shared db; other apps have no replica
+    db.metadatas.pop('replica', None)
+    replica_path = os.path.join(self.app.instance_path, 'testing_replica.db')
+    if os.path.exists(replica_path):
+      os.remove(replica_path)
+
+
+if __name__ == '__main__':
+  unittest.main()
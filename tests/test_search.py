@@ -0,0 +1,150 @@
+import unittest
+from app import create_app
+from app.models import db, Customer, Mechanic, Car, ServiceTicket
+from app.utils.jwt_utils import encode_token
+from app.utils.search import rebuild_search_index
+from sqlalchemy import insert, text
+from unittest import mock
+
+class TestSearch(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    self.client = self.app.test_client()
+    self.mechanic= Mechanic(
+      name='test_mech',
+      phone='555-555-6666',
+      address='100 Main St. City, NY 00000',
+      email='mech1@email.com',
+      password='7890',
+      salary=80000.0
+    )
+    self.customer = Customer(
+      name='Jane Brakeman',
+      phone='555-111-2222',
+      email='jane@email.com',
+      password='1234'
+    )
+    self.car = Car(
+      vin='80224526647584952',
+      make='Honda',
+      model='Civic',
+      year=2020,
+      color='Black',
+      customer=self.customer
+    )
+    self.brake_ticket = ServiceTicket(service_desc='Front brake pads replaced', car=self.car)
+    self.oil_ticket = ServiceTicket(service_desc='Oil change', car=self.car)
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      db.session.add_all([self.mechanic, self.customer, self.car, self.brake_ticket, self.oil_ticket])
+      db.session.commit()
+      self.customer_token = encode_token(self.customer.id, 'customer')
+      self.mechanic_token = encode_token(self.mechanic.id, 'mechanic')
+      self.brake_ticket_id = self.brake_ticket.id
+      self.customer_id = self.customer.id
+
+
+  def search(self, query, role='mechanic'):
+    token = getattr(self, f'{role}_token')
+    return self.client.get(f'/search/?{query}', headers={'Authorization': f'Bearer {token}'})
+
+
+  def test_search_ranks_across_kinds(self):
+    response = self.search('q=brake')
+    self.assertEqual(response.status_code, 200)
+    results = response.get_json()
+    self.assertEqual(
+      {(result['type'], result['id']) for result in results},
+      {('service_ticket', self.brake_ticket_id), ('customer', self.customer_id)}
+    )
+
+    response = self.search('q=civic')
+    self.assertEqual(response.get_json(), [{'type': 'car', 'id': '80224526647584952', 'text': 'Honda Civic 80224526647584952'}])
+
+    # Every term must match, each as a prefix
+    response = self.search('q=hon%20civ')
+    self.assertEqual([result['type'] for result in response.get_json()], ['car'])
+    response = self.search('q=jane%20oil')
+    self.assertEqual(response.get_json(), [])
+
+
+  def test_search_filters_and_pages(self):
+    response = self.search('q=brake&type=customer')
+    self.assertEqual([result['type'] for result in response.get_json()], ['customer'])
+
+    response = self.search('q=brake&per_page=1')
+    self.assertEqual(len(response.get_json()), 1)
+    self.assertIn('rel="next"', response.headers['Link'])
+    response = self.search('q=brake&per_page=1&page=2')
+    self.assertEqual(len(response.get_json()), 1)
+    self.assertNotIn('rel="next"', response.headers['Link'])
+
+    self.assertEqual(self.search('q=brake&type=invoice').status_code, 400)
+    self.assertEqual(self.search('q=%20').status_code, 400)
+    self.assertEqual(self.search('q=brake', role='customer').status_code, 403)
+
+
+  def test_index_follows_writes(self):
+    with self.app.app_context():
+      ticket = db.session.get(ServiceTicket, self.brake_ticket_id)
+      ticket.service_desc = 'Transmission flush'
+      db.session.execute(insert(ServiceTicket), [{'service_desc': 'Brake fluid', 'car_vin': '80224526647584952'}])
+      db.session.commit()
+    results = self.search('q=brake&type=service_ticket').get_json()
+    self.assertEqual([result['text'] for result in results], ['Brake fluid'])
+    self.assertEqual(len(self.search('q=transmission').get_json()), 1)
+
+    with self.app.app_context():
+      db.session.delete(db.session.get(Customer, self.customer_id))
+      db.session.commit()
+    self.assertEqual(self.search('q=jane&type=customer').get_json(), [])
+    self.assertEqual(self.search('q=civic').get_json(), [])
+
+
+  def test_rebuild_indexes_existing_rows(self):
+    with self.app.app_context():
+      # Rows written while the index was missing
+      for trigger in ('insert', 'update', 'delete'):
+        db.session.execute(text(f'DROP TRIGGER customers_fts_{trigger}'))
+      db.session.execute(text('DROP TABLE customers_fts'))
+      db.session.execute(insert(Customer), [{'name': 'Sam Oldrow', 'phone': '555', 'email': 'sam@email.com', 'password': 'x'}])
+      db.session.commit()
+      rebuild_search_index()
+      db.session.commit()
+    results = self.search('q=oldrow').get_json()
+    self.assertEqual([result['text'] for result in results], ['Sam Oldrow sam@email.com 555'])
+
+
+  def test_car_matches_survive_renumbered_rowids(self):
+    with self.app.app_context():
+      # cars has no INTEGER PRIMARY KEY, so VACUUM is free to renumber its rowids
+      db.session.execute(insert(Car), [
+        {'vin': '1FAFP40634F000002', 'make': 'Ford', 'model': 'Fiesta', 'year': 2019, 'color': 'Blue', 'customer_id': self.customer_id}
+      ])
+      db.session.execute(text('UPDATE cars SET rowid = -rowid'))
+      db.session.execute(text('UPDATE cars SET rowid = 3 + rowid'))
+      db.session.commit()
+    response = self.search('q=fiesta')
+    self.assertEqual(response.get_json(), [{'type': 'car', 'id': '1FAFP40634F000002', 'text': 'Ford Fiesta 1FAFP40634F000002'}])
+    response = self.search('q=civic')
+    self.assertEqual([result['id'] for result in response.get_json()], ['80224526647584952'])
+
+
+  def test_unsupported_backend_returns_501(self):
+    error = NotImplementedError('Full-text search is not supported on mysql')
+    with mock.patch('app.blueprints.search.routes.search', side_effect=error):
+      response = self.search('q=brake')
+    self.assertEqual(response.status_code, 501)
+    self.assertEqual(response.get_json()['message'], 'Full-text search is not supported on mysql')
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from app import create_app
+from app.models import db, Customer, Mechanic, ServiceTicket, Car, ServiceTicketInventory, service_ticket_mechanic
+from app.utils.seeding import SeedPlan, seed_database
+from sqlalchemy import select, func
+from datetime import date
+
+class TestSeeding(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+
+
+  def count(self, table):
+    with self.app.app_context():
+      return db.session.execute(select(func.count()).select_from(table)).scalar()
+
+
+  def snapshot(self):
+    with self.app.app_context():
+      return [
+        db.session.execute(select(table).order_by(*table.primary_key)).all()
+        for table in (Car.__table__, ServiceTicket.__table__, service_ticket_mechanic, ServiceTicketInventory.__table__)
+      ]
+
+
+  def test_seed_command(self):
+    result = self.app.test_cli_runner().invoke(args=['seed', '--customers', '40', '--chunk-size', '25', '--until', '2024-06-01'])
+    self.assertEqual(result.exit_code, 0, result.output)
+    with self.app.app_context():
+      newest = db.session.execute(select(func.max(ServiceTicket.created_at))).scalar()
+    self.assertEqual(newest.replace(tzinfo=None).date(), date(2024, 5, 27))
+    self.assertEqual(self.count(Customer.__table__), 40)
+    self.assertEqual(self.count(Car.__table__), 60)
+    self.assertEqual(self.count(ServiceTicket.__table__), 180)
+    self.assertEqual(self.count(Mechanic.__table__), 5)
+    with self.app.app_context():
+      assigned = db.session.execute(
+        select(service_ticket_mechanic.c.mechanic_id, func.count()).group_by(service_ticket_mechanic.c.mechanic_id)
+      ).all()
+      ticket_counts = db.session.execute(select(Mechanic.id, Mechanic.ticket_count)).all()
+      # Every assignment carries its ticket's created_at
+      mismatched = db.session.execute(
+        select(func.count()).select_from(service_ticket_mechanic).join(ServiceTicket).where(
+          service_ticket_mechanic.c.ticket_created_at.is_distinct_from(ServiceTicket.created_at)
+        )
+      ).scalar()
+    self.assertEqual(dict(assigned), dict(ticket_counts))
+    self.assertEqual(mismatched, 0)
+
+    # Refuses to mix with existing data unless asked to start over
+    result = self.app.test_cli_runner().invoke(args=['seed', '--customers', '40'])
+    self.assertNotEqual(result.exit_code, 0)
+    self.assertIn('--reset', result.output)
+
+
+  def test_seed_is_deterministic(self):
+    with self.app.app_context():
+      seed_database(SeedPlan(30, distribution='skewed', seed=7), chunk_size=1000)
+    first = self.snapshot()
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      seed_database(SeedPlan(30, distribution='skewed', seed=7), chunk_size=7)
+    self.assertEqual(self.snapshot(), first)
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import json
+from app import create_app
+from app.models import db, Customer, Mechanic, ServiceTicket, Car, Inventory
+from app.utils.serializers import dump, compile_schema, compilable
+from app.blueprints.service_tickets.schemas import service_tickets_schema, detailed_service_tickets_schema
+from app.blueprints.cars.schemas import cars_schema
+from app.blueprints.mechanics.schemas import mechanics_schema
+from app.blueprints.customers.schemas import customers_schema
+from app.blueprints.inventory.schemas import inventories_schema
+from marshmallow import Schema, fields, post_dump
+from datetime import datetime, timezone
+from sqlalchemy import select
+
+class TestSerializers(unittest.TestCase):
+  def setUp(self):
+    self.app = create_app('TestingConfig')
+    with self.app.app_context():
+      db.drop_all()
+      db.create_all()
+      mechanics = [
+        Mechanic(name=f'mech {i}', phone='555', address='Main St', email=f'm{i}@email.com', password='pw', salary=50000 + i)
+        for i in range(3)
+      ]
+      for i in range(5):
+        customer = Customer(name=f'customer {i}', phone='555', email=f'c{i}@email.com', password='pw')
+        car = Car(vin=f'{i:017d}', make='Honda', model='Civic', year=2000 + i, color='Black', customer=customer)
+        for j in range(i):
+          ticket = ServiceTicket(service_desc=f'Service {i}-{j}', car=car, created_at=datetime(2024, 1, i + 1, j, tzinfo=timezone.utc))
+          ticket.mechanics.extend(mechanics[:j])
+          db.session.add(ticket)
+        db.session.add(customer)
+      db.session.add(Inventory(name='Tire', price=200))
+      db.session.commit()
+
+
+  def assertSameDump(self, schema, model):
+    with self.app.app_context():
+      objs = db.session.scalars(select(model)).unique().all()
+      expected = json.dumps(schema.dump(objs))
+      self.assertEqual(json.dumps(dump(schema, objs)), expected)
+
+
+  def test_compiled_matches_marshmallow(self):
+    for schema, model in [
+      (detailed_service_tickets_schema, ServiceTicket),
+      (service_tickets_schema, ServiceTicket),
+      (cars_schema, Car),
+      (mechanics_schema, Mechanic),
+      (customers_schema, Customer),
+      (inventories_schema, Inventory),
+    ]:
+      with self.subTest(schema=type(schema).__name__, model=model.__name__):
+        self.assertTrue(compilable(schema))
+        self.assertSameDump(schema, model)
+
+    # Unset columns dump as None
+    cars = [Car(vin='12345678901234567')]
+    with self.app.app_context():
+      self.assertEqual(json.dumps(dump(cars_schema, cars)), json.dumps(cars_schema.dump(cars)))
+
+
+  def test_core_rows(self):
+    compiled = compile_schema(inventories_schema)
+    with self.app.app_context():
+      row = db.session.execute(select(Inventory.id, Inventory.name, Inventory.price)).first()
+    self.assertEqual(compiled(row), {'price': 200.0, 'id': 1, 'name': 'Tire'})
+
+
+  def test_falls_back_for_dump_hooks(self):
+    class HookSchema(Schema):
+      name = fields.String()
+
+      @post_dump
+      def shout(self, data, **kwargs):
+        return {'name': data['name'].upper()}
+
+    self.assertFalse(compilable(HookSchema()))
+    with self.app.app_context():
+      self.assertEqual(dump(HookSchema(many=True), [Inventory(name='tire')]), [{'name': 'TIRE'}])
+
+
+  def tearDown(self):
+    with self.app.app_context():
+      db.session.remove()
+      db.drop_all()
+      db.get_engine().dispose()
+
+
+if __name__ == '__main__':
+  unittest.main()
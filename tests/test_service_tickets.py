@@ -1,8 +1,17 @@
 import unittest
+import json
 from app import create_app
 from app.models import db, Customer, Mechanic, ServiceTicket, Car, Inventory
 from app.utils.jwt_utils import encode_token
+from helpers import capture_statements
 from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, insert, select
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.parts import REMOVE_ATTEMPTS, add_ticket_part, remove_ticket_part
+from unittest import mock
+from app.models import ServiceTicketInventory
+from app.utils.helpers import paginate
+from app.blueprints.service_tickets.schemas import service_tickets_schema
 
 class TestServiceTickets(unittest.TestCase):
   def setUp(self):
@@ -53,6 +62,7 @@ class TestServiceTickets(unittest.TestCase):
       self.customer_token = encode_token(self.customer.id, 'customer')
       self.mechanic_token = encode_token(self.mechanic.id, 'mechanic')
       self.ticket_id = self.service_ticket.id
+      self.mechanic_id = self.mechanic.id
       self.mech_name = self.mechanic.name
       self.item_id = self.inventory_item.id
       self.item_name = self.inventory_item.name
@@ -105,7 +115,63 @@ class TestServiceTickets(unittest.TestCase):
     self.assertEqual(response.status_code, 200)
     self.assertEqual(response.get_json()['mechanics'], [self.mech_name])
 
-  
+
+  def test_bulk_edit_mechanics(self):
+    with self.app.app_context():
+      second_ticket = ServiceTicket(service_desc='Service B', car_vin='80224526647584952')
+      db.session.add(second_ticket)
+      db.session.commit()
+      second_id = second_ticket.id
+
+    def bulk_edit(tickets):
+      return self.client.put(
+        '/service_tickets/bulk/edit',
+        json={'tickets': tickets},
+        headers=self.auth_headers('mechanic')
+      )
+
+    response = bulk_edit({
+      self.ticket_id: {'add_mech_ids': [1]},
+      second_id: {'add_mech_ids': [1]}
+    })
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(len(response.get_json()['added']), 2)
+
+    response = bulk_edit({
+      self.ticket_id: {'add_mech_ids': [1]},
+      second_id: {'remove_mech_ids': [1]}
+    })
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['added'], [])
+    self.assertEqual(response.get_json()['removed'], [{'ticket_id': second_id, 'mechanic_id': 1}])
+    self.assertEqual(response.get_json()['already_assigned'], [{'ticket_id': self.ticket_id, 'mechanic_id': 1}])
+    with self.app.app_context():
+      self.assertEqual(db.session.get(Mechanic, 1).ticket_count, 1)
+      self.assertEqual(db.session.get(ServiceTicket, second_id).mechanics, [])
+
+    response = bulk_edit({999: {'add_mech_ids': [1]}, second_id: {'add_mech_ids': [42]}})
+    self.assertEqual(response.status_code, 404)
+    self.assertIn('999', response.get_json()['message'])
+
+    # 10 tickets x 10 mechanics stays a handful of statements, however many rows it writes
+    with self.app.app_context():
+      tickets = [ServiceTicket(service_desc=f'Bulk {i}', car_vin='80224526647584952') for i in range(10)]
+      mechanics = [
+        Mechanic(name=f'bulk_{i}', phone='555', address='Main St.', email=f'bulk{i}@email.com', password='x', salary=1.0)
+        for i in range(10)
+      ]
+      db.session.add_all([*tickets, *mechanics])
+      db.session.commit()
+      mech_ids = [mechanic.id for mechanic in mechanics]
+      changes = {ticket.id: {'add_mech_ids': mech_ids} for ticket in tickets}
+      engine = db.engine
+    with capture_statements(engine) as statements:
+      response = bulk_edit(changes)
+    self.assertEqual(len(response.get_json()['added']), 100)
+    # token user, validation, assignment insert, ticket_count update
+    self.assertLessEqual(len(statements), 4)
+
+
   def test_get_all_tickets(self):
     response = self.client.get(
       '/service_tickets/',
@@ -114,6 +180,123 @@ class TestServiceTickets(unittest.TestCase):
     self.assertEqual(response.status_code, 200)
     self.assertIsInstance(response.get_json(), list)
 
+
+  def test_get_all_tickets_query_count(self):
+    with self.app.app_context():
+      mechanic = db.session.get(Mechanic, self.mechanic.id)
+      for i in range(20):
+        car = Car(
+          vin=f'{i:017d}',
+          make='Toyota',
+          model='Corolla',
+          year=2015,
+          color='Blue',
+          customer_id=self.customer.id
+        )
+        ticket = ServiceTicket(service_desc=f'Service {i}', car=car)
+        ticket.mechanics.append(mechanic)
+        db.session.add(ticket)
+      db.session.commit()
+      engine = db.engine
+
+    with capture_statements(engine) as statements:
+      response = self.client.get(
+        '/service_tickets/',
+        query_string={'per_page': 20},
+        headers=self.auth_headers('mechanic')
+      )
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(len(response.get_json()), 20)
+    # token user, page, count and the mechanics IN query; car and customer are joined into the page
+    self.assertLessEqual(len(statements), 4)
+
+  
+  def test_cursor_pages_past_null_keys(self):
+    # No model sorts on a nullable column, so page through one kept next to the tickets
+    reminders = Table(
+      'ticket_reminders', MetaData(),
+      Column('service_ticket_id', Integer, primary_key=True),
+      Column('due_at', DateTime, nullable=True)
+    )
+    with self.app.app_context():
+      tickets = [ServiceTicket(service_desc=f'Service {letter}', car_vin='80224526647584952') for letter in 'BC']
+      db.session.add_all(tickets)
+      db.session.commit()
+      reminders.create(db.engine)
+      try:
+        db.session.execute(insert(reminders), [
+          {'service_ticket_id': self.ticket_id, 'due_at': datetime(2025, 1, 1)},
+          {'service_ticket_id': tickets[0].id, 'due_at': None},
+          {'service_ticket_id': tickets[1].id, 'due_at': datetime(2025, 2, 1)},
+        ])
+        db.session.commit()
+        order_by = (reminders.c.due_at.desc(), reminders.c.service_ticket_id.desc())
+        query = select(ServiceTicket).join(reminders, reminders.c.service_ticket_id == ServiceTicket.id)
+        seen = []
+        cursor = ''
+        while cursor is not None:
+          with self.app.test_request_context(query_string={'per_page': 1, 'cursor': cursor}):
+            page = paginate(query, service_tickets_schema, order_by=order_by)
+          seen.extend(ticket['service_desc'] for ticket in page['items'])
+          cursor = page['next_cursor']
+      finally:
+        db.session.remove()
+        reminders.drop(db.engine)
+    self.assertEqual(seen, ['Service C', 'Service A', 'Service B'])
+
+
+  def test_export_tickets(self):
+    with self.app.app_context():
+      mechanic = db.session.get(Mechanic, self.mechanic.id)
+      for i in range(600):
+        ticket = ServiceTicket(
+          service_desc=f'Service {i}',
+          car_vin='80224526647584952',
+          created_at=datetime(2020, 1, 1) if i % 2 else datetime(2030, 1, 1)
+        )
+        ticket.mechanics.append(mechanic)
+        db.session.add(ticket)
+      db.session.commit()
+    headers = self.auth_headers('mechanic')
+
+    response = self.client.get('/service_tickets/export', headers=headers)
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.mimetype, 'application/x-ndjson')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    self.assertEqual(len(rows), 601)
+    self.assertEqual(rows[0]['mechanics'], [self.mech_name])
+    self.assertEqual(rows[0]['customer']['name'], 'test_user')
+
+    response = self.client.get(
+      '/service_tickets/export',
+      query_string={'format': 'csv', 'since': '2029-12-31T00:00:00'},
+      headers=headers
+    )
+    lines = response.get_data(as_text=True).splitlines()
+    self.assertEqual(len(lines), 301)
+    header = lines[0].split(',')
+    self.assertEqual(header[:2], ['car.vin', 'car.make'])
+    self.assertIn('customer.name', header)
+
+    # An offset is converted to UTC: 03:00+05:00 is 22:00 UTC the day before
+    response = self.client.get(
+      '/service_tickets/export',
+      query_string={'since': '2030-01-01T03:00:00+05:00'},
+      headers=headers
+    )
+    self.assertEqual(len(response.get_data(as_text=True).splitlines()), 300)
+
+    # No rows still gets the same header
+    response = self.client.get(
+      '/service_tickets/export',
+      query_string={'format': 'csv', 'since': '2040-01-01T00:00:00'},
+      headers=headers
+    )
+    self.assertEqual(response.get_data(as_text=True).splitlines(), [lines[0]])
+
+    response = self.client.get('/service_tickets/export', query_string={'since': 'yesterday'}, headers=headers)
+    self.assertEqual(response.status_code, 400)
+
   
   def test_get_ticket(self):
     ticket_id = self.ticket_id
@@ -180,6 +363,125 @@ class TestServiceTickets(unittest.TestCase):
     )
   
   
+  def test_ticket_remove_item_gives_up_under_contention(self):
+    # The row never settles between the update and the delete, as if other requests kept changing it
+    with mock.patch('app.utils.parts._quantity', return_value=2) as quantity:
+      response = self.client.patch(
+        f'/service_tickets/{self.ticket_id}/remove-item/{self.item_id}',
+        headers=self.auth_headers('mechanic')
+      )
+    self.assertEqual(response.status_code, 409)
+    self.assertEqual(quantity.call_count, REMOVE_ATTEMPTS)
+
+
+  def test_ticket_add_items(self):
+    with self.app.app_context():
+      db.session.add(Inventory(name='Oil Filter', price=15.0))
+      db.session.commit()
+
+    def add_items(items):
+      return self.client.patch(
+        f'/service_tickets/{self.ticket_id}/items',
+        json={'items': items},
+        headers=self.auth_headers('mechanic')
+      )
+
+    response = add_items([
+      {'inventory_id': self.item_id, 'quantity': 2},
+      {'inventory_id': 2, 'quantity': 1},
+      {'inventory_id': self.item_id, 'quantity': 1}
+    ])
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(
+      [(item['name'], item['quantity']) for item in response.get_json()['items']],
+      [(self.item_name, 3), ('Oil Filter', 1)]
+    )
+
+    response = add_items([{'inventory_id': self.item_id, 'quantity': 4}])
+    self.assertEqual(response.get_json()['items'][0]['quantity'], 7)
+
+    response = add_items([{'inventory_id': 99, 'quantity': 1}])
+    self.assertEqual(response.status_code, 404)
+    response = add_items([{'inventory_id': self.item_id, 'quantity': 0}])
+    self.assertEqual(response.status_code, 400)
+
+
+  def test_ticket_invoices(self):
+    with self.app.app_context():
+      db.session.add_all([
+        Inventory(name='Oil Filter', price=15.5),
+        ServiceTicket(service_desc='Service B', car_vin='80224526647584952')
+      ])
+      db.session.commit()
+    headers = self.auth_headers('mechanic')
+    self.client.patch(
+      f'/service_tickets/{self.ticket_id}/items',
+      json={'items': [{'inventory_id': self.item_id, 'quantity': 2}, {'inventory_id': 2, 'quantity': 2}]},
+      headers=headers
+    )
+
+    response = self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers)
+    self.assertEqual(response.status_code, 200)
+    invoice = response.get_json()
+    self.assertEqual([line['line_total'] for line in invoice['lines']], [400.0, 31.0])
+    self.assertEqual(invoice['total'], 431.0)
+
+    # Cached invoice is dropped when the ticket's parts change
+    self.client.patch(f'/service_tickets/{self.ticket_id}/remove-item/2', headers=headers)
+    response = self.client.get('/service_tickets/invoices', query_string={'ids': [self.ticket_id, 2]}, headers=headers)
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual([invoice['total'] for invoice in response.get_json()], [415.5, 0])
+    self.assertEqual(response.get_json()[1]['lines'], [])
+
+    response = self.client.get('/service_tickets/invoices', query_string={'ids': [1, 99]}, headers=headers)
+    self.assertEqual(response.status_code, 404)
+
+
+  def test_invoice_dropped_with_deleted_car(self):
+    headers = self.auth_headers('mechanic')
+    self.assertEqual(self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers).status_code, 200)
+    response = self.client.delete('/cars/80224526647584952', headers=headers)
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers).status_code, 404)
+    self.assertEqual(self.client.get(f'/service_tickets/{self.ticket_id}', headers=headers).status_code, 404)
+
+
+  def test_invoice_dropped_with_deleted_customer(self):
+    headers = self.auth_headers('mechanic')
+    self.assertEqual(self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers).status_code, 200)
+    response = self.client.delete('/customers/', headers=self.auth_headers('customer'))
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(self.client.get(f'/service_tickets/{self.ticket_id}/invoice', headers=headers).status_code, 404)
+
+
+  def test_item_quantity_concurrent_updates(self):
+    # Calls the helpers directly so the route rate limit doesn't get in the way
+    def change(i):
+      with self.app.app_context():
+        if i % 3 == 2:
+          remove_ticket_part(self.ticket_id, self.item_id)
+        else:
+          add_ticket_part(self.ticket_id, self.item_id, 2)
+        db.session.commit()
+
+    with self.app.app_context():
+      add_ticket_part(self.ticket_id, self.item_id, 100)
+      db.session.commit()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+      list(pool.map(change, range(300)))
+
+    with self.app.app_context():
+      sti = db.session.get(
+        ServiceTicketInventory,
+        {'service_ticket_id': self.ticket_id, 'inventory_id': self.item_id}
+      )
+      # 100 to start, 200 adds of 2 and 100 removes of 1
+      self.assertEqual(sti.quantity, 400)
+
+      self.assertEqual(remove_ticket_part(self.ticket_id, self.item_id, 400), 0)
+      self.assertIsNone(remove_ticket_part(self.ticket_id, self.item_id))
+
+
   def tearDown(self):
     with self.app.app_context():
       db.session.remove()
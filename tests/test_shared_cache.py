@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+from multiprocessing import Process
+from flask import Flask
+from flask_caching import Cache
+from app.utils.shared_cache import SharedMemoryCache, default_path
+
+
+def increment(path, times):
+  worker_cache = SharedMemoryCache(path=path)
+  for _ in range(times):
+    worker_cache.inc('counter')
+
+
+class TestSharedMemoryCache(unittest.TestCase):
+  def setUp(self):
+    self.tmp_dir = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.tmp_dir.name, 'cache.db')
+    self.cache = SharedMemoryCache(path=self.path, max_bytes=4096, threshold=100)
+
+
+  def test_shared_between_instances(self):
+    other_worker = SharedMemoryCache(path=self.path)
+    self.cache.set('key', {'value': 1})
+    self.assertEqual(other_worker.get('key'), {'value': 1})
+    other_worker.delete('key')
+    self.assertIsNone(self.cache.get('key'))
+
+
+  def test_add_and_expiry(self):
+    self.assertTrue(self.cache.add('key', 1))
+    self.assertFalse(self.cache.add('key', 2))
+    self.assertEqual(self.cache.get('key'), 1)
+    self.cache.set('expired', 1, timeout=-1)
+    self.assertIsNone(self.cache.get('expired'))
+    self.assertFalse(self.cache.has('expired'))
+
+
+  def test_files_are_private(self):
+    self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+    with tempfile.TemporaryDirectory() as base:
+      directory = os.path.dirname(default_path(base))
+      self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+      # A directory other users can write to is refused rather than trusted
+      os.chmod(directory, 0o777)
+      with self.assertRaises(RuntimeError):
+        default_path(base)
+
+
+  def test_inc_across_processes(self):
+    workers = [Process(target=increment, args=(self.path, 50)) for _ in range(4)]
+    for worker in workers:
+      worker.start()
+    for worker in workers:
+      worker.join()
+    self.assertEqual(self.cache.get('counter'), 200)
+
+
+  def test_lru_eviction(self):
+    self.cache.set('hot', 'x' * 100)
+    for i in range(100):
+      self.cache.set(f'key{i}', 'x' * 100)
+      # Keep 'hot' recently used
+      self.cache._connect().execute("UPDATE entries SET accessed = accessed + 1000 WHERE key = 'hot'")
+    self.assertEqual(self.cache.get('hot'), 'x' * 100)
+    self.assertIsNone(self.cache.get('key0'))
+    used_bytes, = self.cache._connect().execute('SELECT bytes FROM usage').fetchone()
+    self.assertLessEqual(used_bytes, 4096)
+
+
+  def test_selected_by_flask_caching(self):
+    app = Flask(__name__)
+    app.config.update(
+      CACHE_TYPE='app.utils.shared_cache.SharedMemoryCache',
+      CACHE_SHARED_PATH=self.path
+    )
+    flask_cache = Cache(app)
+    flask_cache.set('key', 'value')
+    self.assertEqual(self.cache.get('key'), 'value')
+
+
+  def tearDown(self):
+    self.tmp_dir.cleanup()
+
+
+if __name__ == '__main__':
+  unittest.main()